@@ -0,0 +1,406 @@
+"""
+Asyncio Runtime for the Smart Security System
+
+This is an alternative entry point that runs the whole system on one asyncio
+event loop instead of a thread per activity:
+- PIR callbacks are forwarded onto the loop and handled as coroutines
+- Bulb timeouts and recognition deadlines are loop timers
+- Blynk traffic is handled when its socket becomes readable
+- Blocking device calls (bulb, camera, ADC) run on a small I/O executor and
+  face recognition on a CPU executor, so the loop itself never blocks
+
+Usage:
+    python async_runtime.py
+
+SIGINT/SIGTERM cancel all running tasks and release the hardware before the
+process exits.
+"""
+
+import asyncio
+import logging
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+import config
+from zone import load_zones
+from face_recognition_service import FaceRecognitionService
+from blynk_service import BlynkService
+from event_journal import EventJournal
+from snapshot_writer import SnapshotWriter
+from frame_scheduler import FrameScheduler
+from logging_service import setup_logging, shutdown_logging
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSecuritySystem:
+    """Security system orchestrated by coroutines on a single event loop."""
+
+    def __init__(self):
+        """Initialize the security system components."""
+        self.zones = load_zones()
+        self.face_service = FaceRecognitionService()
+        self.blynk_service = BlynkService()
+        self.journal = EventJournal()
+        self.snapshots = SnapshotWriter()
+
+        self.io_executor = ThreadPoolExecutor(max_workers=config.ASYNC_IO_WORKERS, thread_name_prefix="io")
+        self.cpu_executor = ThreadPoolExecutor(max_workers=config.RECOGNITION_WORKERS, thread_name_prefix="recognition")
+
+        self.motion_count = 0
+        self.loop = None
+        self.tasks = set()
+        self.zone_locks = {}
+        self.off_handles = {}         # zone name -> TimerHandle of the pending bulb turn-off
+        self.recognition_tasks = {}   # zone name -> running recognition task
+
+        self.registered_encodings, self.registered_info = self.face_service.load_registered_faces()
+
+    async def run(self):
+        """Run the system until SIGINT or SIGTERM is received."""
+        self.loop = asyncio.get_running_loop()
+        stop_event = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            self.loop.add_signal_handler(sig, stop_event.set)
+
+        if not await self.start():
+            return
+
+        await stop_event.wait()
+        logger.info("Shutting down the security system...")
+        await self.stop()
+
+    async def start(self):
+        """Initialize the hardware and begin monitoring for motion.
+
+        Returns:
+            bool: True if at least one zone is being monitored
+        """
+        active_zones = 0
+        for zone in self.zones:
+            if not await self._io(zone.camera.initialize):
+                logger.error("Failed to initialize camera for zone %s. Zone will not be monitored.", zone.name)
+                continue
+            self.zone_locks[zone.name] = asyncio.Lock()
+            zone.motion_sensor.set_callback(lambda zone=zone: self.loop.call_soon_threadsafe(self._on_motion, zone))
+            active_zones += 1
+
+        if active_zones == 0:
+            logger.error("No zone could be initialized. Security system will not start.")
+            return False
+
+        self.journal.start()
+        self.snapshots.start()
+        self._spawn(self.blynk_service.run_async(executor=self.io_executor))
+        logger.info("🟢 Security system is active and monitoring for motion (asyncio runtime)...")
+        return True
+
+    async def stop(self):
+        """Cancel all running tasks, turn off lit bulbs and release resources."""
+        # A pending turn-off means the zone's bulb is on
+        lit_zones = [zone for zone in self.zones if zone.name in self.off_handles]
+        for handle in self.off_handles.values():
+            handle.cancel()
+        self.off_handles.clear()
+
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+        for zone in lit_zones:
+            logger.info("Turning off bulb in %s because the system is stopping", zone.name)
+            await self._io(zone.bulb.turn_off)
+        for zone in self.zones:
+            await self._io(zone.close)
+        self.io_executor.shutdown(wait=True)
+        self.cpu_executor.shutdown(wait=True)
+        self.journal.stop()
+        self.snapshots.stop()
+        logger.info("Security system has been stopped.")
+
+    def _spawn(self, coroutine):
+        """Start a tracked task so it can be cancelled on shutdown.
+
+        Args:
+            coroutine: Coroutine to run
+
+        Returns:
+            asyncio.Task: The created task
+        """
+        task = self.loop.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def _io(self, function, *args):
+        """Run a blocking device call on the I/O executor.
+
+        Args:
+            function: Blocking function to call
+            *args: Arguments for the function
+
+        Returns:
+            The function's return value
+        """
+        return await self.loop.run_in_executor(self.io_executor, function, *args)
+
+    def _discard_video_stream(self, zone, video_stream):
+        """Close a camera stream started for a motion event that needs no recognition.
+
+        Args:
+            zone: The Zone whose camera the stream belongs to
+            video_stream: Task running the camera's get_video_stream()
+        """
+        # Cancelling the task would not stop the call on the I/O executor, so close the stream once it has started
+        def close(task):
+            if not task.cancelled() and task.exception() is None:
+                zone.camera.close_video_stream(task.result())
+
+        video_stream.add_done_callback(close)
+
+    def _on_motion(self, zone):
+        """Handle a PIR trigger delivered onto the event loop.
+
+        Args:
+            zone: The Zone whose motion sensor fired
+        """
+        self._spawn(self._handle_motion(zone, time.time()))
+
+    async def _handle_motion(self, zone, t_motion):
+        """Handle a motion event for a zone.
+
+        Args:
+            zone: The Zone whose motion sensor fired
+            t_motion: Time the motion was detected
+        """
+        if self.blynk_service.get_operation_mode() == "manual":
+            logger.info("System in manual mode - ignoring motion detection")
+            self.journal.record("motion", zone=zone.name, t_motion=t_motion, outcome="manual")
+            return
+
+        async with self.zone_locks[zone.name]:
+            self.motion_count += 1
+            count = self.motion_count
+
+            # Keep the light on while motion continues
+            if zone.name in self.off_handles:
+                self._schedule_off(zone, count)
+                self.journal.record("motion", id=count, zone=zone.name, t_motion=t_motion, outcome="extended")
+                return
+
+            logger.info("🚨 Motion detected in %s! Total count: %d", zone.name, count)
+
+            # Connect to the bulb (unless its connection is still open) and warm up the
+            # camera while the light level is read; both are only needed if it is dark
+            bulb_connected = self._spawn(self._io(lambda: zone.bulb.connected or zone.bulb.connect()))
+            video_stream = self._spawn(self._io(zone.camera.get_video_stream))
+
+            light_level = await self._io(zone.light_sensor.get_light_level)
+            logger.info("Current light level: %s", light_level)
+
+            if not zone.light_sensor.is_dark(light_level):
+                logger.info("Bright environment detected. No action needed.")
+                # A bulb connection that was opened is kept for the next motion
+                self._discard_video_stream(zone, video_stream)
+                self.journal.record("motion", id=count, zone=zone.name, t_motion=t_motion,
+                                    light_level=light_level, dark=False, outcome="bright")
+                return
+
+            logger.info("Dark environment detected. Activating security response...")
+            if not await bulb_connected:
+                logger.error("Failed to connect to smart bulb. Aborting security response.")
+                self._discard_video_stream(zone, video_stream)
+                self.journal.record("motion", id=count, zone=zone.name, t_motion=t_motion,
+                                    light_level=light_level, dark=True, outcome="bulb_unavailable")
+                return
+
+            await self._io(zone.bulb.turn_on)
+
+            # Whoever was recognized here moments ago is most likely back: show their color now
+            recent = zone.recent_identity()
+            if recent:
+                assumed_name, light_color = recent
+                logger.info("%s was recognized here recently, setting bulb to %s until confirmed", assumed_name, light_color)
+                await self._io(zone.bulb.set_color, *config.SUPPORTED_COLORS.get(light_color.lower(), (100, 100, 100)))
+            else:
+                light_color = "default"
+                await self._io(zone.bulb.set_default_color)
+            self.blynk_service.update_light_state(True, light_color)
+
+            event = {
+                "id": count,
+                "zone": zone.name,
+                "t_motion": t_motion,
+                "t_light_on": time.time(),
+                "light_level": light_level,
+                "dark": True,
+            }
+            if recent:
+                event.update(assumed_name=assumed_name, assumed_color=light_color)
+            logger.info("Light on %.0f ms after motion", (event["t_light_on"] - t_motion) * 1000)
+            self._schedule_off(zone, count)
+            self.recognition_tasks[zone.name] = self._spawn(self._run_face_recognition(zone, count, video_stream, event))
+
+    def _schedule_off(self, zone, count):
+        """Schedule (or reschedule) the bulb turn-off for a zone.
+
+        Args:
+            zone: The Zone whose bulb should turn off
+            count: The motion detection count that turned the bulb on
+        """
+        handle = self.off_handles.pop(zone.name, None)
+        if handle:
+            handle.cancel()
+        self.off_handles[zone.name] = self.loop.call_later(config.BULB_ON_DURATION, self._bulb_timeout, zone, count)
+
+    def _bulb_timeout(self, zone, count):
+        """Turn off a zone's bulb once its on-duration has passed.
+
+        Args:
+            zone: The Zone whose bulb timer expired
+            count: The motion detection count that turned the bulb on
+        """
+        self.off_handles.pop(zone.name, None)
+        task = self.recognition_tasks.pop(zone.name, None)
+        if task:
+            task.cancel()
+        self._spawn(self._turn_off(zone))
+
+    async def _turn_off(self, zone):
+        """Turn off a zone's bulb and report it to Blynk, unless new motion has switched it on again.
+
+        Args:
+            zone: The Zone whose bulb is turned off
+        """
+        async with self.zone_locks[zone.name]:
+            # Motion that arrived before the lock was free started a new response with its own timer
+            if zone.name in self.off_handles:
+                return
+            logger.info("Turning off bulb in %s after %s seconds without motion", zone.name, config.BULB_ON_DURATION)
+            await self._io(zone.bulb.turn_off)
+        self.blynk_service.update_light_state(False, "none")
+
+    def _capture_and_process(self, zone, raw_capture, downsample):
+        """Capture one frame and recognize faces in it (runs on the CPU executor).
+
+        Args:
+            zone: The Zone whose camera is read
+            raw_capture: PiRGBArray buffer for the frame
+            downsample: Detection downsample factor
+
+        Returns:
+            tuple: (frame, process_frame results for the frame)
+        """
+        frame = zone.camera.capture_frame(raw_capture)
+        return frame, self.face_service.process_frame(
+            frame, self.registered_encodings, self.registered_info, downsample=downsample,
+            roi=zone.detection_roi, full_frame=zone.camera.full_frame_source(), upsample=zone.camera.detection_upsample()
+        )
+
+    async def _run_face_recognition(self, zone, count, video_stream, event):
+        """Run face recognition for a zone until someone is recognized or time runs out.
+
+        Args:
+            zone: The Zone whose camera and bulb are used
+            count: The motion detection count for this event
+            video_stream: Task of the camera's get_video_stream(), started when motion was detected
+            event: Journal entry for this motion event, completed and recorded here
+        """
+        event["t_recognition_start"] = time.time()
+        event["frames"] = 0
+        deadline = self.loop.time() + config.FACE_RECOGNITION_DURATION
+        recognized = False
+        logger.info("Starting face recognition for %s seconds", config.FACE_RECOGNITION_DURATION)
+
+        video_stream = await video_stream
+        if not video_stream:
+            logger.error("Failed to start video stream for face recognition")
+            event["outcome"] = "camera_unavailable"
+            self.journal.record("motion", **event)
+            return
+
+        _, raw_capture = video_stream
+        zone.led.on()
+        scheduler = FrameScheduler(max_downsample=zone.camera.max_detection_downsample())
+        full_frames = zone.camera.full_frame_source() is not None
+
+        # Kept as evidence if nobody is recognized
+        image = None
+        evidence_frame = None
+
+        try:
+            while self.loop.time() < deadline:
+                scheduler.frame_started()
+                image, results = await self.loop.run_in_executor(
+                    self.cpu_executor, self._capture_and_process, zone, raw_capture, scheduler.downsample
+                )
+                scheduler.frame_finished(face_found=bool(results))
+                if results:
+                    # Latest frame showing a face, at full resolution when one was grabbed to encode it
+                    evidence_frame = zone.camera.last_full_frame if full_frames else image
+                if event["frames"] == 0:
+                    event["t_first_frame"] = time.time()
+                    logger.info("First frame %.0f ms after motion", (event["t_first_frame"] - event["t_motion"]) * 1000)
+                event["frames"] += 1
+
+                strong_matches = [r for r in results if r[1] and r[3] < config.FACE_RECOGNITION_THRESHOLD]
+                if strong_matches:
+                    _, name, color, distance, gap = min(strong_matches, key=lambda r: r[3])
+                    recognized = True
+                    event.update(t_recognized=time.time(), name=name, color=color,
+                                 distance=float(distance), gap=float(gap))
+                    zone.remember_identity(name, color)
+
+                    if color == event.get("assumed_color"):
+                        logger.info("Recognized %s! Bulb already shows favorite color: %s", name, color)
+                    else:
+                        logger.info("Recognized %s! Setting bulb to favorite color: %s", name, color)
+                        rgb = config.SUPPORTED_COLORS.get(color.lower(), (100, 100, 100))
+                        await self._io(zone.bulb.set_color, *rgb)
+                    self.blynk_service.add_recognized_face(name)
+                    self.blynk_service.update_light_state(True, color)
+                    break
+
+                await asyncio.sleep(scheduler.next_delay())
+
+            if not recognized:
+                zone.forget_identity()
+                logger.info("No face recognized during the detection period")
+                await self._io(zone.bulb.set_color, 255, 0, 0)
+                self.blynk_service.update_light_state(True, "red")
+
+                # Save who was there; the writer drops the frame rather than making the loop wait
+                frame = evidence_frame if evidence_frame is not None else image
+                if frame is not None:
+                    snapshot = self.snapshots.submit(frame, prefix=f"unrecognized_{zone.name}")
+                    if snapshot:
+                        event["snapshot"] = snapshot
+            event["outcome"] = "recognized" if recognized else "unrecognized"
+        except asyncio.CancelledError:
+            event["outcome"] = "recognized" if recognized else "cancelled"
+            raise
+        finally:
+            zone.led.off()
+            event["t_recognition_end"] = time.time()
+            self.journal.record("motion", **event)
+            if self.recognition_tasks.get(zone.name) is asyncio.current_task():
+                del self.recognition_tasks[zone.name]
+            logger.info("Face recognition completed for motion #%d", count)
+
+
+def main():
+    """Main function to run the security system on the asyncio runtime."""
+    print("=" * 60)
+    print("Smart Security System (asyncio runtime)")
+    print("Motion-activated lighting with facial recognition")
+    print("=" * 60)
+
+    setup_logging()
+    try:
+        asyncio.run(AsyncSecuritySystem().run())
+    finally:
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+Benchmark Utility
+
+This script measures the performance of the face recognition pipeline on a stored
+image set so that settings can be chosen per site.
+
+Usage:
+    python benchmark.py detectors [--images DIR] [--annotations FILE] [--repeat N]
+    python benchmark.py encoders [--images DIR] [--repeat N]
+    python benchmark.py roi [--images DIR] [--roi JSON] [--zone NAME] [--repeat N]
+
+The image set defaults to the registered faces directory. Without an annotations
+file every image is assumed to contain exactly one face; an annotations file is
+a JSON object mapping image filenames to lists of [top, right, bottom, left] boxes.
+Identities are taken from the part of the filename before the first underscore,
+as for registered faces.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import face_recognition
+import config
+from face_detectors import DETECTORS, create_detector, box_overlap
+from face_recognition_service import FaceRecognitionService
+from roi import RegionOfInterest
+from logging_service import setup_logging
+
+
+def load_image_set(directory):
+    """Load all images in a directory as BGR arrays, matching live camera frames.
+
+    Args:
+        directory: Directory containing .jpg/.png images
+
+    Returns:
+        list: (filename, image) tuples
+    """
+    images = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.lower().endswith(('.jpg', '.png')):
+            rgb = face_recognition.load_image_file(os.path.join(directory, filename))
+            images.append((filename, np.ascontiguousarray(rgb[:, :, ::-1])))
+    return images
+
+
+def summarize_times(times):
+    """Summarize a list of durations.
+
+    Args:
+        times: Durations in seconds
+
+    Returns:
+        tuple: (mean_ms, p95_ms)
+    """
+    if not times:
+        return 0.0, 0.0
+    values = np.array(times) * 1000
+    return float(values.mean()), float(np.percentile(values, 95))
+
+
+def count_matches(detections, truth):
+    """Count ground-truth faces matched by a detection.
+
+    Args:
+        detections: Detected face locations
+        truth: Ground-truth face locations
+
+    Returns:
+        int: Number of ground-truth faces with a detection overlapping by at least 50%
+    """
+    return sum(1 for box in truth if any(box_overlap(box, found) >= 0.5 for found in detections))
+
+
+def bench_detectors(images, backends, annotations=None, repeat=3):
+    """Measure detection latency and recall for each detector backend.
+
+    Args:
+        images: (filename, image) tuples
+        backends: Names of the detector backends to compare
+        annotations: Optional mapping of filename to ground-truth boxes
+        repeat: Number of timed runs per image
+
+    Returns:
+        list: (backend, mean_ms, p95_ms, recall, detections) tuples
+    """
+    rows = []
+    for backend in backends:
+        try:
+            detector = create_detector(backend)
+        except (ImportError, ValueError) as e:
+            print(f"Skipping {backend}: {e}")
+            continue
+
+        times = []
+        found = 0
+        expected = 0
+        detections_total = 0
+        for filename, image in images:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                detections = detector.detect(image)
+                times.append(time.perf_counter() - start)
+
+            detections_total += len(detections)
+            if annotations is not None:
+                truth = [tuple(box) for box in annotations.get(filename, [])]
+                found += count_matches(detections, truth)
+                expected += len(truth)
+            else:
+                found += 1 if detections else 0
+                expected += 1
+
+        mean_ms, p95_ms = summarize_times(times)
+        recall = found / expected if expected else 0.0
+        rows.append((backend, mean_ms, p95_ms, recall, detections_total))
+    return rows
+
+
+def distance_stats(encodings, identities):
+    """Summarize match distances between images of the same and of different identities.
+
+    Args:
+        encodings: Face encodings, one per image
+        identities: Identity name of each encoding
+
+    Returns:
+        tuple: (mean same-identity distance, mean closest other-identity distance); None where undefined
+    """
+    if len(encodings) < 2:
+        return None, None
+
+    matrix = np.array(encodings)
+    distances = np.linalg.norm(matrix[:, None, :] - matrix[None, :, :], axis=2)
+    names = np.array(identities)
+    same = names[:, None] == names[None, :]
+    np.fill_diagonal(same, False)
+    other = names[:, None] != names[None, :]
+
+    same_mean = float(distances[same].mean()) if same.any() else None
+    closest_other = [distances[i][other[i]].min() for i in range(len(names)) if other[i].any()]
+    other_mean = float(np.mean(closest_other)) if closest_other else None
+    return same_mean, other_mean
+
+
+def bench_encoders(images, profiles, repeat=3):
+    """Measure per-face encode time and match distances for each encoder profile.
+
+    Args:
+        images: (filename, image) tuples
+        profiles: Names of the encoder profiles to compare
+        repeat: Number of timed live encodes per image
+
+    Returns:
+        list: (profile, live_ms, enrol_ms, same_distance, other_distance) tuples
+    """
+    # Detect once so every profile encodes exactly the same faces
+    faces = []
+    for filename, image in images:
+        locations = face_recognition.face_locations(image)
+        if locations:
+            faces.append((filename.split('_')[0], image, locations[:1]))
+
+    rows = []
+    for profile in profiles:
+        service = FaceRecognitionService(encoder_profile=profile)
+        live_times = []
+        enrol_times = []
+        encodings = []
+        identities = []
+
+        for identity, image, location in faces:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                service.encode_faces(image, location)
+                live_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            encodings.append(service.encode_faces(image, location, enrol=True)[0])
+            enrol_times.append(time.perf_counter() - start)
+            identities.append(identity)
+
+        same_distance, other_distance = distance_stats(encodings, identities)
+        rows.append((profile, summarize_times(live_times)[0], summarize_times(enrol_times)[0],
+                     same_distance, other_distance))
+    return rows
+
+
+def bench_roi(images, roi, detector=config.FACE_DETECTOR, repeat=3):
+    """Measure detection frame rate on whole frames and inside a region of interest.
+
+    Args:
+        images: (filename, image) tuples
+        roi: RegionOfInterest to compare against the whole frame
+        detector: Detector backend name
+        repeat: Number of timed runs per image
+
+    Returns:
+        list: (label, searched_fraction, mean_ms, p95_ms, fps, faces) tuples
+    """
+    service = FaceRecognitionService(detector=detector)
+    rows = []
+    for label, region in (("Whole frame", None), ("ROI", roi)):
+        times = []
+        faces = 0
+        for _, image in images:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                locations = service._detect_faces(image, roi=region)
+                times.append(time.perf_counter() - start)
+            faces += len(locations)
+
+        mean_ms, p95_ms = summarize_times(times)
+        searched = region.area_fraction(images[0][1].shape) if region else 1.0
+        rows.append((label, searched, mean_ms, p95_ms, 1000.0 / mean_ms if mean_ms else 0.0, faces))
+    return rows
+
+
+def print_table(headers, rows):
+    """Print rows as an aligned text table.
+
+    Args:
+        headers: Column headers
+        rows: Rows of already formatted cell strings
+    """
+    widths = [max(len(str(cell)) for cell in column) for column in zip(headers, *rows)]
+    print("  ".join(str(header).ljust(width) for header, width in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(str(cell).ljust(width) for cell, width in zip(row, widths)))
+
+
+def run_detectors(args):
+    """Run the detector benchmark."""
+    images = load_image_set(args.images)
+    if not images:
+        print(f"No images found in {args.images}")
+        return 1
+
+    annotations = None
+    if args.annotations:
+        with open(args.annotations) as annotations_file:
+            annotations = json.load(annotations_file)
+
+    print(f"Benchmarking {len(args.backends)} detector(s) on {len(images)} image(s)...")
+    rows = bench_detectors(images, args.backends, annotations, args.repeat)
+    print_table(
+        ["Backend", "Mean ms", "p95 ms", "Recall", "Detections"],
+        [(name, f"{mean:.1f}", f"{p95:.1f}", f"{recall:.0%}", count) for name, mean, p95, recall, count in rows],
+    )
+    return 0
+
+
+def run_encoders(args):
+    """Run the encoder profile benchmark."""
+    images = load_image_set(args.images)
+    if not images:
+        print(f"No images found in {args.images}")
+        return 1
+
+    def fmt_distance(value):
+        return f"{value:.3f}" if value is not None else "-"
+
+    print(f"Benchmarking {len(args.profiles)} encoder profile(s) on {len(images)} image(s)...")
+    rows = bench_encoders(images, args.profiles, args.repeat)
+    print_table(
+        ["Profile", "Live ms/face", "Enrol ms/face", "Same-person dist", "Closest other dist"],
+        [(name, f"{live:.1f}", f"{enrol:.1f}", fmt_distance(same), fmt_distance(other))
+         for name, live, enrol, same, other in rows],
+    )
+    return 0
+
+
+def run_roi(args):
+    """Run the region of interest benchmark."""
+    if args.roi:
+        roi = RegionOfInterest.from_config(json.loads(args.roi))
+    else:
+        zone_rois = {zone["name"]: zone.get("roi") for zone in config.ZONES}
+        roi = RegionOfInterest.from_config(zone_rois.get(args.zone or config.ZONES[0]["name"]))
+    if roi is None:
+        print("No region of interest given; use --roi or configure one for the zone")
+        return 1
+
+    images = load_image_set(args.images)
+    if not images:
+        print(f"No images found in {args.images}")
+        return 1
+
+    print(f"Benchmarking detection with and without ROI on {len(images)} image(s)...")
+    rows = bench_roi(images, roi, args.detector, args.repeat)
+    print_table(
+        ["Search area", "Frame %", "Mean ms", "p95 ms", "Frames/s", "Faces"],
+        [(label, f"{searched:.0%}", f"{mean:.1f}", f"{p95:.1f}", f"{fps:.1f}", faces)
+         for label, searched, mean, p95, fps, faces in rows],
+    )
+    return 0
+
+
+def main(argv=None):
+    """Main function to parse arguments and run a benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark the face recognition pipeline")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    detectors = subparsers.add_parser("detectors", help="Compare face detector backends")
+    detectors.add_argument("--images", default=config.REGISTERED_FACES_DIR, help="Image set directory")
+    detectors.add_argument("--annotations", help="JSON file with ground-truth face boxes per image")
+    detectors.add_argument("--backends", nargs="+", default=list(DETECTORS), help="Backends to compare")
+    detectors.add_argument("--repeat", type=int, default=3, help="Timed runs per image")
+    detectors.set_defaults(func=run_detectors)
+
+    encoders = subparsers.add_parser("encoders", help="Compare encoder profiles")
+    encoders.add_argument("--images", default=config.REGISTERED_FACES_DIR, help="Image set directory")
+    encoders.add_argument("--profiles", nargs="+", default=list(config.ENCODER_PROFILES), help="Profiles to compare")
+    encoders.add_argument("--repeat", type=int, default=3, help="Timed live encodes per image")
+    encoders.set_defaults(func=run_encoders)
+
+    roi = subparsers.add_parser("roi", help="Compare detection frame rate with and without a region of interest")
+    roi.add_argument("--images", default=config.REGISTERED_FACES_DIR, help="Image set directory")
+    roi.add_argument("--roi", help="Region as JSON: [x, y, width, height] or [[x, y], ...] (default: the zone's roi)")
+    roi.add_argument("--zone", help="Zone whose configured roi is used (default: the first zone)")
+    roi.add_argument("--detector", default=config.FACE_DETECTOR, choices=list(DETECTORS), help="Detector backend")
+    roi.add_argument("--repeat", type=int, default=3, help="Timed runs per image")
+    roi.set_defaults(func=run_roi)
+
+    args = parser.parse_args(argv)
+    # Show the face service's gallery and encoding messages on the console
+    setup_logging(directory="")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,16 @@
 """Blynk IoT cloud platform integration service using BlynkLib."""
 
 import BlynkLib
+import asyncio
+import logging
+import select
+import socket
 import threading
 import time
 import config
 
+logger = logging.getLogger(__name__)
+
 
 class BlynkService:
     """Service to manage communication with Blynk IoT platform."""
@@ -19,7 +25,10 @@ class BlynkService:
         self.blynk = None
         self.running = False
         self.thread = None
+        self.wakeup_receiver = None  # Socket pair used by stop() to wake the thread
+        self.wakeup_sender = None
         self.mode = "auto"  # Default mode is auto
+        self.profiler_callback = None  # Called with True/False when the profiler pin changes
         
         # Track the most recent recognized face
         self.latest_face = None  # Tuple of (name, timestamp)
@@ -33,12 +42,35 @@ class BlynkService:
     def start(self):
         """Start the Blynk service in a separate thread."""
         if self.running:
-            print("Blynk service is already running")
+            logger.warning("Blynk service is already running")
+            return False
+        
+        if not self._connect():
             return False
         
         try:
-            # Initialize Blynk with auth token
-            print(f"Connecting to Blynk using auth token: {self.auth_token}")
+            # Start the Blynk thread
+            self.wakeup_receiver, self.wakeup_sender = socket.socketpair()
+            self.running = True
+            self.thread = threading.Thread(target=self._blynk_thread)
+            self.thread.daemon = True
+            self.thread.start()
+            logger.info("🔵 Blynk service started successfully")
+            return True
+        except Exception as e:
+            logger.exception("Failed to start Blynk service: %s", e)
+            self.running = False
+            return False
+    
+    def _connect(self):
+        """Create the Blynk connection and register the virtual pin handlers.
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            # Initialize Blynk with auth token (not logged, log files are kept on disk)
+            logger.info("Connecting to Blynk")
             self.blynk = BlynkLib.Blynk(self.auth_token)
             
             # Register handler for mode control (V3)
@@ -46,46 +78,196 @@ class BlynkService:
             def handle_mode_write(value):
                 self._mode_write_handler(value)
             
-            # Start the Blynk thread
-            self.running = True
-            self.thread = threading.Thread(target=self._blynk_thread)
-            self.thread.daemon = True
-            self.thread.start()
-            print("🔵 Blynk service started successfully")
+            # Register handler for the sampling profiler switch (V4)
+            @self.blynk.on("V" + str(config.BLYNK_PROFILER_PIN))
+            def handle_profiler_write(value):
+                self._profiler_write_handler(value)
+            
             return True
         except Exception as e:
-            print(f"Failed to start Blynk service: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Failed to connect to Blynk: %s", e)
+            return False
+    
+    async def run_async(self, update_interval=config.BLYNK_UPDATE_INTERVAL, executor=None):
+        """Run the Blynk service as a coroutine on the running event loop.
+        
+        Inbound data is handled as soon as the socket becomes readable, at most
+        once per BLYNK_MIN_WAKE_INTERVAL, and the dashboard is refreshed every
+        update_interval seconds. If nothing arrived during an interval,
+        BlynkLib's keepalive and reconnect handling runs on the executor, since
+        its read blocks until the socket timeout. Cancel the task to stop the
+        service.
+        
+        Args:
+            update_interval: Seconds between dashboard refreshes
+            executor: Executor for blocking BlynkLib calls (default: the loop's default executor)
+        """
+        if not self._connect():
+            return
+        
+        loop = asyncio.get_running_loop()
+        readable = asyncio.Event()
+        self.running = True
+        watched = None
+        armed = False
+        last_wake = 0.0
+        last_run = next_refresh = loop.time()
+        logger.info("🔵 Blynk service running on the event loop")
+        
+        def on_readable(conn):
+            # One-shot until the data is handled, so a socket that stays readable cannot spin the loop
+            self._unwatch(loop, conn)
+            readable.set()
+        
+        try:
+            while self.running:
+                # BlynkLib replaces its socket when it reconnects, so follow it
+                conn = getattr(self.blynk, "conn", None)
+                if conn is not watched:
+                    if armed:
+                        self._unwatch(loop, watched)
+                    watched, armed = conn, False
+                if watched is not None and not armed:
+                    armed = self._watch(loop, watched, on_readable)
+                
+                pending = getattr(conn, "pending", None)
+                # Decrypted TLS data waits in the SSL object, where the selector cannot see it
+                has_data = bool(pending and pending())
+                if not has_data:
+                    try:
+                        await asyncio.wait_for(readable.wait(), max(0.0, next_refresh - loop.time()))
+                        has_data = True
+                    except asyncio.TimeoutError:
+                        pass
+                
+                if has_data:
+                    if readable.is_set():
+                        readable.clear()
+                        armed = False
+                    # A closed connection stays readable until BlynkLib notices, so cap the wake rate
+                    await asyncio.sleep(max(0.0, last_wake + config.BLYNK_MIN_WAKE_INTERVAL - loop.time()))
+                    last_wake = last_run = loop.time()
+                    self._run_once()
+                
+                if loop.time() >= next_refresh:
+                    if loop.time() - last_run >= update_interval:
+                        # Keepalive pings and reconnects
+                        await loop.run_in_executor(executor, self._run_once)
+                        last_run = loop.time()
+                        if readable.is_set():
+                            # Whatever woke the reader was read on the executor; re-arm it
+                            readable.clear()
+                            armed = False
+                    self._update_dashboard()
+                    next_refresh = loop.time() + update_interval
+        finally:
+            if armed:
+                self._unwatch(loop, watched)
             self.running = False
+            logger.info("Blynk service stopped")
+    
+    @staticmethod
+    def _watch(loop, conn, callback):
+        """Register a reader for the Blynk socket on the event loop.
+        
+        Returns:
+            bool: True if the reader was registered (False for a closed socket)
+        """
+        try:
+            loop.add_reader(conn, callback, conn)
+            return True
+        except (OSError, ValueError):
             return False
     
+    @staticmethod
+    def _unwatch(loop, conn):
+        """Remove the event loop reader of the Blynk socket."""
+        try:
+            loop.remove_reader(conn)
+        except (OSError, ValueError):
+            pass
+    
+    def _run_once(self):
+        """Process pending Blynk traffic once."""
+        try:
+            self.blynk.run()
+        except Exception as e:
+            logger.error("Error in Blynk event processing: %s", e)
+    
     def stop(self):
         """Stop the Blynk service."""
         self.running = False
+        if self.wakeup_sender:
+            self.wakeup_sender.send(b"\0")
         if self.thread and self.thread.is_alive():
             self.thread.join(timeout=2)
-        print("Blynk service stopped")
+        if self.wakeup_sender:
+            self.wakeup_sender.close()
+            self.wakeup_receiver.close()
+            self.wakeup_sender = self.wakeup_receiver = None
+        logger.info("Blynk service stopped")
     
-    def _blynk_thread(self):
-        """Thread function to run Blynk event loop and update dashboard."""
-        print("Blynk thread started")
-        update_interval = 2  # Update every 2 seconds
+    def _blynk_thread(self, update_interval=config.BLYNK_UPDATE_INTERVAL):
+        """Thread function that handles Blynk traffic as it arrives and refreshes the dashboard.
+        
+        The thread sleeps in select() until the Blynk socket becomes readable,
+        the next dashboard refresh is due or stop() wakes it, so a write from
+        the app is handled right away and an idle connection costs no CPU.
+        
+        Args:
+            update_interval: Seconds between dashboard refreshes
+        """
+        logger.info("Blynk thread started")
+        next_refresh = time.monotonic()
+        last_wake = 0.0
         
         try:
             while self.running:
-                # Run Blynk event processing
-                self.blynk.run()
+                now = time.monotonic()
+                if now >= next_refresh:
+                    # Keepalive pings and reconnects, then push the current state
+                    self._run_once()
+                    self._update_dashboard()
+                    next_refresh = now + update_interval
                 
-                # Update dashboard
-                self._update_dashboard()
+                conn = getattr(self.blynk, "conn", None)
+                pending = getattr(conn, "pending", None)
+                if pending and pending():
+                    # Decrypted TLS data waits in the SSL object, where select() cannot see it
+                    readable = True
+                else:
+                    readable = self._wait_readable(conn, next_refresh - time.monotonic())
                 
-                # Short delay to avoid high CPU usage
-                time.sleep(update_interval)
+                if readable and self.running:
+                    # A closed connection stays readable until BlynkLib notices, so cap the wake rate
+                    time.sleep(max(0.0, last_wake + config.BLYNK_MIN_WAKE_INTERVAL - time.monotonic()))
+                    last_wake = time.monotonic()
+                    self._run_once()
         except Exception as e:
-            print(f"Error in Blynk thread: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error in Blynk thread: %s", e)
+    
+    def _wait_readable(self, conn, timeout):
+        """Wait until the Blynk socket is readable, stop() is called or the timeout passes.
+        
+        Args:
+            conn: Blynk socket, or None while disconnected
+            timeout: Maximum seconds to wait
+            
+        Returns:
+            bool: True if the Blynk socket is readable
+        """
+        timeout = max(0.0, timeout)
+        watched = [self.wakeup_receiver] if conn is None else [self.wakeup_receiver, conn]
+        try:
+            readable, _, _ = select.select(watched, [], [], timeout)
+        except (OSError, ValueError):
+            # The socket was closed under us; wait for the next refresh to reconnect
+            readable, _, _ = select.select([self.wakeup_receiver], [], [], timeout)
+            conn = None
+        
+        if self.wakeup_receiver in readable:
+            self.wakeup_receiver.recv(64)
+        return conn is not None and conn in readable
     
     def _update_dashboard(self):
         """Update the Blynk dashboard with current system state."""
@@ -103,7 +285,7 @@ class BlynkService:
             latest_face_text = self._format_latest_face()
             self.blynk.virtual_write(config.BLYNK_FACES_PIN, latest_face_text)
         except Exception as e:
-            print(f"Error updating Blynk dashboard: {e}")
+            logger.error("Error updating Blynk dashboard: %s", e)
     
     def _format_latest_face(self):
         """Format the latest recognized face for display on Blynk."""
@@ -119,9 +301,26 @@ class BlynkService:
         try:
             mode_value = int(value[0])
             self.mode = "auto" if mode_value == 1 else "manual"
-            print(f"System mode changed to: {self.mode}")
+            logger.info("System mode changed to: %s", self.mode)
+        except Exception as e:
+            logger.error("Error in mode write handler: %s", e)
+    
+    def _profiler_write_handler(self, value):
+        """Handle the sampling profiler switch from the Blynk app."""
+        try:
+            enabled = int(value[0]) == 1
+            if self.profiler_callback:
+                self.profiler_callback(enabled)
         except Exception as e:
-            print(f"Error in mode write handler: {e}")
+            logger.error("Error in profiler write handler: %s", e)
+    
+    def set_profiler_callback(self, callback):
+        """Set the function called when the profiler switch changes.
+        
+        Args:
+            callback: Function taking True to start or False to stop profiling
+        """
+        self.profiler_callback = callback
     
     def update_light_state(self, power, color):
         """Update the light state (power and color).
@@ -144,7 +343,7 @@ class BlynkService:
                                   1 if power else 0)
             self.blynk.virtual_write(config.BLYNK_COLOR_PIN, color)
         except Exception as e:
-            print(f"Error immediately updating light state: {e}")
+            logger.error("Error immediately updating light state: %s", e)
     
     def add_recognized_face(self, name):
         """Add a recognized face and update the latest face.
@@ -154,14 +353,14 @@ class BlynkService:
         """
         current_time = time.time()
         self.latest_face = (name, current_time)
-        print(f"Updated latest recognized face to: {name}")
+        logger.info("Updated latest recognized face to: %s", name)
         
         # Immediately update the face display on Blynk
         try:
             latest_face_text = self._format_latest_face()
             self.blynk.virtual_write(config.BLYNK_FACES_PIN, latest_face_text)
         except Exception as e:
-            print(f"Error immediately updating latest face: {e}")
+            logger.error("Error immediately updating latest face: %s", e)
     
     def get_operation_mode(self):
         """Get the current operation mode.
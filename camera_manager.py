@@ -1,27 +1,77 @@
 """Camera management module for the Raspberry Pi Camera."""
 
+import math
 import time
+import logging
+import threading
 from picamera import PiCamera
 from picamera.array import PiRGBArray
 import config
 
+logger = logging.getLogger(__name__)
+
 
 class CameraManager:
     """Class to manage PiCamera operations."""
     
-    def __init__(self, resolution=config.CAMERA_RESOLUTION, rotation=config.CAMERA_ROTATION, framerate=config.CAMERA_FRAMERATE):
+    def __init__(self, resolution=config.CAMERA_RESOLUTION, rotation=config.CAMERA_ROTATION, framerate=config.CAMERA_FRAMERATE,
+                 camera_num=0, detection_resolution=config.CAMERA_DETECTION_RESOLUTION):
         """Initialize the camera with specified settings.
         
         Args:
             resolution: Camera resolution as (width, height) tuple
             rotation: Camera rotation in degrees
             framerate: Camera frame rate for video
+            camera_num: Camera port index (for boards with more than one camera connector)
+            detection_resolution: (width, height) the camera resizes video stream frames to,
+                                  or None to stream full-resolution frames
         """
         self.camera = None
+        self.camera_num = camera_num
         self.resolution = resolution
         self.rotation = rotation
         self.framerate = framerate
+        self.detection_resolution = detection_resolution
         self.is_initialized = False
+        
+        # Buffer for full-resolution grabs, shared by the threads that request them
+        self.full_capture = None
+        self.full_capture_lock = threading.Lock()
+        self.last_full_frame = None  # Most recent full-resolution grab
+    
+    def max_detection_downsample(self, max_downsample=config.RECOGNITION_MAX_DOWNSAMPLE):
+        """Get the largest downsample factor the frame scheduler may apply to detection frames.
+        
+        The detection stream is already shrunk by the GPU, so the scheduler's
+        factor is reduced accordingly; detection never runs on frames smaller
+        than max_downsample would make full-resolution frames.
+        
+        Args:
+            max_downsample: Largest factor allowed for full-resolution frames
+            
+        Returns:
+            int: Largest downsample factor for this camera's detection frames (1 disables downsampling)
+        """
+        if not self.detection_resolution:
+            return max_downsample
+        return max(1, int(max_downsample * self.detection_resolution[0] / self.resolution[0]))
+    
+    def detection_upsample(self, upsample=config.HOG_UPSAMPLE):
+        """Get the HOG upsampling passes for this camera's detection frames.
+        
+        Each halving of the detection stream halves the smallest face HOG can
+        find, so one pass is added per halving to keep the range of detecting
+        on full-resolution frames.
+        
+        Args:
+            upsample: Upsampling passes used on full-resolution frames
+            
+        Returns:
+            int: Upsampling passes for the detection frames
+        """
+        if not self.detection_resolution:
+            return upsample
+        return upsample + max(0, round(math.log2(self.resolution[0] / self.detection_resolution[0])))
     
     def initialize(self):
         """Initialize the camera and get it ready for capturing.
@@ -33,16 +83,16 @@ class CameraManager:
             return True
             
         try:
-            self.camera = PiCamera()
+            self.camera = PiCamera(camera_num=self.camera_num)
             self.camera.resolution = self.resolution
             self.camera.rotation = self.rotation
             self.camera.framerate = self.framerate
-            print("Camera initialized. Warming up...")
+            logger.info("Camera initialized. Warming up...")
             time.sleep(config.CAMERA_WARMUP_TIME)
             self.is_initialized = True
             return True
         except Exception as e:
-            print(f"Error initializing camera: {e}")
+            logger.error("Error initializing camera: %s", e)
             return False
     
     def capture_image(self, filename):
@@ -59,15 +109,18 @@ class CameraManager:
             
         try:
             self.camera.capture(filename)
-            print(f"Image captured and saved as {filename}")
+            logger.info("Image captured and saved as %s", filename)
             return True
         except Exception as e:
-            print(f"Error capturing image: {e}")
+            logger.error("Error capturing image: %s", e)
             return False
     
     def get_video_stream(self):
         """Get a video stream from the camera.
         
+        The stream delivers frames at the detection resolution when one is
+        configured; use capture_frames() or capture_frame() to read it.
+        
         Returns:
             tuple: (camera, rawCapture) objects for video streaming
             None: If initialization fails
@@ -77,14 +130,89 @@ class CameraManager:
             
         try:
             # Initialize the array for holding the frames
-            rawCapture = PiRGBArray(self.camera, size=self.resolution)
+            rawCapture = PiRGBArray(self.camera, size=self.detection_resolution or self.resolution)
             # Allow the camera to warmup
             time.sleep(config.CAMERA_WARMUP_TIME)
             return self.camera, rawCapture
         except Exception as e:
-            print(f"Error setting up video stream: {e}")
+            logger.error("Error setting up video stream: %s", e)
             return None
     
+    def close_video_stream(self, video_stream):
+        """Release a stream from get_video_stream() that will not be read.
+        
+        Args:
+            video_stream: (camera, rawCapture) tuple, or None if the stream failed to start
+        """
+        if video_stream is None:
+            return
+        _, rawCapture = video_stream
+        try:
+            rawCapture.close()
+        except Exception as e:
+            logger.error("Error closing video stream: %s", e)
+    
+    def _stream_options(self):
+        """Get the capture options of the video stream."""
+        if not self.detection_resolution:
+            return {"use_video_port": True}
+        # The GPU resizes frames on their own splitter port, so the CPU never sees full-resolution frames
+        return {"use_video_port": True, "resize": self.detection_resolution,
+                "splitter_port": config.CAMERA_DETECTION_SPLITTER_PORT}
+    
+    def capture_frames(self, rawCapture):
+        """Continuously capture video stream frames.
+        
+        Args:
+            rawCapture: Buffer returned by get_video_stream()
+            
+        Returns:
+            iterator: Frames from capture_continuous, each with the image in .array
+        """
+        return self.camera.capture_continuous(rawCapture, format="bgr", **self._stream_options())
+    
+    def capture_frame(self, rawCapture):
+        """Capture a single video stream frame into a buffer.
+        
+        Args:
+            rawCapture: Buffer returned by get_video_stream()
+            
+        Returns:
+            numpy.ndarray: The captured BGR frame
+        """
+        rawCapture.truncate(0)
+        rawCapture.seek(0)
+        self.camera.capture(rawCapture, format="bgr", **self._stream_options())
+        return rawCapture.array
+    
+    def capture_full_frame(self):
+        """Grab one full-resolution BGR frame from the video port.
+        
+        Uses its own splitter port, so it can be called while the detection
+        stream is running.
+        
+        Returns:
+            numpy.ndarray: The captured frame
+        """
+        with self.full_capture_lock:
+            if self.full_capture is None:
+                self.full_capture = PiRGBArray(self.camera, size=self.resolution)
+            self.full_capture.truncate(0)
+            self.full_capture.seek(0)
+            self.camera.capture(self.full_capture, format="bgr", use_video_port=True,
+                                splitter_port=config.CAMERA_STILL_SPLITTER_PORT)
+            self.last_full_frame = self.full_capture.array
+            return self.last_full_frame
+    
+    def full_frame_source(self):
+        """Get the function that grabs full-resolution frames for encoding.
+        
+        Returns:
+            callable: capture_full_frame when the stream is resized, otherwise
+                      None (stream frames are already full resolution)
+        """
+        return self.capture_full_frame if self.detection_resolution else None
+    
     def close(self):
         """Close the camera and release resources."""
         if not self.is_initialized:
@@ -92,7 +220,8 @@ class CameraManager:
             
         try:
             self.camera.close()
+            self.full_capture = None
             self.is_initialized = False
-            print("Camera closed.")
+            logger.info("Camera closed.")
         except Exception as e:
-            print(f"Error closing camera: {e}") 
\ No newline at end of file
+            logger.error("Error closing camera: %s", e) 
\ No newline at end of file
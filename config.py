@@ -14,12 +14,20 @@ LOCAL_KEY = os.getenv('LOCAL_KEY', '')
 LIGHT_THRESHOLD = 500  # Below this value, the environment is considered dark
 BULB_ON_DURATION = 60  # Duration in seconds to keep the bulb on (1 minute)
 FACE_RECOGNITION_DURATION = 30  # Duration in seconds to run face recognition
+RECENT_IDENTITY_TTL = 300  # Seconds after a recognition in which motion in the same zone assumes the same person (0 disables)
 
 # Camera settings
 CAMERA_RESOLUTION = (640, 480)
 CAMERA_ROTATION = 180
 CAMERA_WARMUP_TIME = 2  # seconds
 CAMERA_FRAMERATE = 30   # frames per second for video
+# Faces are detected on a stream resized by the camera's GPU and encoded on a full-resolution
+# grab taken only when a face was found. Width must be a multiple of 32 and height of 16;
+# None detects on full-resolution frames. Halving the size halves the smallest face found,
+# so HOG runs one more upsampling pass per halving on this stream than HOG_UPSAMPLE.
+CAMERA_DETECTION_RESOLUTION = (320, 240)
+CAMERA_DETECTION_SPLITTER_PORT = 1  # Video splitter port of the detection stream
+CAMERA_STILL_SPLITTER_PORT = 2      # Video splitter port of the full-resolution grabs
 
 # GPIO pin configurations
 PIR_SENSOR_PIN = 5
@@ -44,6 +52,9 @@ BLYNK_LIGHT_STATE_PIN = 0  # V0 - Light state (ON/OFF)
 BLYNK_COLOR_PIN = 1        # V1 - Current light color
 BLYNK_FACES_PIN = 2        # V2 - Recognized faces
 BLYNK_MODE_PIN = 3         # V3 - Mode selection (auto/manual) 
+BLYNK_PROFILER_PIN = 4     # V4 - Sampling profiler on/off
+BLYNK_UPDATE_INTERVAL = 2        # Seconds between dashboard refreshes
+BLYNK_MIN_WAKE_INTERVAL = 0.05   # Minimum seconds between wakeups for inbound data (bounds CPU if the socket stays readable)
 
 # Supported RGB color values
 SUPPORTED_COLORS = {
@@ -57,4 +68,131 @@ SUPPORTED_COLORS = {
     "purple": (128, 0, 128),
     "orange": (255, 165, 0),
     "pink": (255, 192, 203)
-}
\ No newline at end of file
+}
+
+# Event journal settings
+JOURNAL_DIR = "journal"
+JOURNAL_FILENAME = "events.jsonl"
+JOURNAL_MAX_BYTES = 5 * 1024 * 1024  # Rotate the active journal file after 5 MB
+JOURNAL_BACKUP_COUNT = 5             # Number of rotated journal files to keep
+JOURNAL_BATCH_SIZE = 50              # Events written per batch
+JOURNAL_FLUSH_INTERVAL = 5           # Maximum seconds an event stays buffered
+JOURNAL_MAX_PENDING = 1000           # Buffered events beyond this are dropped
+
+# Logging
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")  # Per-frame messages are logged at DEBUG
+LOG_LEVELS = {}                             # Per-module overrides, e.g. {"face_recognition_service": "DEBUG"}
+LOG_DIR = "logs"                            # "" logs to the console only
+LOG_FILENAME = "security.log"
+LOG_MAX_BYTES = 1024 * 1024                 # Rotate the log file after 1 MB
+LOG_BACKUP_COUNT = 3                        # Number of rotated log files to keep
+LOG_MAX_PENDING = 1000                      # Queued records beyond this are dropped
+LOG_RATE_LIMIT_INTERVAL = 10                # Seconds of each rate limiting window
+LOG_RATE_LIMIT_BURST = 5                    # Records with the same message let through per window (0 disables)
+
+# Recognition frame scheduling
+RECOGNITION_TARGET_FPS = 5         # Target processed frames per second during recognition
+RECOGNITION_CPU_BUDGET = 0.8       # Fraction of one CPU core the recognition loop may use
+RECOGNITION_MAX_DOWNSAMPLE = 4     # Largest factor by which frames are shrunk for face detection
+RECOGNITION_BOOST_DURATION = 3     # Seconds to process frames without delay after a face first appears
+
+# Monitored zones. Each zone has its own PIR sensor, light sensor, LED, camera and bulb,
+# and all zones share one loaded face gallery and recognition worker pool.
+# Add a dictionary per entrance, e.g. {"name": "side_gate", "pir_pin": 16, "led_pin": 22,
+# "light_channel": 2, "camera_num": 1, "device_id": ..., "device_ip": ..., "local_key": ...}
+ZONES = [
+    {
+        "name": "front_door",
+        "pir_pin": PIR_SENSOR_PIN,
+        "led_pin": LED_PIN,
+        "light_adc_address": 0x08,
+        "light_channel": 0,
+        "camera_num": 0,
+        "device_id": DEVICE_ID,
+        "device_ip": DEVICE_IP,
+        "local_key": LOCAL_KEY,
+        # Several bulbs switched together, replacing the three keys above, e.g.
+        # [{"device_id": ..., "device_ip": ..., "local_key": ...}, ...]
+        "bulbs": None,
+        # Part of the frame searched for faces: [x, y, width, height], a list of
+        # [x, y] polygon points, or None for the whole frame
+        "roi": None,
+    },
+]
+RECOGNITION_WORKERS = 1  # Recognition worker threads shared by all zones
+
+# Central recognition server (leave RECOGNITION_SERVER_HOST empty to recognize locally)
+RECOGNITION_SERVER_HOST = os.getenv('RECOGNITION_SERVER_HOST', '')
+RECOGNITION_SERVER_PORT = int(os.getenv('RECOGNITION_SERVER_PORT', 5055))
+RECOGNITION_SERVER_MODE = "crop"          # "crop" sends face crops, "encoding" sends local encodings
+RECOGNITION_SERVER_TIMEOUT = 2            # Seconds to wait for the server before recognizing locally
+RECOGNITION_SERVER_RETRY_INTERVAL = 30    # Seconds before reconnecting after the server was unreachable
+# Address recognition_server.py listens on. The protocol has no authentication, so only
+# listen on a trusted network interface (e.g. the LAN address of the gallery host)
+RECOGNITION_SERVER_LISTEN = os.getenv('RECOGNITION_SERVER_LISTEN', '127.0.0.1')
+RECOGNITION_SERVER_MAX_HEADER = 64 * 1024        # Largest JSON message header accepted, in bytes
+RECOGNITION_SERVER_MAX_PAYLOAD = 4 * 1024 * 1024  # Largest message payload accepted (a full 640x480 frame is 0.9 MB)
+
+# Face detector backend: "hog" (dlib HOG), "cascade" (OpenCV Haar/LBP cascade) or
+# "cascade_hog" (cascade pre-filter, HOG only on candidate regions). Cascades require OpenCV.
+FACE_DETECTOR = "hog"
+HOG_UPSAMPLE = 1                      # Passes on full-resolution frames; each halves the smallest face HOG finds
+                                      # (about 80 px with none). Detection streams add one per halving
+FACE_CASCADE_PATH = ""                # Haar or LBP cascade XML; empty uses OpenCV's frontal face Haar cascade
+FACE_CASCADE_SCALE_FACTOR = 1.1
+FACE_CASCADE_MIN_NEIGHBORS = 5
+FACE_CASCADE_MIN_SIZE = (30, 30)
+FACE_PREFILTER_MARGIN = 0.3           # Candidate padding (fraction of face size) searched by HOG
+FACE_PREFILTER_MIN_NEIGHBORS = 2      # Lenient cascade setting so the pre-filter rarely misses a face
+
+# Face encoder profiles. "model" selects the landmark model ("small" = 5-point, "large" = 68-point);
+# jitters are how many times each face is re-sampled when encoding (1 = no jitter).
+ENCODER_PROFILES = {
+    "fast": {"model": "small", "enrol_jitters": 1, "live_jitters": 1},
+    "accurate": {"model": "large", "enrol_jitters": 10, "live_jitters": 1},
+}
+ENCODER_PROFILE = "fast"  # "fast" matches the face_recognition defaults; "accurate" is slower
+GALLERY_ENCODINGS_FILE = "encodings.json"  # Stored gallery encodings inside REGISTERED_FACES_DIR
+
+# Face crop encoding cache (near-duplicate crops reuse the previous encoding and match)
+FACE_CACHE_SIZE = 32                  # Maximum cached crops (0 disables the cache)
+FACE_CACHE_TTL = 2.0                  # Seconds a cached crop stays valid
+FACE_CACHE_MAX_HAMMING = 4            # Maximum differing bits of the 64-bit crop hash
+FACE_CACHE_GEOMETRY_TOLERANCE = 0.15  # Allowed box shift/size change as a fraction of the face size
+
+# Face quality gate (faces failing these checks are not encoded)
+FACE_QUALITY_GATE = True              # Set to False to encode every detected face
+FACE_QUALITY_MIN_SIZE = 40            # Minimum face box width/height in pixels
+FACE_QUALITY_MIN_SHARPNESS = 15.0     # Minimum Laplacian variance of the grayscale face crop
+FACE_QUALITY_MIN_BRIGHTNESS = 30      # Minimum mean brightness of the face crop (0-255)
+FACE_QUALITY_MAX_BRIGHTNESS = 230     # Maximum mean brightness of the face crop (0-255)
+FACE_QUALITY_MAX_YAW = 0.5            # Maximum nose offset from the eye midpoint / eye distance (None disables)
+
+# Asynchronous bulb commands
+BULB_CONFIRM_DELAY = 0.5    # Seconds to wait before reading back the bulb state
+BULB_MAX_RETRIES = 2        # Times a command is resent if the bulb state does not match
+BULB_COLOR_TOLERANCE = 16   # Allowed per-channel RGB difference when confirming a color
+
+# Asyncio runtime (async_runtime.py)
+ASYNC_IO_WORKERS = 4  # Threads for blocking device calls (bulb connect, camera setup and ADC run concurrently)
+
+# PIR debouncing
+PIR_REFRACTORY_PERIOD = 5   # Minimum seconds between delivered motion events while motion continues
+PIR_QUIET_PERIOD = 10       # Seconds without a PIR trigger after which motion has ended
+
+# Evidence snapshots of unrecognized visitors
+SNAPSHOT_DIR = "snapshots"     # Directory for snapshot JPEGs
+SNAPSHOT_QUOTA_MB = 200        # Oldest snapshots are deleted beyond this total size
+SNAPSHOT_MAX_PENDING = 4       # Frames waiting to be written before new ones are dropped
+SNAPSHOT_JPEG_QUALITY = 85
+
+# Scenario trace recording (replayed with replay.py)
+TRACE_RECORD_DIR = os.getenv("TRACE_RECORD_DIR", "")  # Empty disables recording
+TRACE_MAX_FRAME_RATE = 2    # Maximum frames per second stored per zone
+TRACE_MAX_PENDING = 200     # Queued trace events before new ones are dropped
+
+# On-demand sampling profiler (SIGUSR1 starts, SIGUSR2 stops, or Blynk V4)
+PROFILER_DIR = "profiles"        # Directory for collapsed-stack profiles
+PROFILER_INTERVAL = 0.02         # Seconds between stack samples
+PROFILER_MAX_DEPTH = 64          # Maximum frames kept per stack
+PROFILER_MAX_DURATION = 600      # Seconds after which a profile stops on its own
@@ -0,0 +1,145 @@
+"""Append-only event journal for recording security system events."""
+
+import os
+import json
+import logging
+import time
+import queue
+import threading
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class EventJournal:
+    """Append-only JSON-lines journal that buffers writes and flushes them in batches.
+
+    Events are put on an in-memory queue by the caller and written to disk by a
+    background thread, so recording an event never waits on the SD card. The
+    active file is rotated once it exceeds ``max_bytes`` and at most
+    ``backup_count`` rotated files are kept.
+    """
+
+    def __init__(self, directory=config.JOURNAL_DIR, filename=config.JOURNAL_FILENAME,
+                 max_bytes=config.JOURNAL_MAX_BYTES, backup_count=config.JOURNAL_BACKUP_COUNT,
+                 batch_size=config.JOURNAL_BATCH_SIZE, flush_interval=config.JOURNAL_FLUSH_INTERVAL,
+                 max_pending=config.JOURNAL_MAX_PENDING):
+        """Initialize the event journal.
+
+        Args:
+            directory: Directory where journal files are stored
+            filename: Name of the active journal file
+            max_bytes: Size in bytes after which the active file is rotated
+            backup_count: Number of rotated files to keep
+            batch_size: Number of events written per batch
+            flush_interval: Maximum time in seconds an event waits before being flushed
+            max_pending: Maximum number of buffered events (newer events are dropped beyond this)
+        """
+        self.directory = directory
+        self.path = os.path.join(directory, filename)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.thread = None
+        self.running = False
+        self.dropped = 0
+        self.written = 0
+
+    def start(self):
+        """Start the background writer thread."""
+        if self.running:
+            return
+
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+            logger.info("Created directory for event journal: %s", self.directory)
+
+        self.running = True
+        self.thread = threading.Thread(target=self._writer_thread)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """Stop the writer thread after flushing all buffered events."""
+        if not self.running:
+            return
+        self.running = False
+        # Wakes the writer at once; it writes everything queued before it and exits
+        self.queue.put(None)
+        if self.thread and self.thread.is_alive():
+            self.thread.join()
+        logger.info("Event journal stopped (%d written, %d dropped)", self.written, self.dropped)
+
+    def record(self, event_type, **fields):
+        """Record an event without blocking.
+
+        Args:
+            event_type: Type of the event (e.g. 'motion', 'bulb')
+            **fields: Additional JSON-serializable fields for the event
+
+        Returns:
+            bool: True if the event was buffered, False if it was dropped
+        """
+        event = {"ts": time.time(), "event": event_type}
+        event.update(fields)
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _writer_thread(self):
+        """Thread function that drains the queue and writes events in batches."""
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.time() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                try:
+                    event = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if event is None:
+                    # Stop marker from stop(), queued after every recorded event
+                    stopping = True
+                    break
+                batch.append(event)
+
+            if batch:
+                self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        """Append a batch of events to the journal file.
+
+        Args:
+            batch: List of event dictionaries
+        """
+        try:
+            data = "".join(json.dumps(event, separators=(",", ":")) + "\n" for event in batch)
+            with open(self.path, "a") as journal_file:
+                journal_file.write(data)
+            self.written += len(batch)
+
+            if os.path.getsize(self.path) >= self.max_bytes:
+                self._rotate()
+        except Exception as e:
+            logger.error("Error writing event journal: %s", e)
+
+    def _rotate(self):
+        """Rotate the active journal file, keeping at most backup_count old files."""
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
@@ -0,0 +1,147 @@
+"""Bounded cache of face encodings keyed by a perceptual hash of the face crop."""
+
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+import config
+
+
+def crop_hash(image, location):
+    """Compute a 64-bit difference hash of a face crop.
+
+    The crop is converted to grayscale and averaged down to a 9x8 grid; each bit
+    records whether a cell is brighter than its left neighbour. Small changes in
+    lighting, noise or position barely change the hash.
+
+    Args:
+        image: Image containing the face
+        location: Face location as (top, right, bottom, left)
+
+    Returns:
+        int: 64-bit hash of the crop
+    """
+    top, right, bottom, left = location
+    crop = image[max(0, top):bottom, max(0, left):right]
+    gray = crop.mean(axis=2) if crop.ndim == 3 else crop.astype(np.float64)
+    height, width = gray.shape
+
+    # Area-average the crop into an 8-row by 9-column grid
+    rows = np.linspace(0, height, 9).astype(int)
+    cols = np.linspace(0, width, 10).astype(int)
+    sums = np.add.reduceat(np.add.reduceat(gray, rows[:-1], axis=0), cols[:-1], axis=1)
+    counts = np.outer(np.maximum(np.diff(rows), 1), np.maximum(np.diff(cols), 1))
+    grid = sums / counts
+
+    bits = (grid[:, 1:] > grid[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+class FaceCropCache:
+    """LRU cache returning the encoding and match result of near-duplicate face crops.
+
+    Two crops are considered the same face when their hashes differ in at most
+    ``max_hamming`` bits and their boxes have nearly the same centre and size.
+    Entries expire after ``ttl`` seconds so a new person stepping into the same
+    spot is always encoded again.
+    """
+
+    def __init__(self, size=config.FACE_CACHE_SIZE, ttl=config.FACE_CACHE_TTL,
+                 max_hamming=config.FACE_CACHE_MAX_HAMMING, geometry_tolerance=config.FACE_CACHE_GEOMETRY_TOLERANCE):
+        """Initialize the cache.
+
+        Args:
+            size: Maximum number of cached crops (0 disables the cache)
+            ttl: Seconds a cached crop stays valid
+            max_hamming: Maximum number of differing hash bits for a near-duplicate
+            geometry_tolerance: Allowed box centre shift and size change, as a fraction of the box size
+        """
+        self.size = size
+        self.ttl = ttl
+        self.max_hamming = max_hamming
+        self.geometry_tolerance = geometry_tolerance
+        self.entries = OrderedDict()  # key -> (hash, location, encoding, result, timestamp)
+        self.next_key = 0
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _same_geometry(self, box1, box2):
+        """Check whether two face boxes have nearly the same centre and size."""
+        size1 = max(box1[2] - box1[0], 1)
+        size2 = max(box2[2] - box2[0], 1)
+        if abs(size1 - size2) > self.geometry_tolerance * size1:
+            return False
+        shift = max(abs((box1[0] + box1[2]) - (box2[0] + box2[2])), abs((box1[1] + box1[3]) - (box2[1] + box2[3]))) / 2
+        return shift <= self.geometry_tolerance * size1
+
+    def get(self, image, location):
+        """Look up a face crop.
+
+        Args:
+            image: Image containing the face
+            location: Face location as (top, right, bottom, left)
+
+        Returns:
+            tuple: (crop_hash, cached) where cached is (encoding, result) for a
+                   near-duplicate crop or None on a miss
+        """
+        if self.size <= 0:
+            return None, None
+
+        fingerprint = crop_hash(image, location)
+        now = time.time()
+        with self.lock:
+            for key, (cached_hash, cached_location, encoding, result, timestamp) in list(self.entries.items()):
+                if now - timestamp > self.ttl:
+                    del self.entries[key]
+                    self.evictions += 1
+                    continue
+                if (bin(fingerprint ^ cached_hash).count("1") <= self.max_hamming
+                        and self._same_geometry(location, cached_location)):
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return fingerprint, (encoding, result)
+            self.misses += 1
+        return fingerprint, None
+
+    def put(self, fingerprint, location, encoding, result):
+        """Add a face crop to the cache.
+
+        Args:
+            fingerprint: Crop hash returned by get()
+            location: Face location as (top, right, bottom, left)
+            encoding: Face encoding of the crop
+            result: Recognition result (name, color, distance, gap)
+        """
+        if self.size <= 0 or fingerprint is None:
+            return
+
+        with self.lock:
+            self.entries[self.next_key] = (fingerprint, location, encoding, result, time.time())
+            self.next_key += 1
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove all cached crops (e.g. after the gallery changed)."""
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """Get cache counters.
+
+        Returns:
+            dict: Hit, miss and eviction counts, current size and hit rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
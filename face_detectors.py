@@ -0,0 +1,172 @@
+"""Face detector backends used by the face recognition service."""
+
+import face_recognition
+import config
+
+
+class HogDetector:
+    """Face detector using dlib's HOG model through face_recognition."""
+
+    name = "hog"
+
+    def __init__(self, upsample=config.HOG_UPSAMPLE):
+        """Initialize the HOG detector.
+
+        Args:
+            upsample: Number of times to upsample the image when looking for faces
+        """
+        self.upsample = upsample
+
+    def detect(self, image, upsample=None):
+        """Detect faces in an image.
+
+        Args:
+            image: Image as a numpy array
+            upsample: Upsampling passes for this image, overriding the detector's own
+
+        Returns:
+            list: Face locations as (top, right, bottom, left) tuples
+        """
+        if upsample is None:
+            upsample = self.upsample
+        return face_recognition.face_locations(image, number_of_times_to_upsample=upsample)
+
+
+class CascadeDetector:
+    """Face detector using an OpenCV Haar or LBP cascade."""
+
+    name = "cascade"
+
+    def __init__(self, cascade_path=config.FACE_CASCADE_PATH, scale_factor=config.FACE_CASCADE_SCALE_FACTOR,
+                 min_neighbors=config.FACE_CASCADE_MIN_NEIGHBORS, min_size=config.FACE_CASCADE_MIN_SIZE):
+        """Initialize the cascade detector.
+
+        Args:
+            cascade_path: Path to a Haar or LBP cascade XML file (defaults to OpenCV's frontal face Haar cascade)
+            scale_factor: Image pyramid scale step used by detectMultiScale
+            min_neighbors: Number of neighbouring detections required to keep a face
+            min_size: Smallest face size as (width, height)
+        """
+        try:
+            import cv2
+        except ImportError:
+            raise ImportError("OpenCV is required for cascade face detection. Install it with: pip install opencv-python-headless")
+
+        self.cv2 = cv2
+        if not cascade_path:
+            cascade_path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+        self.classifier = cv2.CascadeClassifier(cascade_path)
+        if self.classifier.empty():
+            raise ValueError(f"Could not load face cascade from {cascade_path}")
+
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = tuple(min_size)
+
+    def detect(self, image, upsample=None):
+        """Detect faces in an image.
+
+        Args:
+            image: Image as a numpy array (colour or grayscale)
+            upsample: Unused; the cascade searches every scale down to min_size
+
+        Returns:
+            list: Face locations as (top, right, bottom, left) tuples
+        """
+        gray = image if image.ndim == 2 else self.cv2.cvtColor(image, self.cv2.COLOR_BGR2GRAY)
+        faces = self.classifier.detectMultiScale(
+            gray,
+            scaleFactor=self.scale_factor,
+            minNeighbors=self.min_neighbors,
+            minSize=self.min_size,
+        )
+        return [(int(y), int(x + w), int(y + h), int(x)) for x, y, w, h in faces]
+
+
+class CascadePrefilterDetector:
+    """Cascade used as a cheap pre-filter, with HOG confirming candidate regions.
+
+    The cascade runs with lenient settings over the whole image to find candidate
+    regions; HOG then only searches a padded window around each candidate. Faces
+    the cascade misses are not found, but frames without candidates cost only
+    the cascade pass.
+    """
+
+    name = "cascade_hog"
+
+    def __init__(self, margin=config.FACE_PREFILTER_MARGIN, min_neighbors=config.FACE_PREFILTER_MIN_NEIGHBORS):
+        """Initialize the pre-filter detector.
+
+        Args:
+            margin: Fraction of the candidate size added on each side before running HOG
+            min_neighbors: Cascade min_neighbors used for candidates (lower finds more candidates)
+        """
+        self.cascade = CascadeDetector(min_neighbors=min_neighbors)
+        self.hog = HogDetector()
+        self.margin = margin
+
+    def detect(self, image, upsample=None):
+        """Detect faces in an image.
+
+        Args:
+            image: Image as a numpy array
+            upsample: Unused; candidate regions are searched with the HOG detector's own upsampling
+
+        Returns:
+            list: Face locations as (top, right, bottom, left) tuples
+        """
+        height, width = image.shape[:2]
+        faces = []
+
+        for top, right, bottom, left in self.cascade.detect(image):
+            pad = int((bottom - top) * self.margin)
+            region_top, region_left = max(0, top - pad), max(0, left - pad)
+            region = image[region_top:min(height, bottom + pad), region_left:min(width, right + pad)]
+
+            for r_top, r_right, r_bottom, r_left in self.hog.detect(region):
+                face = (r_top + region_top, r_right + region_left, r_bottom + region_top, r_left + region_left)
+                # Overlapping candidate regions can yield the same face twice
+                if all(box_overlap(face, existing) < 0.5 for existing in faces):
+                    faces.append(face)
+
+        return faces
+
+
+def box_overlap(box1, box2):
+    """Compute the intersection over union of two face boxes.
+
+    Args:
+        box1: Face location as (top, right, bottom, left)
+        box2: Face location as (top, right, bottom, left)
+
+    Returns:
+        float: Intersection over union (0-1)
+    """
+    top, right = max(box1[0], box2[0]), min(box1[1], box2[1])
+    bottom, left = min(box1[2], box2[2]), max(box1[3], box2[3])
+    intersection = max(0, right - left) * max(0, bottom - top)
+    area1 = (box1[1] - box1[3]) * (box1[2] - box1[0])
+    area2 = (box2[1] - box2[3]) * (box2[2] - box2[0])
+    union = area1 + area2 - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+DETECTORS = {
+    HogDetector.name: HogDetector,
+    CascadeDetector.name: CascadeDetector,
+    CascadePrefilterDetector.name: CascadePrefilterDetector,
+}
+
+
+def create_detector(name=config.FACE_DETECTOR):
+    """Create a face detector backend by name.
+
+    Args:
+        name: Backend name ('hog', 'cascade' or 'cascade_hog')
+
+    Returns:
+        object: Detector with a detect(image, upsample=None) method
+    """
+    if name not in DETECTORS:
+        raise ValueError(f"Unknown face detector '{name}'. Choose from: {', '.join(DETECTORS)}")
+    return DETECTORS[name]()
@@ -0,0 +1,165 @@
+"""Cheap face quality checks run before a face is encoded."""
+
+import threading
+from collections import Counter
+import numpy as np
+import face_recognition
+import config
+
+
+def laplacian_variance(gray):
+    """Measure the sharpness of a grayscale image.
+
+    Args:
+        gray: 2-D grayscale image as a float array
+
+    Returns:
+        float: Variance of the 4-neighbour Laplacian (low for blurred images)
+    """
+    if gray.shape[0] < 3 or gray.shape[1] < 3:
+        return 0.0
+    laplacian = (gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]
+                 - 4 * gray[1:-1, 1:-1])
+    return float(laplacian.var())
+
+
+def estimate_yaw(image, location):
+    """Estimate how far a face is turned from the 5-point landmarks.
+
+    Args:
+        image: Image containing the face
+        location: Face location as (top, right, bottom, left)
+
+    Returns:
+        float: Horizontal offset of the nose tip from the midpoint of the eyes,
+               as a fraction of the eye distance (0 for a frontal face, about 0.5
+               or more for a strongly turned face), or None if no landmarks were found
+    """
+    landmarks = face_recognition.face_landmarks(image, [location], model="small")
+    if not landmarks:
+        return None
+    points = landmarks[0]
+    left_eye = np.mean(points["left_eye"], axis=0)
+    right_eye = np.mean(points["right_eye"], axis=0)
+    nose = np.mean(points["nose_tip"], axis=0)
+    eye_distance = np.linalg.norm(right_eye - left_eye)
+    if eye_distance == 0:
+        return None
+    return float(abs(nose[0] - (left_eye[0] + right_eye[0]) / 2) / eye_distance)
+
+
+class FaceQualityGate:
+    """Rejects faces that are too small, badly lit, blurred or turned away to be recognized.
+
+    Checks run cheapest first and stop at the first failure, so the landmark
+    based yaw estimate only runs on faces that passed the pixel checks. The
+    gate keeps an estimate of the time one face encoding takes to report how
+    much encoding time the rejected faces saved.
+    """
+
+    def __init__(self, min_size=config.FACE_QUALITY_MIN_SIZE, min_sharpness=config.FACE_QUALITY_MIN_SHARPNESS,
+                 min_brightness=config.FACE_QUALITY_MIN_BRIGHTNESS, max_brightness=config.FACE_QUALITY_MAX_BRIGHTNESS,
+                 max_yaw=config.FACE_QUALITY_MAX_YAW):
+        """Initialize the gate.
+
+        Args:
+            min_size: Minimum width and height of the face box in pixels
+            min_sharpness: Minimum Laplacian variance of the grayscale face crop
+            min_brightness: Minimum mean brightness of the face crop (0-255)
+            max_brightness: Maximum mean brightness of the face crop (0-255)
+            max_yaw: Maximum nose offset from the eye midpoint, as a fraction of the eye distance
+        """
+        self.min_size = min_size
+        self.min_sharpness = min_sharpness
+        self.min_brightness = min_brightness
+        self.max_brightness = max_brightness
+        self.max_yaw = max_yaw
+        self.lock = threading.Lock()
+
+        self.checked = 0
+        self.rejected = Counter()  # reason -> count
+        self.encode_time = None    # Moving average of seconds per face encoding
+        self.time_avoided = 0.0
+
+    def assess(self, image, location):
+        """Check the quality of one face.
+
+        Args:
+            image: Image containing the face
+            location: Face location as (top, right, bottom, left)
+
+        Returns:
+            str: Reason the face was rejected ('size', 'brightness', 'sharpness'
+                 or 'yaw'), or None if it is good enough to encode
+        """
+        top, right, bottom, left = location
+        if bottom - top < self.min_size or right - left < self.min_size:
+            return "size"
+
+        crop = image[max(0, top):bottom, max(0, left):right]
+        gray = crop.mean(axis=2) if crop.ndim == 3 else crop.astype(np.float64)
+        brightness = gray.mean()
+        if not self.min_brightness <= brightness <= self.max_brightness:
+            return "brightness"
+
+        if laplacian_variance(gray) < self.min_sharpness:
+            return "sharpness"
+
+        if self.max_yaw is not None:
+            yaw = estimate_yaw(image, location)
+            if yaw is None or yaw > self.max_yaw:
+                return "yaw"
+        return None
+
+    def filter(self, image, face_locations):
+        """Split faces into those worth encoding and those to skip.
+
+        Args:
+            image: Image containing the faces
+            face_locations: Face locations as (top, right, bottom, left) tuples
+
+        Returns:
+            tuple: (accepted, rejected) lists of face locations
+        """
+        accepted, rejected = [], []
+        reasons = []
+        for location in face_locations:
+            reason = self.assess(image, location)
+            if reason is None:
+                accepted.append(location)
+            else:
+                rejected.append(location)
+                reasons.append(reason)
+
+        with self.lock:
+            self.checked += len(face_locations)
+            self.rejected.update(reasons)
+            self.time_avoided += len(rejected) * (self.encode_time or 0.0)
+        return accepted, rejected
+
+    def record_encode_time(self, seconds_per_face):
+        """Update the estimate of how long one face encoding takes.
+
+        Args:
+            seconds_per_face: Measured encoding time per face
+        """
+        with self.lock:
+            if self.encode_time is None:
+                self.encode_time = seconds_per_face
+            else:
+                self.encode_time += 0.1 * (seconds_per_face - self.encode_time)
+
+    def stats(self):
+        """Get gate counters.
+
+        Returns:
+            dict: Faces checked, faces rejected (in total and per reason) and the
+                  estimated encoding time avoided in seconds
+        """
+        with self.lock:
+            return {
+                "checked": self.checked,
+                "rejected": sum(self.rejected.values()),
+                "by_reason": dict(self.rejected),
+                "encode_time_avoided": round(self.time_avoided, 3),
+            }
@@ -1,31 +1,184 @@
 """Face recognition service module for comparing and identifying faces."""
 
 import os
+import sys
+import json
+import time
+import logging
 import numpy as np
 import face_recognition
-from datetime import datetime
 import config
+from face_detectors import create_detector
+from face_cache import FaceCropCache
+from face_quality import FaceQualityGate
+
+logger = logging.getLogger(__name__)
+
+# Gallery encodings are stored in single precision. Face distances computed in
+# float32 agree with the float64 computation to within GALLERY_DISTANCE_TOLERANCE,
+# far below the 0.01 resolution of the recognition threshold and minimum gap.
+GALLERY_DTYPE = np.float32
+GALLERY_DISTANCE_TOLERANCE = 1e-6
+
+
+def pairwise_distances(encodings):
+    """Compute the Euclidean distance between every pair of face encodings.
+    
+    Uses |a - b|^2 = |a|^2 + |b|^2 - 2 a.b so the whole matrix comes from one
+    matrix product instead of N^2 separate comparisons. Around the recognition
+    threshold the result agrees with the direct computation to within
+    GALLERY_DISTANCE_TOLERANCE; distances close to zero lose precision.
+    
+    Args:
+        encodings: (N, 128) encoding matrix
+        
+    Returns:
+        numpy.ndarray: (N, N) matrix of distances in the gallery dtype
+    """
+    encodings = np.asarray(encodings, dtype=GALLERY_DTYPE)
+    squared = np.einsum("ij,ij->i", encodings, encodings)
+    distances = squared[:, None] + squared[None, :] - 2 * (encodings @ encodings.T)
+    # Rounding can leave tiny negative values where the distance is zero
+    np.maximum(distances, 0, out=distances)
+    return np.sqrt(distances, out=distances)
+
+
+class GalleryInfo:
+    """Compact identity metadata of the registered face gallery.
+    
+    Each distinct (name, color) identity is stored once and the rows of the
+    encoding matrix refer to it by a small integer index. Indexing, len() and
+    iteration behave like the list of (name, color) tuples it replaces.
+    """
+    
+    def __init__(self, rows=()):
+        """Build the metadata from (name, color) tuples, one per gallery row.
+        
+        Args:
+            rows: Iterable of (name, color) tuples
+        """
+        identities = {}
+        index = [identities.setdefault(tuple(row), len(identities)) for row in rows]
+        self.identities = tuple(identities)
+        self.index = np.array(index, dtype=np.uint16)
+    
+    def __len__(self):
+        return len(self.index)
+    
+    def __getitem__(self, row):
+        return self.identities[self.index[row]]
+    
+    def __iter__(self):
+        return (self.identities[i] for i in self.index)
+    
+    @property
+    def nbytes(self):
+        """Approximate memory used by the metadata in bytes."""
+        return self.index.nbytes + sum(sys.getsizeof(name) + sys.getsizeof(color) for name, color in self.identities)
 
 
 class FaceRecognitionService:
     """Service for handling face recognition operations."""
     
-    def __init__(self, threshold=config.FACE_RECOGNITION_THRESHOLD, min_gap=config.MIN_FACE_DISTANCE_GAP):
+    def __init__(self, threshold=config.FACE_RECOGNITION_THRESHOLD, min_gap=config.MIN_FACE_DISTANCE_GAP,
+                 detector=config.FACE_DETECTOR, encoder_profile=config.ENCODER_PROFILE):
         """Initialize the face recognition service.
         
         Args:
             threshold: Threshold for face matching (lower means stricter matching)
             min_gap: Minimum gap between best and second-best match for confident recognition
+            detector: Face detector backend name ('hog', 'cascade' or 'cascade_hog')
+            encoder_profile: Name of the encoder profile in config.ENCODER_PROFILES
         """
         self.threshold = threshold
         self.min_gap = min_gap
+        self.detector = create_detector(detector)
+        if encoder_profile not in config.ENCODER_PROFILES:
+            raise ValueError(f"Unknown encoder profile '{encoder_profile}'. Choose from: {', '.join(config.ENCODER_PROFILES)}")
+        self.encoder_profile = encoder_profile
+        self.profile = config.ENCODER_PROFILES[encoder_profile]
+        
+        # Near-duplicate face crops reuse the previous encoding and match result
+        self.crop_cache = FaceCropCache()
+        self._cached_gallery = None
+        
+        # Faces too small, blurred, badly lit or turned away are not encoded
+        self.quality_gate = FaceQualityGate() if config.FACE_QUALITY_GATE else None
+        
         self._ensure_registered_dir()
         
     def _ensure_registered_dir(self):
         """Ensure the directory for registered faces exists."""
         if not os.path.exists(config.REGISTERED_FACES_DIR):
             os.makedirs(config.REGISTERED_FACES_DIR)
-            print(f"Created directory for registered faces: {config.REGISTERED_FACES_DIR}")
+            logger.info("Created directory for registered faces: %s", config.REGISTERED_FACES_DIR)
+    
+    def encode_faces(self, image, face_locations=None, enrol=False):
+        """Compute face encodings using the configured encoder profile.
+        
+        Args:
+            image: Image as a numpy array
+            face_locations: Optional face locations; faces are detected if not given
+            enrol: True for registration images, which may use more jitters than live frames
+            
+        Returns:
+            list: Face encodings, one per face
+        """
+        jitters = self.profile["enrol_jitters"] if enrol else self.profile["live_jitters"]
+        started = time.perf_counter()
+        encodings = face_recognition.face_encodings(image, face_locations, num_jitters=jitters, model=self.profile["model"])
+        if self.quality_gate and not enrol and encodings:
+            self.quality_gate.record_encode_time((time.perf_counter() - started) / len(encodings))
+        return encodings
+    
+    def _encoding_cache_path(self):
+        """Get the path of the stored gallery encodings file."""
+        return os.path.join(config.REGISTERED_FACES_DIR, config.GALLERY_ENCODINGS_FILE)
+    
+    def _load_encoding_cache(self):
+        """Load stored gallery encodings.
+        
+        Returns:
+            dict: Mapping of image filename to {"profile", "mtime", "encoding"} entries
+        """
+        try:
+            with open(self._encoding_cache_path()) as cache_file:
+                return json.load(cache_file)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning("Error reading stored face encodings, re-encoding gallery: %s", e)
+            return {}
+    
+    def _save_encoding_cache(self, cache):
+        """Store gallery encodings.
+        
+        Args:
+            cache: Mapping of image filename to {"profile", "mtime", "encoding"} entries
+        """
+        path = self._encoding_cache_path()
+        try:
+            with open(path + ".tmp", "w") as cache_file:
+                json.dump(cache, cache_file)
+            os.replace(path + ".tmp", path)
+        except Exception as e:
+            logger.error("Error storing face encodings: %s", e)
+    
+    def _cache_entry(self, file_path, encoding):
+        """Build a stored encoding entry for a gallery image.
+        
+        Args:
+            file_path: Path to the gallery image
+            encoding: Face encoding, or None if no face was found
+            
+        Returns:
+            dict: Entry recording the encoder profile and image modification time
+        """
+        return {
+            "profile": self.encoder_profile,
+            "mtime": os.path.getmtime(file_path),
+            "encoding": encoding.tolist() if encoding is not None else None,
+        }
     
     def compare_face_images(self, image1_path, image2_path):
         """Compare two face images and determine if they match.
@@ -44,11 +197,11 @@ class FaceRecognitionService:
             img2 = face_recognition.load_image_file(image2_path)
             
             # Extract face encodings
-            encodings1 = face_recognition.face_encodings(img1)
-            encodings2 = face_recognition.face_encodings(img2)
+            encodings1 = self.encode_faces(img1)
+            encodings2 = self.encode_faces(img2)
             
             if not encodings1 or not encodings2:
-                print("Could not detect a face in one of the images.")
+                logger.warning("Could not detect a face in one of the images.")
                 return None, None
             
             # Get the face encodings
@@ -59,88 +212,228 @@ class FaceRecognitionService:
             dist = np.linalg.norm(face1_enc - face2_enc)
             match = dist < self.threshold
             
-            print(f"Face comparison distance: {dist}")
-            print(f"Faces match? {'Yes' if match else 'No'}")
+            logger.info("Face comparison distance: %s", dist)
+            logger.info("Faces match? %s", "Yes" if match else "No")
             
             return match, dist
         except Exception as e:
-            print(f"Error comparing faces: {e}")
+            logger.error("Error comparing faces: %s", e)
             return None, None
     
+    def _parse_gallery_filename(self, filename):
+        """Get the identity of a gallery image from its filename.
+        
+        Args:
+            filename: Image filename of the form name_color.ext
+            
+        Returns:
+            tuple: (name, color), with color "white" if the filename has none
+        """
+        name_color = filename.rsplit('.', 1)[0]
+        if '_' in name_color:
+            parts = name_color.split('_')
+            return parts[0], parts[1]
+        return name_color, "white"
+    
+    def _load_gallery_entries(self):
+        """Get the encoding of every gallery image, encoding only what is not stored.
+        
+        Encodings are read from the stored encodings file when they were computed
+        with the current encoder profile from the current image. Images that were
+        encoded with another profile (a mixed gallery) or changed since are
+        re-encoded, and the stored file is updated.
+        
+        Returns:
+            list: (filename, encoding) tuples in filename order, with encoding
+                  None for images without a detectable face
+        """
+        cache = self._load_encoding_cache()
+        updated_cache = {}
+        mixed = 0
+        entries = []
+        
+        for filename in sorted(os.listdir(config.REGISTERED_FACES_DIR)):
+            if filename.lower().endswith(('.jpg', '.png')):
+                file_path = os.path.join(config.REGISTERED_FACES_DIR, filename)
+                entry = cache.get(filename)
+                
+                if (entry and entry["profile"] == self.encoder_profile
+                        and entry["mtime"] == os.path.getmtime(file_path)):
+                    updated_cache[filename] = entry
+                else:
+                    if entry and entry["profile"] != self.encoder_profile:
+                        mixed += 1
+                    img = face_recognition.load_image_file(file_path)
+                    encodings = self.encode_faces(img, enrol=True)
+                    updated_cache[filename] = self._cache_entry(file_path, encodings[0] if encodings else None)
+                
+                entries.append((filename, updated_cache[filename]["encoding"]))
+        
+        if mixed:
+            logger.info("Re-encoded %d registered faces stored with a different encoder profile", mixed)
+        if updated_cache != cache:
+            self._save_encoding_cache(updated_cache)
+        return entries
+    
     def load_registered_faces(self):
         """Load all registered face encodings and user information.
         
         Returns:
-            tuple: (encodings, info) where encodings is a list of face encodings and
-                  info is a list of (name, color) tuples
+            tuple: (encodings, info) where encodings is a read-only (N, 128) float32
+                  matrix with one row per registered face and info is a GalleryInfo
+                  giving the (name, color) of each row
         """
         registered_encodings = []
         registered_info = []  # List of (name, color) tuples
         
         try:
-            for filename in os.listdir(config.REGISTERED_FACES_DIR):
-                if filename.lower().endswith(('.jpg', '.png')):
-                    file_path = os.path.join(config.REGISTERED_FACES_DIR, filename)
-                    img = face_recognition.load_image_file(file_path)
-                    encodings = face_recognition.face_encodings(img)
-                    
-                    if encodings:
-                        registered_encodings.append(encodings[0])
-                        name_color = filename.rsplit('.', 1)[0]
-                        if '_' in name_color:
-                            parts = name_color.split('_')
-                            name = parts[0]
-                            color = parts[1]
-                        else:
-                            name, color = name_color, "white"
-                        registered_info.append((name, color))
-            
-            print(f"Loaded {len(registered_encodings)} registered faces")
-            return registered_encodings, registered_info
+            for filename, encoding in self._load_gallery_entries():
+                if encoding is not None:
+                    registered_encodings.append(encoding)
+                    registered_info.append(self._parse_gallery_filename(filename))
+            
+            gallery = self._build_gallery(registered_encodings, registered_info)
+            footprint = self.gallery_footprint(*gallery)
+            logger.info("Loaded %d registered faces of %d people (%s profile, %.1f KiB)", footprint["faces"],
+                        footprint["identities"], self.encoder_profile, footprint["total_bytes"] / 1024)
+            return gallery
         except Exception as e:
-            print(f"Error loading registered faces: {e}")
-            return [], []
+            logger.error("Error loading registered faces: %s", e)
+            return self._build_gallery([], [])
+    
+    def audit_gallery(self, margin=None):
+        """Find registered identities whose faces are too close to be told apart reliably.
+        
+        This is compare_face_images applied to every pair of gallery images at
+        once: each image is encoded at most once (stored encodings are reused)
+        and all pairwise distances are computed as one matrix. A face can only be
+        recognized when its second-best match is at least min_gap further away
+        than the best one, so two identities whose closest faces are within
+        threshold + min_gap of each other can make recognition of either fail.
+        
+        Args:
+            margin: Distance below which a pair of identities is reported
+                    (default: threshold + min_gap)
+            
+        Returns:
+            dict: "faces" and "identities" counts, "skipped" images without a
+                  detectable face, and "pairs", a list of conflicting identity pairs
+                  sorted by distance, each a dict with the two (name, color)
+                  identities, the filenames of their closest faces and the distance
+        """
+        if margin is None:
+            margin = self.threshold + self.min_gap
+        
+        entries = self._load_gallery_entries()
+        faces = [(filename, encoding) for filename, encoding in entries if encoding is not None]
+        skipped = [filename for filename, encoding in entries if encoding is None]
+        encodings, info = self._build_gallery([encoding for _, encoding in faces],
+                                              [self._parse_gallery_filename(filename) for filename, _ in faces])
+        filenames = [filename for filename, _ in faces]
+        report = {"faces": len(faces), "identities": len(info.identities), "skipped": skipped, "pairs": []}
+        if len(info.identities) < 2:
+            return report
+        
+        distances = pairwise_distances(encodings)
+        
+        # Closest distance between every pair of identities: reduce the rows and
+        # then the columns of the identity-ordered matrix over each identity's block
+        order = np.argsort(info.index, kind="stable")
+        starts = np.flatnonzero(np.r_[True, np.diff(info.index[order]) != 0])
+        ordered = distances[np.ix_(order, order)]
+        closest = np.minimum.reduceat(np.minimum.reduceat(ordered, starts, axis=0), starts, axis=1)
+        
+        ends = np.r_[starts[1:], len(order)]
+        identities = info.index[order][starts]
+        for a, b in zip(*np.nonzero(np.triu(closest < margin, k=1))):
+            block = ordered[starts[a]:ends[a], starts[b]:ends[b]]
+            row, column = np.unravel_index(np.argmin(block), block.shape)
+            report["pairs"].append({
+                "identities": (info.identities[identities[a]], info.identities[identities[b]]),
+                "files": (filenames[order[starts[a] + row]], filenames[order[starts[b] + column]]),
+                "distance": float(closest[a, b]),
+            })
+        report["pairs"].sort(key=lambda pair: pair["distance"])
+        return report
+    
+    def _build_gallery(self, encodings, info):
+        """Pack gallery encodings and identities into their compact form.
+        
+        Args:
+            encodings: Sequence of face encodings
+            info: Sequence of (name, color) tuples, one per encoding
+            
+        Returns:
+            tuple: (encodings, info) as a read-only float32 matrix and a GalleryInfo
+        """
+        # face_recognition encodings always have 128 dimensions
+        matrix = np.array(encodings, dtype=GALLERY_DTYPE).reshape(-1, 128)
+        # Shared by all recognition workers, so it must never change in place
+        matrix.flags.writeable = False
+        return matrix, GalleryInfo(info)
+    
+    def gallery_footprint(self, registered_encodings, registered_info):
+        """Report the memory used by a gallery.
+        
+        Args:
+            registered_encodings: Gallery encoding matrix
+            registered_info: GalleryInfo of the gallery
+            
+        Returns:
+            dict: Face and identity counts, bytes used by the encodings, the
+                  metadata and in total, and the bytes the float64 encodings would need
+        """
+        encodings = np.asarray(registered_encodings)
+        info_bytes = registered_info.nbytes if isinstance(registered_info, GalleryInfo) else sys.getsizeof(registered_info)
+        return {
+            "faces": len(encodings),
+            "identities": len(set(registered_info)),
+            "encoding_bytes": encodings.nbytes,
+            "info_bytes": info_bytes,
+            "total_bytes": encodings.nbytes + info_bytes,
+            "float64_encoding_bytes": encodings.size * 8,
+        }
     
     def recognize_face(self, face_encoding, registered_encodings, registered_info):
         """Recognize a face against registered faces using the relative distance check algorithm.
         
+        Distances are computed in float32 against the gallery matrix; they match
+        the float64 computation to within GALLERY_DISTANCE_TOLERANCE.
+        
         Args:
             face_encoding: The face encoding to recognize
-            registered_encodings: List of registered face encodings
-            registered_info: List of (name, color) tuples for registered faces
+            registered_encodings: Gallery encoding matrix (one row per registered face)
+            registered_info: GalleryInfo (or list of (name, color) tuples) for the rows
             
         Returns:
             tuple: (name, color, distance, gap) if a match is found, (None, None, None, None) otherwise
         """
-        if not registered_encodings or not registered_info:
-            print("No registered faces to compare against")
+        if len(registered_encodings) == 0 or len(registered_info) == 0:
+            logger.warning("No registered faces to compare against")
             return None, None, None, None
         
-        # Calculate distances to all registered faces
-        distances = []
-        for i, reg_encoding in enumerate(registered_encodings):
-            distance = np.linalg.norm(face_encoding - reg_encoding)
-            distances.append((registered_info[i], distance))
-        
-        # Sort by distance (ascending)
-        sorted_distances = sorted(distances, key=lambda x: x[1])
+        # Calculate distances to all registered faces in one pass over the matrix
+        query = np.asarray(face_encoding, dtype=GALLERY_DTYPE)
+        distances = np.linalg.norm(np.asarray(registered_encodings, dtype=GALLERY_DTYPE) - query, axis=1)
         
         # Get the best match
-        (best_name, best_color), best_distance = sorted_distances[0]
+        best = int(np.argmin(distances))
+        best_name, best_color = registered_info[best]
+        best_distance = float(distances[best])
         
         # Calculate gap between best and second-best match
-        if len(sorted_distances) < 2:
+        if len(distances) < 2:
             gap = float('inf')  # Only one registered face
         else:
-            gap = sorted_distances[1][1] - best_distance
+            gap = float(np.partition(distances, 1)[1]) - best_distance
         
         # Apply threshold and gap criteria for confident recognition
         if best_distance < self.threshold and gap >= self.min_gap:
-            print(f"Face recognized as {best_name} with favorite color {best_color}")
-            print(f"Distance: {best_distance:.2f}, Gap: {gap:.2f}")
+            logger.debug("Face recognized as %s with favorite color %s (distance %.2f, gap %.2f)",
+                         best_name, best_color, best_distance, gap)
             return best_name, best_color, best_distance, gap
         
-        print("Face not recognized with sufficient confidence")
+        logger.debug("Face not recognized with sufficient confidence")
         return None, None, None, None
     
     def register_face(self, image_path, name, favorite_color):
@@ -157,26 +450,39 @@ class FaceRecognitionService:
         try:
             # Load the image and check if a face is detected
             img = face_recognition.load_image_file(image_path)
-            encodings = face_recognition.face_encodings(img)
+            encodings = self.encode_faces(img, enrol=True)
             
             if not encodings:
-                print("No face detected in the provided image")
+                logger.warning("No face detected in the provided image")
                 return False
+            
+            # Store the encoding so the system does not have to compute it again
+            cache = self._load_encoding_cache()
+            cache[os.path.basename(image_path)] = self._cache_entry(image_path, encodings[0])
+            self._save_encoding_cache(cache)
 
-            print(f"Face registered successfully as {name} with favorite color {favorite_color}")
+            logger.info("Face registered successfully as %s with favorite color %s", name, favorite_color)
             return True
         except Exception as e:
-            print(f"Error registering face: {e}")
+            logger.error("Error registering face: %s", e)
             return False
     
-    def process_frame(self, frame, registered_encodings, registered_info, threshold=None):
+    def process_frame(self, frame, registered_encodings, registered_info, threshold=None, downsample=1, roi=None,
+                      full_frame=None, upsample=None):
         """Process a video frame for face recognition.
         
         Args:
             frame: The video frame to process
-            registered_encodings: List of registered face encodings
-            registered_info: List of (name, color) tuples for registered faces
+            registered_encodings: Gallery encoding matrix from load_registered_faces
+            registered_info: GalleryInfo for the gallery rows
             threshold: Optional threshold to override the default
+            downsample: Integer factor by which the frame is shrunk for face detection;
+                        encodings are always computed on the full-resolution frame
+            roi: Optional RegionOfInterest in the coordinates of frame; faces are only searched inside it
+            full_frame: Optional function returning a higher-resolution frame of the same
+                        scene; when given, faces are detected on frame and encoded on the
+                        frame it returns, which is only requested if a face was found
+            upsample: Optional HOG upsampling passes for frame, overriding the detector's own
             
         Returns:
             list: List of tuples containing face locations and recognition results:
@@ -188,23 +494,124 @@ class FaceRecognitionService:
         results = []
         
         try:
-            # Find face locations and encodings in the current frame
-            face_locations = face_recognition.face_locations(frame)
-            face_encodings = face_recognition.face_encodings(frame, face_locations)
+            # Find face locations in the current frame
+            face_locations = self._detect_faces(frame, downsample, roi, upsample)
+            if face_locations and full_frame is not None:
+                detection_shape = frame.shape
+                frame = full_frame()
+                face_locations = self._scale_locations(face_locations, detection_shape, frame.shape)
+            
+            if face_locations:
+                accepted, rejected = face_locations, []
+                if self.quality_gate:
+                    accepted, rejected = self.quality_gate.filter(frame, face_locations)
+                
+                recognized = {}
+                if accepted:
+                    recognized = dict(zip(accepted, self._recognize_locations(
+                        frame, accepted, registered_encodings, registered_info
+                    )))
+                # Skipped faces are still reported, as unrecognized
+                results = [recognized.get(location, (location, None, None, None, None)) for location in face_locations]
+                
+        except Exception as e:
+            logger.error("Error processing video frame: %s", e)
+            
+        return results
+    
+    def _recognize_locations(self, frame, face_locations, registered_encodings, registered_info):
+        """Encode and recognize the faces at the given locations.
+        
+        Faces whose crop is a near-duplicate of a recently seen crop take their
+        result from the crop cache instead of being encoded again.
+        
+        Args:
+            frame: The video frame containing the faces
+            face_locations: Face locations as (top, right, bottom, left) tuples
+            registered_encodings: Gallery encoding matrix from load_registered_faces
+            registered_info: GalleryInfo for the gallery rows
+            
+        Returns:
+            list: [(face_location, name, color, distance, gap), ...]
+        """
+        # Cached match results are only valid for the gallery they were matched against
+        if registered_encodings is not self._cached_gallery:
+            self.crop_cache.clear()
+            self._cached_gallery = registered_encodings
+        
+        results = {}
+        uncached = []
+        for index, location in enumerate(face_locations):
+            fingerprint, cached = self.crop_cache.get(frame, location)
+            if cached is not None:
+                results[index] = (location,) + tuple(cached[1])
+            else:
+                uncached.append((index, location, fingerprint))
+        
+        if uncached:
+            face_encodings = self.encode_faces(frame, [location for _, location, _ in uncached])
             
             # Process each detected face
-            for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
+            for (index, location, fingerprint), face_encoding in zip(uncached, face_encodings):
                 # Try to recognize the face
                 name, color, distance, gap = self.recognize_face(
                     face_encoding, 
                     registered_encodings, 
                     registered_info
                 )
+                self.crop_cache.put(fingerprint, location, face_encoding, (name, color, distance, gap))
                 
                 # Store the result
-                results.append(((top, right, bottom, left), name, color, distance, gap))
-                
-        except Exception as e:
-            print(f"Error processing video frame: {e}")
+                results[index] = (location, name, color, distance, gap)
+        
+        return [results[index] for index in sorted(results)]
+    
+    def _scale_locations(self, face_locations, from_shape, to_shape):
+        """Map face locations from one frame size to another.
+        
+        Args:
+            face_locations: Face locations as (top, right, bottom, left) tuples
+            from_shape: Shape of the frame the locations were found in
+            to_shape: Shape of the frame to map them to
             
-        return results 
\ No newline at end of file
+        Returns:
+            list: Face locations in the coordinates of the second frame
+        """
+        scale_y = to_shape[0] / from_shape[0]
+        scale_x = to_shape[1] / from_shape[1]
+        return [
+            (int(top * scale_y), min(int(right * scale_x), to_shape[1]),
+             min(int(bottom * scale_y), to_shape[0]), int(left * scale_x))
+            for top, right, bottom, left in face_locations
+        ]
+    
+    def _detect_faces(self, frame, downsample=1, roi=None, upsample=None):
+        """Detect face locations, optionally in a region and on a downsampled copy of the frame.
+        
+        Args:
+            frame: The video frame to search
+            downsample: Integer factor by which the frame is shrunk before detection
+            roi: Optional RegionOfInterest to search instead of the whole frame
+            upsample: Optional HOG upsampling passes, overriding the detector's own
+            
+        Returns:
+            list: Face locations as (top, right, bottom, left) in full-frame coordinates
+        """
+        search = frame
+        if roi is not None:
+            # A view of the frame; only the region is copied below if the detector needs contiguous memory
+            search, offset = roi.crop(frame)
+        
+        if downsample <= 1:
+            locations = self.detector.detect(np.ascontiguousarray(search), upsample)
+        else:
+            small = np.ascontiguousarray(search[::downsample, ::downsample])
+            height, width = search.shape[:2]
+            locations = [
+                (top * downsample, min(right * downsample, width), min(bottom * downsample, height), left * downsample)
+                for top, right, bottom, left in self.detector.detect(small, upsample)
+            ]
+        
+        if roi is not None:
+            locations = roi.to_frame(locations, offset)
+        return locations 
\ No newline at end of file
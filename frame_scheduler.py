@@ -0,0 +1,104 @@
+"""Adaptive frame scheduler for the face recognition loop."""
+
+import time
+import config
+
+
+class FrameScheduler:
+    """Pace the recognition loop to a target frame rate and CPU budget.
+
+    The scheduler measures how long each frame takes to process and derives the
+    delay before the next frame from it, instead of sleeping a fixed amount. If
+    processing alone cannot meet the target, the detection downsample factor is
+    increased so face detection runs on a smaller image; when there is headroom
+    it is decreased again. Right after a face first appears the scheduler
+    switches to full resolution with no delay for a short boost period.
+    """
+
+    def __init__(self, target_fps=config.RECOGNITION_TARGET_FPS, cpu_budget=config.RECOGNITION_CPU_BUDGET,
+                 max_downsample=config.RECOGNITION_MAX_DOWNSAMPLE, boost_duration=config.RECOGNITION_BOOST_DURATION):
+        """Initialize the frame scheduler.
+
+        Args:
+            target_fps: Target number of processed frames per second
+            cpu_budget: Fraction of one CPU core the loop may use (0-1)
+            max_downsample: Largest detection downsample factor allowed
+            boost_duration: Seconds to run at full speed after a face first appears
+        """
+        self.target_period = 1.0 / target_fps
+        self.cpu_budget = cpu_budget
+        self.max_downsample = max_downsample
+        self.boost_duration = boost_duration
+
+        self.downsample = 1
+        self.avg_processing = None
+        self.boost_until = 0
+        self.face_seen = False
+        self.frame_start = None
+        self.frames = 0
+
+    def frame_started(self):
+        """Mark the start of processing for a frame."""
+        self.frame_start = time.time()
+
+    def frame_finished(self, face_found=False):
+        """Mark the end of processing for a frame and adapt the detection scale.
+
+        Args:
+            face_found: Whether a face was detected in the frame
+        """
+        now = time.time()
+        processing = now - self.frame_start if self.frame_start else 0
+        self.frames += 1
+
+        # Exponentially weighted average smooths out single slow frames
+        if self.avg_processing is None:
+            self.avg_processing = processing
+        else:
+            self.avg_processing = 0.7 * self.avg_processing + 0.3 * processing
+
+        if face_found and not self.face_seen:
+            self.face_seen = True
+            self.boost_until = now + self.boost_duration
+            self.downsample = 1
+            return
+
+        if self.is_boosting():
+            return
+
+        # Processing time that fits in one frame period within the CPU budget
+        allowed = self.target_period * self.cpu_budget
+        if self.avg_processing > allowed and self.downsample < self.max_downsample:
+            self.downsample += 1
+            # The average was measured at the old scale; detection cost drops roughly quadratically
+            self.avg_processing *= ((self.downsample - 1) / self.downsample) ** 2
+        elif self.avg_processing < allowed * 0.4 and self.downsample > 1:
+            self.downsample -= 1
+            self.avg_processing *= ((self.downsample + 1) / self.downsample) ** 2
+
+    def is_boosting(self):
+        """Check if the scheduler is in the post-detection boost period.
+
+        Returns:
+            bool: True if frames should be processed without delay
+        """
+        return time.time() < self.boost_until
+
+    def next_delay(self):
+        """Get the delay before the next frame should be processed.
+
+        Returns:
+            float: Delay in seconds (0 if the next frame should be processed immediately)
+        """
+        if self.is_boosting() or self.avg_processing is None:
+            return 0
+
+        # Keep processing time within the CPU budget and frames no faster than the target rate
+        period = max(self.target_period, self.avg_processing / self.cpu_budget)
+        return max(0, period - self.avg_processing)
+
+    def wait(self):
+        """Sleep until the next frame should be processed."""
+        delay = self.next_delay()
+        if delay > 0:
+            time.sleep(delay)
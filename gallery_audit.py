@@ -0,0 +1,74 @@
+"""
+Gallery Audit Utility
+
+This script checks the registered face gallery for identities that are too similar
+to be recognized reliably. Every image is encoded at most once (stored encodings
+are reused) and all pairwise face distances are computed in one matrix operation,
+so galleries of thousands of images are audited in seconds.
+
+A pair of identities is reported when their closest faces are less than
+threshold + min_gap apart; a visitor matching either of them may then fail the
+minimum gap check and not be recognized.
+
+Usage:
+    python gallery_audit.py [--threshold T] [--min-gap G] [--margin M]
+"""
+
+import sys
+import time
+import argparse
+import config
+from face_recognition_service import FaceRecognitionService
+from logging_service import setup_logging
+
+
+def format_report(report, margin):
+    """Format a gallery audit as text.
+
+    Args:
+        report: Audit returned by FaceRecognitionService.audit_gallery
+        margin: Distance below which pairs were reported
+
+    Returns:
+        str: Report text
+    """
+    lines = [f"{report['faces']} faces of {report['identities']} identities, "
+             f"{len(report['pairs'])} pairs closer than {margin:.2f}"]
+    for filename in report["skipped"]:
+        lines.append(f"  no face found in {filename}")
+    if report["pairs"]:
+        lines.append(f"{'distance':>8}  {'identities':<40} closest images")
+        for pair in report["pairs"]:
+            (name_a, color_a), (name_b, color_b) = pair["identities"]
+            identities = f"{name_a} ({color_a}) / {name_b} ({color_b})"
+            lines.append(f"{pair['distance']:>8.3f}  {identities:<40} {pair['files'][0]}, {pair['files'][1]}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """Main function to parse arguments and print the gallery audit."""
+    parser = argparse.ArgumentParser(description="Find registered identities too similar to tell apart")
+    parser.add_argument("--threshold", type=float, default=config.FACE_RECOGNITION_THRESHOLD,
+                        help="Recognition distance threshold")
+    parser.add_argument("--min-gap", type=float, default=config.MIN_FACE_DISTANCE_GAP,
+                        help="Minimum gap between best and second-best match")
+    parser.add_argument("--margin", type=float,
+                        help="Report pairs closer than this distance (default: threshold + min gap)")
+    args = parser.parse_args(argv)
+    # Show the face service's gallery and encoding messages on the console
+    setup_logging(directory="")
+
+    service = FaceRecognitionService(threshold=args.threshold, min_gap=args.min_gap)
+    margin = args.margin if args.margin is not None else args.threshold + args.min_gap
+
+    started = time.perf_counter()
+    report = service.audit_gallery(margin)
+    elapsed = time.perf_counter() - started
+
+    print(format_report(report, margin))
+    print(f"Audit took {elapsed:.2f} s")
+    return 1 if report["pairs"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+Event Journal Query Utility
+
+This script aggregates the event journal written by the security system per hour
+or per day. It streams the journal files line by line, so memory use depends on
+the number of reported periods rather than on the size of the journal.
+
+Usage:
+    python journal_query.py [--by hour|day] [--since YYYY-MM-DD] [--dir DIR]
+"""
+
+import os
+import sys
+import json
+import math
+import argparse
+from datetime import datetime
+import config
+
+
+class LatencyHistogram:
+    """Fixed-size log-scale histogram used to estimate latency percentiles."""
+
+    # Bins grow by ~5% each, covering 1 ms to well over a minute
+    MIN_VALUE = 0.001
+    GROWTH = 1.05
+    NUM_BINS = 240
+
+    def __init__(self):
+        """Initialize an empty histogram."""
+        self.counts = [0] * self.NUM_BINS
+        self.total = 0
+
+    def add(self, value):
+        """Add a latency sample.
+
+        Args:
+            value: Latency in seconds
+        """
+        if value <= self.MIN_VALUE:
+            index = 0
+        else:
+            index = int(math.log(value / self.MIN_VALUE, self.GROWTH)) + 1
+        self.counts[min(index, self.NUM_BINS - 1)] += 1
+        self.total += 1
+
+    def percentile(self, pct):
+        """Estimate a percentile from the histogram.
+
+        Args:
+            pct: Percentile to estimate (0-100)
+
+        Returns:
+            float: Estimated latency in seconds, or None if the histogram is empty
+        """
+        if self.total == 0:
+            return None
+
+        target = math.ceil(self.total * pct / 100.0)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.MIN_VALUE * self.GROWTH ** index
+        return self.MIN_VALUE * self.GROWTH ** (self.NUM_BINS - 1)
+
+
+class PeriodStats:
+    """Aggregated statistics for one reporting period."""
+
+    def __init__(self):
+        """Initialize empty period statistics."""
+        self.motion_events = 0
+        self.dark_events = 0
+        self.recognized = 0
+        self.frames = 0
+        self.latency = LatencyHistogram()
+        self.light_latency = LatencyHistogram()
+        self.first_frame_latency = LatencyHistogram()
+
+    def add(self, event):
+        """Add a motion event to the statistics.
+
+        Args:
+            event: Motion event dictionary read from the journal
+        """
+        self.motion_events += 1
+        if not event.get("dark"):
+            return
+
+        self.dark_events += 1
+        self.frames += event.get("frames", 0)
+        if event.get("t_light_on") and event.get("t_motion"):
+            self.light_latency.add(event["t_light_on"] - event["t_motion"])
+        if event.get("t_first_frame") and event.get("t_motion"):
+            self.first_frame_latency.add(event["t_first_frame"] - event["t_motion"])
+        if event.get("name"):
+            self.recognized += 1
+            if event.get("t_recognized") and event.get("t_motion"):
+                self.latency.add(event["t_recognized"] - event["t_motion"])
+
+    def recognition_rate(self):
+        """Get the fraction of dark motion events that ended in a recognition.
+
+        Returns:
+            float: Recognition rate (0.0 if there were no dark events)
+        """
+        if self.dark_events == 0:
+            return 0.0
+        return self.recognized / self.dark_events
+
+
+def journal_files(directory=config.JOURNAL_DIR, filename=config.JOURNAL_FILENAME):
+    """List journal files from oldest to newest.
+
+    Args:
+        directory: Directory where journal files are stored
+        filename: Name of the active journal file
+
+    Returns:
+        list: Paths of existing journal files in chronological order
+    """
+    base = os.path.join(directory, filename)
+    rotated = []
+    index = 1
+    while os.path.exists(f"{base}.{index}"):
+        rotated.append(f"{base}.{index}")
+        index += 1
+
+    files = list(reversed(rotated))
+    if os.path.exists(base):
+        files.append(base)
+    return files
+
+
+def iter_events(paths, event_type=None):
+    """Stream events from journal files one at a time.
+
+    Args:
+        paths: Journal file paths to read in order
+        event_type: Optional event type to filter on
+
+    Yields:
+        dict: Decoded journal events
+    """
+    for path in paths:
+        with open(path) as journal_file:
+            for line in journal_file:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # A partially written line at the end of a file is skipped
+                    continue
+                if event_type is None or event.get("event") == event_type:
+                    yield event
+
+
+def aggregate(events, by="hour", since=None):
+    """Aggregate motion events per hour or per day.
+
+    Args:
+        events: Iterable of motion event dictionaries
+        by: Aggregation period, 'hour' or 'day'
+        since: Optional timestamp; earlier events are ignored
+
+    Returns:
+        dict: Mapping of period label to PeriodStats
+    """
+    fmt = "%Y-%m-%d %H:00" if by == "hour" else "%Y-%m-%d"
+    periods = {}
+
+    for event in events:
+        ts = event.get("t_motion", event.get("ts"))
+        if ts is None or (since is not None and ts < since):
+            continue
+        label = datetime.fromtimestamp(ts).strftime(fmt)
+        periods.setdefault(label, PeriodStats()).add(event)
+
+    return periods
+
+
+def format_report(periods):
+    """Format aggregated statistics as a text table.
+
+    Args:
+        periods: Mapping of period label to PeriodStats
+
+    Returns:
+        str: Report text
+    """
+    def fmt_latency(value):
+        return f"{value:.2f}" if value is not None else "-"
+
+    lines = [f"{'Period':<17}{'Events':>8}{'Dark':>6}{'Recog':>7}{'Rate':>7}{'Frames':>8}{'p50 s':>8}{'p95 s':>8}"
+             f"{'Light p95':>11}{'Frame p95':>11}"]
+    for label in sorted(periods):
+        stats = periods[label]
+        lines.append(
+            f"{label:<17}{stats.motion_events:>8}{stats.dark_events:>6}{stats.recognized:>7}"
+            f"{stats.recognition_rate():>7.0%}{stats.frames:>8}"
+            f"{fmt_latency(stats.latency.percentile(50)):>8}{fmt_latency(stats.latency.percentile(95)):>8}"
+            f"{fmt_latency(stats.light_latency.percentile(95)):>11}"
+            f"{fmt_latency(stats.first_frame_latency.percentile(95)):>11}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """Main function to parse arguments and print the journal report."""
+    parser = argparse.ArgumentParser(description="Aggregate the security system event journal")
+    parser.add_argument("--by", choices=("hour", "day"), default="hour", help="Aggregation period")
+    parser.add_argument("--since", help="Only include events on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--dir", default=config.JOURNAL_DIR, help="Journal directory")
+    args = parser.parse_args(argv)
+
+    since = None
+    if args.since:
+        since = datetime.strptime(args.since, "%Y-%m-%d").timestamp()
+
+    paths = journal_files(args.dir)
+    if not paths:
+        print(f"No journal files found in {args.dir}")
+        return 1
+
+    periods = aggregate(iter_events(paths, "motion"), by=args.by, since=since)
+    print(format_report(periods))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
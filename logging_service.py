@@ -0,0 +1,206 @@
+"""Non-blocking logging pipeline for the security system."""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+import config
+
+_listener = None
+_queue_handler = None
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Hands log records to a bounded queue and drops them when it is full.
+
+    Only the message arguments and traceback are resolved on the calling
+    thread; timestamps are formatted and files written by the listener thread.
+    """
+
+    def __init__(self, log_queue):
+        """Initialize the handler.
+
+        Args:
+            log_queue: Bounded queue read by the listener thread
+        """
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        """Make a record safe to hand to another thread."""
+        # Arguments may be mutable objects, so render the message now
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        """Put a record on the queue without waiting."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogListener(logging.handlers.QueueListener):
+    """Queue listener whose stop marker waits for room in a full queue.
+
+    The handler drops records when the bounded queue is full, but the stop
+    marker must get through, or stop() would not find the thread's end.
+    """
+
+    def enqueue_sentinel(self):
+        """Put the stop marker on the queue, waiting while the thread drains it."""
+        self.queue.put(self._sentinel)
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets at most ``burst`` records with the same message template through per interval.
+
+    Records are keyed by logger, level and unformatted message, so messages
+    logged with %-style arguments are limited together whatever their values.
+    The first record let through after a suppression carries the number of
+    suppressed records in its ``suppressed`` attribute.
+    """
+
+    MAX_KEYS = 1000
+
+    def __init__(self, interval=config.LOG_RATE_LIMIT_INTERVAL, burst=config.LOG_RATE_LIMIT_BURST):
+        """Initialize the filter.
+
+        Args:
+            interval: Length of the rate limiting window in seconds
+            burst: Records let through per key and window (0 disables rate limiting)
+        """
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.lock = threading.Lock()
+        self.windows = {}  # key -> [window start, records let through, records suppressed]
+
+    def filter(self, record):
+        """Decide whether a record is logged."""
+        if not self.burst:
+            return True
+
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                if window is None and len(self.windows) >= self.MAX_KEYS:
+                    self.windows.clear()
+                suppressed = window[2] if window else 0
+                self.windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Human-readable single-line format for the console."""
+
+    def __init__(self):
+        """Initialize the formatter."""
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+
+    def format(self, record):
+        """Format a record, noting how many similar records were suppressed."""
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            text += f" ({suppressed} similar messages suppressed)"
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line for the log files."""
+
+    def format(self, record):
+        """Format a record as a JSON object."""
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, separators=(",", ":"))
+
+
+def setup_logging(level=config.LOG_LEVEL, levels=config.LOG_LEVELS, directory=config.LOG_DIR,
+                  filename=config.LOG_FILENAME, max_bytes=config.LOG_MAX_BYTES,
+                  backup_count=config.LOG_BACKUP_COUNT, max_pending=config.LOG_MAX_PENDING):
+    """Route all logging through a queue to a background thread.
+
+    Log calls on the application threads only filter the record and put it on
+    a bounded queue; the listener thread writes it to the console and to a
+    rotating JSON-lines file. Calls below the configured level return after
+    the logger's cached level check.
+
+    Args:
+        level: Root log level name (e.g. 'INFO'; per-frame messages are logged at 'DEBUG')
+        levels: Mapping of logger (module) name to level name overriding the root level
+        directory: Directory for the log files, or '' to log to the console only
+        filename: Name of the active log file
+        max_bytes: Size in bytes after which the log file is rotated
+        backup_count: Number of rotated log files to keep
+        max_pending: Maximum number of queued records (newer records are dropped beyond this)
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(ConsoleFormatter())
+    handlers = [console]
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        log_file = logging.handlers.RotatingFileHandler(os.path.join(directory, filename),
+                                                        maxBytes=max_bytes, backupCount=backup_count)
+        log_file.setFormatter(JsonFormatter())
+        handlers.append(log_file)
+
+    _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=max_pending))
+    _queue_handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [_queue_handler]
+    root.setLevel(level)
+    for name, logger_level in levels.items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    _listener = LogListener(_queue_handler.queue, *handlers)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Write the queued records and stop the listener thread."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    logging.getLogger().removeHandler(_queue_handler)
+    if _queue_handler.dropped:
+        print(f"Logging dropped {_queue_handler.dropped} records because the queue was full")
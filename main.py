@@ -10,20 +10,30 @@ This is the main entry point for the smart security system that:
 6. Connects to Blynk IoT cloud for remote monitoring and control
 """
 
-import time
-import sys
 import signal
+import logging
+import threading
 from security_system import SecuritySystem
+from logging_service import setup_logging, shutdown_logging
+
+logger = logging.getLogger(__name__)
 
 # Global variable for the security system instance
 security_system = None
 
+# Set by the signal handler to let the main thread shut down
+shutdown_event = threading.Event()
+
 def signal_handler(sig, frame):
     """Handle SIGINT (Ctrl+C) to gracefully stop the security system."""
+    # Printed directly: logging is not safe to use from a signal handler
     print("\nShutting down the security system...")
+    shutdown_event.set()
+
+def profiler_signal_handler(sig, frame):
+    """Handle SIGUSR1/SIGUSR2 to start/stop the sampling profiler."""
     if security_system:
-        security_system.stop()
-    sys.exit(0)
+        security_system.set_profiling(sig == signal.SIGUSR1)
 
 def main():
     """Main function to initialize and start the security system."""
@@ -32,6 +42,10 @@ def main():
     # Register signal handler for graceful shutdown
     signal.signal(signal.SIGINT, signal_handler)
     
+    # SIGUSR1 starts and SIGUSR2 stops the sampling profiler
+    signal.signal(signal.SIGUSR1, profiler_signal_handler)
+    signal.signal(signal.SIGUSR2, profiler_signal_handler)
+    
     # Display welcome message
     print("=" * 60)
     print("Smart Security System")
@@ -39,19 +53,22 @@ def main():
     print("Connected to Blynk IoT cloud platform")
     print("=" * 60)
     
+    # Log through a background thread so slow console or SD card writes never stall the system
+    setup_logging()
+    
     try:
         # Create and start the security system
         security_system = SecuritySystem()
         security_system.start()
         
-        # Keep the main thread running
-        while True:
-            time.sleep(1)
+        # Keep the main thread idle until shutdown is requested
+        shutdown_event.wait()
     except Exception as e:
-        print(f"Error in main loop: {e}")
+        logger.exception("Error in main loop: %s", e)
     finally:
         if security_system:
             security_system.stop()
+        shutdown_logging()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""Shared face recognition worker pool with fair scheduling across zones."""
+
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+import config
+from face_recognition_service import FaceRecognitionService
+
+
+class RecognitionPool:
+    """Worker pool that owns the registered face gallery and processes frames for all zones.
+
+    The gallery is loaded once and shared by every worker. Each zone has its own
+    queue of pending frames, and workers take frames from the zones in
+    round-robin order so a busy zone cannot starve the others.
+    """
+
+    def __init__(self, face_service=None, workers=config.RECOGNITION_WORKERS):
+        """Initialize the recognition pool.
+
+        Args:
+            face_service: FaceRecognitionService used by all workers (created if not given)
+            workers: Number of worker threads
+        """
+        self.face_service = face_service or FaceRecognitionService()
+        self.num_workers = workers
+        self.threads = []
+        self.running = False
+
+        # Gallery is replaced as a whole so workers always see a consistent pair
+        self.gallery = ([], [])
+
+        self.pending = OrderedDict()  # zone name -> deque of (frame, downsample, roi, full_frame, upsample, future)
+        self.condition = threading.Condition()
+
+    def load_gallery(self):
+        """Load (or reload) the registered faces shared by all zones.
+
+        Returns:
+            int: Number of registered faces loaded
+        """
+        self.gallery = self.face_service.load_registered_faces()
+        return len(self.gallery[0])
+
+    def start(self):
+        """Start the worker threads."""
+        if self.running:
+            return
+
+        self.running = True
+        for index in range(self.num_workers):
+            thread = threading.Thread(target=self._worker_thread, name=f"recognition-{index}")
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        """Stop the worker threads and cancel pending frames."""
+        with self.condition:
+            self.running = False
+            for jobs in self.pending.values():
+                for *_, future in jobs:
+                    future.cancel()
+            self.pending.clear()
+            self.condition.notify_all()
+
+        for thread in self.threads:
+            thread.join(timeout=2)
+        self.threads = []
+
+    def submit(self, zone_name, frame, downsample=1, roi=None, full_frame=None, upsample=None):
+        """Queue a frame from a zone for recognition.
+
+        Args:
+            zone_name: Name of the zone the frame comes from
+            frame: The video frame to process
+            downsample: Detection downsample factor passed to process_frame
+            roi: Optional RegionOfInterest of the zone's camera passed to process_frame
+            full_frame: Optional full-resolution frame grab function passed to process_frame
+            upsample: Optional HOG upsampling passes for the zone's camera passed to process_frame
+
+        Returns:
+            Future: Resolves to the process_frame result list
+        """
+        future = Future()
+        with self.condition:
+            if not self.running:
+                future.set_result([])
+                return future
+            self.pending.setdefault(zone_name, deque()).append((frame, downsample, roi, full_frame, upsample, future))
+            self.condition.notify()
+        return future
+
+    def _next_job(self):
+        """Take the next frame in round-robin order across zones.
+
+        Must be called with the condition held.
+
+        Returns:
+            tuple: (frame, downsample, roi, full_frame, upsample, future), or None if nothing is pending
+        """
+        for zone_name, jobs in self.pending.items():
+            if jobs:
+                job = jobs.popleft()
+                # Move this zone to the back so the other zones go next
+                self.pending.move_to_end(zone_name)
+                return job
+        return None
+
+    def _worker_thread(self):
+        """Thread function that processes queued frames."""
+        while True:
+            with self.condition:
+                job = self._next_job()
+                while job is None and self.running:
+                    self.condition.wait()
+                    job = self._next_job()
+                if job is None:
+                    return
+
+            frame, downsample, roi, full_frame, upsample, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                encodings, info = self.gallery
+                future.set_result(self.face_service.process_frame(
+                    frame, encodings, info, downsample=downsample, roi=roi, full_frame=full_frame, upsample=upsample
+                ))
+            except Exception as e:
+                future.set_exception(e)
@@ -0,0 +1,261 @@
+"""
+Face Recognition Server
+
+This script runs a central recognition server for a fleet of edge nodes. The
+server owns the registered face gallery and runs FaceRecognitionService; edge
+nodes detect faces locally and send face crops or encodings over TCP, and get
+back the identity and favorite color of each face.
+
+Usage:
+    python recognition_server.py [--host HOST] [--port PORT]
+
+Protocol:
+    Every message is an 8-byte header holding the lengths of a JSON header and a
+    binary payload (network byte order), followed by the JSON header and the
+    payload. Requests carry an "id" that is echoed in the response, so clients
+    may send several requests before reading the responses. Requests on one
+    connection are answered in order.
+"""
+
+import sys
+import json
+import struct
+import logging
+import argparse
+import socketserver
+import numpy as np
+import config
+from face_recognition_service import FaceRecognitionService
+from logging_service import setup_logging, shutdown_logging
+
+logger = logging.getLogger(__name__)
+
+_LENGTHS = struct.Struct("!II")
+
+
+def send_message(sock, header, payload=b""):
+    """Send a framed message.
+
+    Args:
+        sock: Connected socket
+        header: JSON-serializable header dictionary
+        payload: Binary payload
+    """
+    header_bytes = json.dumps(header, separators=(",", ":")).encode()
+    sock.sendall(_LENGTHS.pack(len(header_bytes), len(payload)) + header_bytes + payload)
+
+
+def _recv_exact(sock, size):
+    """Receive exactly size bytes.
+
+    Args:
+        sock: Connected socket
+        size: Number of bytes to receive
+
+    Returns:
+        bytes: Received data, or None if the connection was closed
+    """
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = sock.recv(remaining)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock, max_header=config.RECOGNITION_SERVER_MAX_HEADER, max_payload=config.RECOGNITION_SERVER_MAX_PAYLOAD):
+    """Receive a framed message.
+
+    Args:
+        sock: Connected socket
+        max_header: Largest header size accepted, in bytes
+        max_payload: Largest payload size accepted, in bytes
+
+    Returns:
+        tuple: (header, payload), or None if the connection was closed
+
+    Raises:
+        ValueError: If the message is larger than allowed (the connection must be closed)
+    """
+    lengths = _recv_exact(sock, _LENGTHS.size)
+    if lengths is None:
+        return None
+    header_size, payload_size = _LENGTHS.unpack(lengths)
+    # Check the sizes before reading, so a peer cannot make us allocate arbitrary amounts
+    if header_size > max_header or payload_size > max_payload:
+        raise ValueError(f"Message too large ({header_size} byte header, {payload_size} byte payload)")
+    header_bytes = _recv_exact(sock, header_size)
+    payload = _recv_exact(sock, payload_size) if payload_size else b""
+    if header_bytes is None or payload is None:
+        return None
+    return json.loads(header_bytes), payload
+
+
+def encode_results(results):
+    """Convert recognition tuples to JSON-friendly lists.
+
+    Args:
+        results: List of (name, color, distance, gap) tuples
+
+    Returns:
+        list: List of [name, color, distance, gap] with plain floats
+    """
+    encoded = []
+    for name, color, distance, gap in results:
+        encoded.append([
+            name,
+            color,
+            float(distance) if distance is not None else None,
+            float(gap) if gap is not None and gap != float('inf') else None,
+        ])
+    return encoded
+
+
+class RecognitionServer(socketserver.ThreadingTCPServer):
+    """TCP server answering recognition requests from edge nodes."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, face_service=None):
+        """Initialize the server and load the gallery.
+
+        Args:
+            address: (host, port) tuple to listen on
+            face_service: FaceRecognitionService to use (created if not given)
+        """
+        self.face_service = face_service or FaceRecognitionService()
+        self.registered_encodings, self.registered_info = self.face_service.load_registered_faces()
+        super().__init__(address, RecognitionRequestHandler)
+
+    def recognize_encodings(self, encodings):
+        """Recognize a batch of face encodings against the gallery.
+
+        Args:
+            encodings: Iterable of 128-d face encodings
+
+        Returns:
+            list: (name, color, distance, gap) tuples
+        """
+        return [
+            self.face_service.recognize_face(encoding, self.registered_encodings, self.registered_info)
+            for encoding in encodings
+        ]
+
+    def recognize_crops(self, crops):
+        """Encode and recognize face crops.
+
+        Args:
+            crops: List of (image, box) pairs where box is the face location inside the image
+
+        Returns:
+            list: (name, color, distance, gap) tuples, one per crop
+        """
+        results = []
+        for image, box in crops:
+            encodings = self.face_service.encode_faces(image, [box])
+            if encodings:
+                results.extend(self.recognize_encodings(encodings))
+            else:
+                results.append((None, None, None, None))
+        return results
+
+
+class RecognitionRequestHandler(socketserver.BaseRequestHandler):
+    """Handler serving the requests of one edge node connection."""
+
+    def handle(self):
+        """Answer requests until the edge node disconnects."""
+        logger.info("Edge node connected: %s", self.client_address[0])
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (OSError, ValueError) as e:
+                logger.warning("Error reading request from %s: %s", self.client_address[0], e)
+                break
+            if message is None:
+                break
+
+            header, payload = message
+            try:
+                response = self._dispatch(header, payload)
+            except Exception as e:
+                response = {"error": str(e)}
+            response["id"] = header.get("id")
+
+            try:
+                send_message(self.request, response)
+            except OSError:
+                break
+        logger.info("Edge node disconnected: %s", self.client_address[0])
+
+    def _dispatch(self, header, payload):
+        """Run a single request.
+
+        Args:
+            header: Request header dictionary
+            payload: Request payload bytes
+
+        Returns:
+            dict: Response header
+        """
+        request_type = header.get("type")
+
+        if request_type == "ping":
+            footprint = self.server.face_service.gallery_footprint(
+                self.server.registered_encodings, self.server.registered_info
+            )
+            return {"faces": footprint["faces"], "gallery_bytes": footprint["total_bytes"]}
+
+        if request_type == "encodings":
+            profile = header.get("profile")
+            if profile != self.server.face_service.encoder_profile:
+                return {"error": f"Encoder profile mismatch: edge uses '{profile}', "
+                                 f"server gallery uses '{self.server.face_service.encoder_profile}'"}
+            encodings = np.frombuffer(payload, dtype=np.float64).reshape(-1, 128)
+            return {"results": encode_results(self.server.recognize_encodings(encodings))}
+
+        if request_type == "crops":
+            crops = []
+            offset = 0
+            for crop in header["crops"]:
+                shape = tuple(crop["shape"])
+                size = int(np.prod(shape))
+                image = np.frombuffer(payload, dtype=np.uint8, count=size, offset=offset).reshape(shape)
+                crops.append((image, tuple(crop["box"])))
+                offset += size
+            return {"results": encode_results(self.server.recognize_crops(crops))}
+
+        return {"error": f"Unknown request type: {request_type}"}
+
+
+def main(argv=None):
+    """Main function to start the recognition server."""
+    parser = argparse.ArgumentParser(description="Central face recognition server for edge nodes")
+    parser.add_argument("--host", default=config.RECOGNITION_SERVER_LISTEN,
+                        help="Address to listen on (the protocol has no authentication; use a trusted interface)")
+    parser.add_argument("--port", type=int, default=config.RECOGNITION_SERVER_PORT, help="Port to listen on")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("Face Recognition Server")
+    print("=" * 60)
+
+    setup_logging()
+    server = RecognitionServer((args.host, args.port))
+    logger.info("Serving %d registered faces on %s:%s", len(server.registered_encodings), args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down the recognition server...")
+    finally:
+        server.server_close()
+        shutdown_logging()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,6 +14,7 @@ from config import SUPPORTED_COLORS
 from camera_manager import CameraManager
 from face_recognition_service import FaceRecognitionService
 from utils import generate_filename
+from logging_service import setup_logging
 
 
 def main():
@@ -24,6 +25,9 @@ def main():
     print("Register your face for the smart security system")
     print("=" * 60)
     
+    # Show the camera and face service progress messages on the console
+    setup_logging(directory="")
+    
     # Initialize components
     camera = CameraManager()
     face_service = FaceRecognitionService()
@@ -0,0 +1,213 @@
+"""Edge-node face recognition service that offloads encoding to a recognition server."""
+
+import time
+import socket
+import itertools
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import numpy as np
+import config
+from face_recognition_service import FaceRecognitionService
+from recognition_server import send_message, recv_message
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteFaceRecognitionService(FaceRecognitionService):
+    """Face recognition service that sends detected faces to a recognition server.
+
+    Faces are still detected locally. Depending on the mode, either a small crop
+    around each face ('crop') or the locally computed encoding ('encoding') is
+    sent to the server, which matches it against its gallery. Requests for all
+    faces are written before any response is read, so several requests are in
+    flight on the connection at once. If the server cannot be reached the
+    service falls back to local recognition against the local gallery.
+    """
+
+    def __init__(self, host=config.RECOGNITION_SERVER_HOST, port=config.RECOGNITION_SERVER_PORT,
+                 mode=config.RECOGNITION_SERVER_MODE, timeout=config.RECOGNITION_SERVER_TIMEOUT, **kwargs):
+        """Initialize the remote recognition service.
+
+        Args:
+            host: Host name or IP address of the recognition server
+            port: Port of the recognition server
+            mode: 'crop' to send face crops or 'encoding' to send face encodings
+            timeout: Seconds to wait for the server before falling back to local recognition
+            **kwargs: Passed on to FaceRecognitionService
+        """
+        super().__init__(**kwargs)
+        self.host = host
+        self.port = port
+        self.mode = mode
+        self.timeout = timeout
+
+        self.sock = None
+        self.send_lock = threading.Lock()
+        self.pending = {}  # request id -> Future
+        self.pending_lock = threading.Lock()
+        self.request_ids = itertools.count(1)
+        self.retry_at = 0
+
+    def _connect(self):
+        """Connect to the recognition server if not connected.
+
+        Returns:
+            bool: True if connected, False otherwise
+        """
+        if self.sock is not None:
+            return True
+        if time.time() < self.retry_at:
+            return False
+
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.settimeout(None)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError as e:
+            logger.warning("Recognition server %s:%s unreachable, using local recognition: %s", self.host, self.port, e)
+            self.retry_at = time.time() + config.RECOGNITION_SERVER_RETRY_INTERVAL
+            return False
+
+        self.sock = sock
+        reader = threading.Thread(target=self._reader_thread, args=(sock,))
+        reader.daemon = True
+        reader.start()
+        logger.info("Connected to recognition server %s:%s", self.host, self.port)
+        return True
+
+    def _disconnect(self, sock, error):
+        """Drop a broken connection and fail its pending requests.
+
+        Args:
+            sock: The socket that failed
+            error: Exception describing the failure
+        """
+        with self.send_lock:
+            if self.sock is sock:
+                self.sock = None
+                self.retry_at = time.time() + config.RECOGNITION_SERVER_RETRY_INTERVAL
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+        with self.pending_lock:
+            pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def _reader_thread(self, sock):
+        """Thread function that matches server responses to pending requests."""
+        try:
+            while True:
+                message = recv_message(sock)
+                if message is None:
+                    raise ConnectionError("Recognition server closed the connection")
+                header, _ = message
+                with self.pending_lock:
+                    future = self.pending.pop(header.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(header)
+        except Exception as e:
+            self._disconnect(sock, e)
+
+    def _send_request(self, header, payload=b""):
+        """Send a request without waiting for its response.
+
+        Args:
+            header: Request header dictionary (an 'id' is added)
+            payload: Request payload bytes
+
+        Returns:
+            Future: Resolves to the response header
+        """
+        future = Future()
+        header["id"] = next(self.request_ids)
+        with self.pending_lock:
+            self.pending[header["id"]] = future
+
+        with self.send_lock:
+            sock = self.sock
+            if sock is None:
+                with self.pending_lock:
+                    self.pending.pop(header["id"], None)
+                raise ConnectionError("Not connected to recognition server")
+            try:
+                send_message(sock, header, payload)
+            except OSError as e:
+                sock_error = e
+            else:
+                return future
+
+        self._disconnect(sock, sock_error)
+        raise sock_error
+
+    def _build_request(self, frame, location):
+        """Build the request for one detected face.
+
+        Args:
+            frame: The video frame containing the face
+            location: Face location as (top, right, bottom, left)
+
+        Returns:
+            tuple: (header, payload)
+        """
+        if self.mode == "encoding":
+            encoding = self.encode_faces(frame, [location])[0]
+            return {"type": "encodings", "profile": self.encoder_profile}, np.asarray(encoding, dtype=np.float64).tobytes()
+
+        # Crop the face with a margin so the server can find the landmarks
+        top, right, bottom, left = location
+        margin = (bottom - top) // 4
+        height, width = frame.shape[:2]
+        crop_top, crop_left = max(0, top - margin), max(0, left - margin)
+        crop = np.ascontiguousarray(frame[crop_top:min(height, bottom + margin), crop_left:min(width, right + margin)])
+        box = [top - crop_top, right - crop_left, bottom - crop_top, left - crop_left]
+        return {"type": "crops", "crops": [{"shape": list(crop.shape), "box": box}]}, crop.tobytes()
+
+    def _recognize_locations(self, frame, face_locations, registered_encodings, registered_info):
+        """Recognize faces on the recognition server, falling back to local recognition.
+
+        Args:
+            frame: The video frame containing the faces
+            face_locations: Face locations as (top, right, bottom, left) tuples
+            registered_encodings: Local registered face encodings (used for fallback)
+            registered_info: Local (name, color) tuples (used for fallback)
+
+        Returns:
+            list: [(face_location, name, color, distance, gap), ...]
+        """
+        if not self._connect():
+            return super()._recognize_locations(frame, face_locations, registered_encodings, registered_info)
+
+        sock = self.sock
+        try:
+            # Send every face before waiting for any response
+            futures = [self._send_request(*self._build_request(frame, location)) for location in face_locations]
+
+            results = []
+            for location, future in zip(face_locations, futures):
+                try:
+                    response = future.result(timeout=self.timeout)
+                except FutureTimeoutError:
+                    raise FutureTimeoutError(f"No response from recognition server within {self.timeout} s")
+                if "error" in response:
+                    raise RuntimeError(f"Recognition server error: {response['error']}")
+                name, color, distance, gap = response["results"][0]
+                if name is not None and gap is None:
+                    gap = float('inf')  # Only one registered face on the server
+                results.append((location, name, color, distance, gap))
+            return results
+        except (FutureTimeoutError, RuntimeError) as e:
+            # A hung or failing server would cost the timeout on every frame, so drop the
+            # connection and recognize locally until the retry interval has passed
+            if sock is not None:
+                self._disconnect(sock, e)
+            logger.warning("Remote recognition failed, using local recognition until %s:%s is retried: %s",
+                           self.host, self.port, e)
+            return super()._recognize_locations(frame, face_locations, registered_encodings, registered_info)
+        except Exception as e:
+            logger.warning("Remote recognition failed, using local recognition: %s", e)
+            return super()._recognize_locations(frame, face_locations, registered_encodings, registered_info)
@@ -0,0 +1,578 @@
+"""
+Replay Harness for the Smart Security System
+
+Plays recorded scenarios (see trace_recorder.py) through the real
+SecuritySystem without any hardware attached:
+- The PIR sensors, light sensors, LEDs, cameras, bulbs and Blynk are replaced
+  by fake adapters fed from the trace
+- time.time, time.monotonic and time.sleep follow a virtual clock, so the idle
+  time between events passes many times faster than real time
+- While motion is handled or a face recognition is running the clock slows
+  down to --recognition-speed (real time by default), so latencies are
+  measured against the real cost of the response
+
+After each scenario a report shows recognition latency, frames processed and
+bulb commands sent.
+
+Usage:
+    python replay.py TRACE_DIR [TRACE_DIR ...] [--speed 100] [--recognition-speed 1]
+
+Record a trace by running the system with TRACE_RECORD_DIR set.
+"""
+
+import os
+import sys
+import json
+import time
+import types
+import shutil
+import argparse
+import tempfile
+import threading
+from collections import Counter
+import numpy as np
+from PIL import Image
+
+_real_time = time.time
+_real_monotonic = time.monotonic
+_real_sleep = time.sleep
+
+
+class VirtualClock:
+    """Clock running at an adjustable multiple of real time.
+
+    install() replaces time.time, time.monotonic and time.sleep so every
+    module using them follows this clock. Both time.time and time.monotonic
+    return the same virtual epoch time.
+    """
+
+    def __init__(self, start, speed=1.0):
+        """Initialize the clock.
+
+        Args:
+            start: Virtual epoch time the clock starts at
+            speed: Virtual seconds that pass per real second
+        """
+        self.lock = threading.Lock()
+        self.real_anchor = _real_monotonic()
+        self.virtual_anchor = start
+        self.current_speed = speed
+
+    def now(self):
+        """Get the current virtual time."""
+        with self.lock:
+            return self.virtual_anchor + (_real_monotonic() - self.real_anchor) * self.current_speed
+
+    def speed(self):
+        """Get the number of virtual seconds passing per real second."""
+        return self.current_speed
+
+    def set_speed(self, speed):
+        """Change the clock speed without a jump in virtual time.
+
+        Args:
+            speed: Virtual seconds that pass per real second
+        """
+        with self.lock:
+            real_now = _real_monotonic()
+            self.virtual_anchor += (real_now - self.real_anchor) * self.current_speed
+            self.real_anchor = real_now
+            self.current_speed = speed
+
+    def sleep(self, seconds):
+        """Sleep for a number of virtual seconds, following speed changes."""
+        self.sleep_until(self.now() + seconds)
+
+    def sleep_until(self, target):
+        """Sleep until the virtual clock reaches a time.
+
+        Args:
+            target: Virtual time to wake up at
+        """
+        while True:
+            remaining = target - self.now()
+            if remaining <= 0:
+                return
+            _real_sleep(min(remaining / self.current_speed, 0.05))
+
+    def install(self):
+        """Make the time module follow this clock."""
+        time.time = self.now
+        time.monotonic = self.now
+        time.sleep = self.sleep
+
+    def uninstall(self):
+        """Restore the real time functions."""
+        time.time = _real_time
+        time.monotonic = _real_monotonic
+        time.sleep = _real_sleep
+
+
+# ---------------------------------------------------------------------------
+# Fake hardware adapters
+# ---------------------------------------------------------------------------
+
+class FakePIRSensor:
+    """Stand-in for GroveMiniPIRMotionSensor; the harness calls on_detect directly."""
+
+    def __init__(self, pin):
+        self.pin = pin
+        self.on_detect = None
+
+    def trigger(self):
+        """Deliver a PIR trigger as the sensor's interrupt would."""
+        if self.on_detect:
+            self.on_detect()
+
+
+class FakeADC:
+    """Stand-in for the Grove ADC returning the level last set by the harness."""
+
+    def __init__(self, address=0x08):
+        self.address = address
+        self.level = 1000
+
+    def read(self, channel):
+        return self.level
+
+
+class FakeLed:
+    """Stand-in for GroveLed."""
+
+    def __init__(self, pin):
+        self.pin = pin
+        self.lit = False
+
+    def on(self):
+        self.lit = True
+
+    def off(self):
+        self.lit = False
+
+
+class FrameTimeline:
+    """Frames of one zone, served by virtual time."""
+
+    def __init__(self, trace_dir, start):
+        """Initialize the timeline.
+
+        Args:
+            trace_dir: Trace directory the frame files are relative to
+            start: Virtual epoch time of trace offset 0
+        """
+        self.trace_dir = trace_dir
+        self.start = start
+        self.times = []
+        self.files = []
+        self.full_files = []  # Full-resolution grab of each frame, or None
+        self.cache = (None, None)  # ((file, resolution), decoded BGR image)
+
+    def add(self, offset, filename, stream=None):
+        if stream == "full":
+            # Grabbed to encode a face found in the preceding detection frame
+            if self.files:
+                self.full_files[-1] = filename
+            return
+        self.times.append(self.start + offset)
+        self.files.append(filename)
+        self.full_files.append(None)
+
+    def frame_at(self, now, resolution, full=False):
+        """Get the most recent frame at a virtual time.
+
+        Args:
+            now: Virtual time
+            resolution: (width, height) the frame is resized to
+            full: True for the full-resolution grab of the frame, if one was
+                  recorded (otherwise the detection frame is resized)
+
+        Returns:
+            numpy.ndarray: BGR frame
+        """
+        index = int(np.searchsorted(self.times, now, side="right")) - 1
+        if index < 0:
+            return np.zeros((resolution[1], resolution[0], 3), dtype=np.uint8)
+
+        filename = self.files[index]
+        if full and self.full_files[index]:
+            filename = self.full_files[index]
+        key = (filename, tuple(resolution))
+        if self.cache[0] != key:
+            image = Image.open(os.path.join(self.trace_dir, filename)).convert("RGB")
+            if image.size != tuple(resolution):
+                image = image.resize(tuple(resolution), Image.BILINEAR)
+            self.cache = (key, np.ascontiguousarray(np.asarray(image)[:, :, ::-1]))
+        return self.cache[1]
+
+
+class FakeRGBArray:
+    """Stand-in for picamera.array.PiRGBArray."""
+
+    def __init__(self, camera, size=None):
+        self.camera = camera
+        self.size = size
+        self.array = None
+
+    def truncate(self, size=None):
+        self.array = None
+
+    def seek(self, offset):
+        pass
+
+    def close(self):
+        self.array = None
+
+
+class FakeCamera:
+    """Stand-in for PiCamera serving frames from the zone's FrameTimeline."""
+
+    def __init__(self, camera_num=0):
+        self.camera_num = camera_num
+        self.resolution = (640, 480)
+        self.rotation = 0
+        self.framerate = 30
+        self.timeline = None
+        self.closed = False
+
+    def _frame(self, resize=None, full=False):
+        resolution = resize or self.resolution
+        if self.timeline is None:
+            return np.zeros((resolution[1], resolution[0], 3), dtype=np.uint8)
+        return self.timeline.frame_at(time.time(), resolution, full)
+
+    def capture(self, output, format="jpeg", use_video_port=False, resize=None, splitter_port=0):
+        # Full-resolution grabs are served from the recorded grabs, not the detection stream
+        import config
+        frame = self._frame(resize, full=splitter_port == config.CAMERA_STILL_SPLITTER_PORT)
+        if isinstance(output, FakeRGBArray):
+            output.array = frame
+        else:
+            Image.fromarray(frame[:, :, ::-1]).save(output)
+
+    def capture_continuous(self, output, format="bgr", use_video_port=False, resize=None, splitter_port=0):
+        while not self.closed:
+            time.sleep(1.0 / self.framerate)
+            output.array = self._frame(resize)
+            yield output
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBulbDevice:
+    """Stand-in for tinytuya.BulbDevice that counts the commands it receives."""
+
+    commands = Counter()  # action -> number of commands, shared by all bulbs
+
+    def __init__(self, device_id, ip_address, local_key):
+        self.device_id = device_id
+        self.is_on = False
+        self.rgb = (255, 255, 255)
+
+    def set_version(self, version):
+        pass
+
+    def set_socketPersistent(self, persistent):
+        pass
+
+    def status(self):
+        return {"dps": {"20": self.is_on}}
+
+    def state(self):
+        return {"is_on": self.is_on}
+
+    def colour_rgb(self):
+        return self.rgb
+
+    def turn_on(self, nowait=False):
+        FakeBulbDevice.commands["on"] += 1
+        self.is_on = True
+
+    def turn_off(self, nowait=False):
+        FakeBulbDevice.commands["off"] += 1
+        self.is_on = False
+
+    def set_colour(self, r, g, b, nowait=False):
+        FakeBulbDevice.commands["color"] += 1
+        self.is_on = True
+        self.rgb = (r, g, b)
+
+
+class FakeBlynk:
+    """Stand-in for BlynkLib.Blynk that counts virtual pin writes."""
+
+    writes = Counter()  # virtual pin -> number of writes, shared by all connections
+
+    def __init__(self, auth_token, **kwargs):
+        self.conn = None
+
+    def on(self, pin):
+        return lambda handler: handler
+
+    def run(self):
+        pass
+
+    def virtual_write(self, pin, value):
+        FakeBlynk.writes[pin] += 1
+
+
+def install_fake_hardware():
+    """Register the fake adapters as the hardware library modules.
+
+    Must be called before security_system (or anything importing the
+    hardware libraries) is imported.
+    """
+    class TuyaError(Exception):
+        pass
+
+    fakes = {
+        "grove": {},
+        "grove.grove_mini_pir_motion_sensor": {"GroveMiniPIRMotionSensor": FakePIRSensor},
+        "grove.adc": {"ADC": FakeADC},
+        "grove.grove_led": {"GroveLed": FakeLed},
+        "picamera": {"PiCamera": FakeCamera},
+        "picamera.array": {"PiRGBArray": FakeRGBArray},
+        "tinytuya": {"BulbDevice": FakeBulbDevice, "TuyaError": TuyaError},
+        "BlynkLib": {"Blynk": FakeBlynk},
+    }
+    for name, attributes in fakes.items():
+        module = types.ModuleType(name)
+        module.__dict__.update(attributes)
+        sys.modules[name] = module
+
+
+# ---------------------------------------------------------------------------
+# Trace loading and replay
+# ---------------------------------------------------------------------------
+
+def load_trace(trace_dir):
+    """Read a trace directory.
+
+    Args:
+        trace_dir: Directory written by trace_recorder.TraceRecorder
+
+    Returns:
+        tuple: (header, events) with events sorted by time; at equal times light
+               levels come before frames and frames before PIR triggers
+    """
+    from trace_recorder import TRACE_FILENAME
+
+    order = {"light": 0, "frame": 1, "pir": 2}
+    with open(os.path.join(trace_dir, TRACE_FILENAME)) as trace_file:
+        lines = [json.loads(line) for line in trace_file if line.strip()]
+
+    if not lines or lines[0].get("type") != "header":
+        raise ValueError(f"{trace_dir} does not start with a trace header")
+    events = [event for event in lines[1:] if event.get("type") in order]
+    events.sort(key=lambda event: (event["t"], order[event["type"]]))
+    return lines[0], events
+
+
+def _percentile(values, fraction):
+    """Get a percentile of a list of values (nearest rank)."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def summarize(journal_dir):
+    """Summarize the journal written during a replay.
+
+    Args:
+        journal_dir: Directory of the replay's event journal
+
+    Returns:
+        dict: Motion outcomes, light-on, first-frame and recognition latencies and frame counts
+    """
+    from journal_query import journal_files, iter_events
+
+    outcomes = Counter()
+    recognition_latencies = []
+    light_latencies = []
+    first_frame_latencies = []
+    frames = []
+    for event in iter_events(journal_files(journal_dir), event_type="motion"):
+        outcomes[event.get("outcome", "unknown")] += 1
+        if "t_light_on" in event:
+            light_latencies.append(event["t_light_on"] - event["t_motion"])
+        if "t_first_frame" in event:
+            first_frame_latencies.append(event["t_first_frame"] - event["t_motion"])
+        if "t_recognized" in event:
+            recognition_latencies.append(event["t_recognized"] - event["t_motion"])
+        if "frames" in event:
+            frames.append(event["frames"])
+
+    return {
+        "outcomes": outcomes,
+        "light_latencies": light_latencies,
+        "first_frame_latencies": first_frame_latencies,
+        "recognition_latencies": recognition_latencies,
+        "frames": frames,
+    }
+
+
+def replay(trace_dir, speed=100.0, recognition_speed=1.0, drain=None):
+    """Replay one trace through a fresh SecuritySystem.
+
+    Args:
+        trace_dir: Trace directory to replay
+        speed: Virtual seconds per real second while no recognition is running
+        recognition_speed: Virtual seconds per real second while a recognition is running
+        drain: Virtual seconds to keep running after the last event
+               (defaults to the bulb on-duration plus the PIR quiet period)
+
+    Returns:
+        dict: Scenario report (see summarize) plus bulb commands, Blynk writes and timings
+    """
+    import config
+    from security_system import SecuritySystem
+    from event_journal import EventJournal
+    from snapshot_writer import SnapshotWriter
+
+    header, events = load_trace(trace_dir)
+    start = header["start"]
+    if drain is None:
+        drain = config.BULB_ON_DURATION + config.PIR_QUIET_PERIOD
+
+    # Never record while replaying, and keep the replay's journal and snapshots separate;
+    # the snapshot quota would otherwise evict real evidence
+    config.TRACE_RECORD_DIR = ""
+    journal_dir = tempfile.mkdtemp(prefix="replay-journal-")
+    snapshot_dir = tempfile.mkdtemp(prefix="replay-snapshots-")
+    FakeBulbDevice.commands.clear()
+    FakeBlynk.writes.clear()
+
+    clock = VirtualClock(start, speed)
+    clock.install()
+    real_start = _real_monotonic()
+    system = None
+    try:
+        system = SecuritySystem()
+        system.journal = EventJournal(directory=journal_dir)
+        system.snapshots = SnapshotWriter(directory=snapshot_dir)
+        system.timers.speed = clock.speed
+        system.start()
+        if not system.running:
+            raise RuntimeError("Security system did not start")
+
+        zones = {zone.name: zone for zone in system.zones}
+        for zone in zones.values():
+            zone.camera.camera.timeline = FrameTimeline(trace_dir, start)
+        for event in events:
+            if event["type"] == "frame" and event["zone"] in zones:
+                zones[event["zone"]].camera.camera.timeline.add(event["t"], event["file"], event.get("stream"))
+
+        def busy(zone):
+            # Handling motion or recognizing faces
+            return zone.lock.locked() or bool(zone.recognition_stop and not zone.recognition_stop.is_set())
+
+        def pace(wanted=None):
+            # Run motion responses at recognition_speed and idle time at full speed
+            if wanted is None:
+                wanted = recognition_speed if any(busy(zone) for zone in zones.values()) else speed
+            if clock.speed() != wanted:
+                clock.set_speed(wanted)
+                # Wake the timer thread so it recomputes its wait at the new speed
+                with system.timers.condition:
+                    system.timers.condition.notify()
+
+        skipped = Counter()
+        for event in events + [{"t": events[-1]["t"] + drain if events else drain, "type": "end"}]:
+            target = start + event["t"]
+            while clock.now() < target:
+                pace()
+                _real_sleep(min(max(target - clock.now(), 0) / clock.speed(), 0.01))
+
+            zone = zones.get(event.get("zone"))
+            if event["type"] == "end":
+                break
+            if zone is None:
+                skipped[event.get("zone")] += 1
+            elif event["type"] == "light":
+                zone.light_sensor.adc.level = event["value"]
+            elif event["type"] == "pir":
+                # Slow down before the trigger so the response is timed at recognition speed
+                pace(recognition_speed)
+                threading.Thread(target=zone.motion_sensor.sensor.trigger, daemon=True).start()
+
+        for name, count in skipped.items():
+            print(f"Skipped {count} events for unknown zone {name}")
+    finally:
+        if system is not None:
+            system.stop()
+        clock.uninstall()
+
+    report = summarize(journal_dir)
+    shutil.rmtree(journal_dir, ignore_errors=True)
+    shutil.rmtree(snapshot_dir, ignore_errors=True)
+    report.update(
+        name=os.path.basename(os.path.normpath(trace_dir)),
+        virtual_duration=(events[-1]["t"] if events else 0) + drain,
+        real_duration=_real_monotonic() - real_start,
+        bulb_commands=dict(FakeBulbDevice.commands),
+        blynk_writes=sum(FakeBlynk.writes.values()),
+    )
+    return report
+
+
+def format_report(report):
+    """Format a scenario report as text.
+
+    Args:
+        report: Dictionary returned by replay()
+
+    Returns:
+        str: Human-readable report
+    """
+    def latency(values):
+        if not values:
+            return "n/a"
+        return (f"p50 {_percentile(values, 0.5):.2f}s  p95 {_percentile(values, 0.95):.2f}s  "
+                f"max {max(values):.2f}s  (n={len(values)})")
+
+    outcomes = ", ".join(f"{name} {count}" for name, count in sorted(report["outcomes"].items())) or "none"
+    frames = report["frames"]
+    commands = report["bulb_commands"]
+    lines = [
+        f"Scenario: {report['name']}",
+        f"  Replayed {report['virtual_duration'] / 3600:.2f} h in {report['real_duration']:.1f} s",
+        f"  Motion events:       {sum(report['outcomes'].values())} ({outcomes})",
+        f"  Motion -> light on:  {latency(report['light_latencies'])}",
+        f"  Motion -> 1st frame: {latency(report['first_frame_latencies'])}",
+        f"  Recognition latency: {latency(report['recognition_latencies'])}",
+        f"  Frames processed:    {sum(frames)}"
+        + (f" ({sum(frames) / len(frames):.1f} per recognition)" if frames else ""),
+        f"  Bulb commands:       on {commands.get('on', 0)}, off {commands.get('off', 0)}, "
+        f"color {commands.get('color', 0)}",
+        f"  Blynk writes:        {report['blynk_writes']}",
+    ]
+    return "\n".join(lines)
+
+
+def main():
+    """Main function to replay recorded scenarios."""
+    parser = argparse.ArgumentParser(description="Replay recorded scenarios through the security system")
+    parser.add_argument("traces", nargs="+", help="Trace directories recorded with TRACE_RECORD_DIR")
+    parser.add_argument("--speed", type=float, default=100.0,
+                        help="Virtual seconds per real second between recognitions (default: 100)")
+    parser.add_argument("--recognition-speed", type=float, default=1.0,
+                        help="Virtual seconds per real second during recognition (default: 1)")
+    parser.add_argument("--drain", type=float, default=None,
+                        help="Virtual seconds to keep running after the last event")
+    args = parser.parse_args()
+
+    # Show the system's log on the console only; log timestamps follow the virtual clock
+    from logging_service import setup_logging
+    setup_logging(directory="")
+    install_fake_hardware()
+    reports = [replay(trace_dir, args.speed, args.recognition_speed, args.drain) for trace_dir in args.traces]
+
+    print()
+    for report in reports:
+        print(format_report(report))
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Regions of interest restricting face detection to part of a camera frame."""
+
+import numpy as np
+
+
+class RegionOfInterest:
+    """A rectangle or polygon of a camera frame in which faces are searched.
+
+    Detection runs on a slice of the frame covering the region's bounding
+    rectangle, which is a view of the frame rather than a copy. For polygons,
+    faces whose centre falls outside the polygon are discarded afterwards.
+    """
+
+    def __init__(self, points):
+        """Initialize the region.
+
+        Args:
+            points: Polygon corners as (x, y) pixel coordinates, in order
+        """
+        if len(points) < 3:
+            raise ValueError("A region of interest needs at least 3 points")
+        self.points = [(int(x), int(y)) for x, y in points]
+        xs = [x for x, _ in self.points]
+        ys = [y for _, y in self.points]
+        self.left, self.right = min(xs), max(xs)
+        self.top, self.bottom = min(ys), max(ys)
+        self.is_rectangle = len(self.points) == 4 and len(set(xs)) == 2 and len(set(ys)) == 2
+
+    @classmethod
+    def from_config(cls, value):
+        """Create a region from its configuration value.
+
+        Args:
+            value: [x, y, width, height] for a rectangle, or a list of [x, y]
+                   points for a polygon; None for no region
+
+        Returns:
+            RegionOfInterest: The region, or None if value is None
+        """
+        if value is None:
+            return None
+        if len(value) == 4 and all(isinstance(v, (int, float)) for v in value):
+            x, y, width, height = value
+            return cls([(x, y), (x + width, y), (x + width, y + height), (x, y + height)])
+        return cls(value)
+
+    def scaled(self, scale_x, scale_y):
+        """Get the region for a frame resized by the given factors.
+
+        Args:
+            scale_x: Horizontal scale factor
+            scale_y: Vertical scale factor
+
+        Returns:
+            RegionOfInterest: The scaled region
+        """
+        return RegionOfInterest([(round(x * scale_x), round(y * scale_y)) for x, y in self.points])
+
+    def bounds(self, shape):
+        """Get the region's bounding rectangle clipped to a frame.
+
+        Args:
+            shape: Frame shape (height, width, ...)
+
+        Returns:
+            tuple: (top, right, bottom, left) pixel bounds
+        """
+        height, width = shape[:2]
+        return (max(0, self.top), min(width, self.right), min(height, self.bottom), max(0, self.left))
+
+    def crop(self, frame):
+        """Slice the region's bounding rectangle out of a frame without copying.
+
+        Args:
+            frame: Full camera frame
+
+        Returns:
+            tuple: (view, (top, left)) where view is a slice of the frame and
+                   (top, left) the offset of the slice in the frame
+        """
+        top, right, bottom, left = self.bounds(frame.shape)
+        return frame[top:bottom, left:right], (top, left)
+
+    def contains(self, x, y):
+        """Check whether a point lies inside the region.
+
+        Args:
+            x: Horizontal pixel coordinate
+            y: Vertical pixel coordinate
+
+        Returns:
+            bool: True if the point is inside
+        """
+        if not (self.left <= x <= self.right and self.top <= y <= self.bottom):
+            return False
+        if self.is_rectangle:
+            return True
+
+        # Ray casting: count the polygon edges crossed by a ray to the right
+        inside = False
+        for (x1, y1), (x2, y2) in zip(self.points, self.points[1:] + self.points[:1]):
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+        return inside
+
+    def to_frame(self, locations, offset):
+        """Map face locations found in the cropped region back to the full frame.
+
+        Args:
+            locations: Face locations (top, right, bottom, left) within the crop
+            offset: (top, left) offset returned by crop()
+
+        Returns:
+            list: Full-frame face locations whose centre lies inside the region
+        """
+        offset_top, offset_left = offset
+        mapped = []
+        for top, right, bottom, left in locations:
+            location = (top + offset_top, right + offset_left, bottom + offset_top, left + offset_left)
+            if self.contains((location[1] + location[3]) / 2, (location[0] + location[2]) / 2):
+                mapped.append(location)
+        return mapped
+
+    def area_fraction(self, shape):
+        """Get the fraction of a frame covered by the region's bounding rectangle.
+
+        Args:
+            shape: Frame shape (height, width, ...)
+
+        Returns:
+            float: Searched area divided by the frame area
+        """
+        top, right, bottom, left = self.bounds(shape)
+        return max(0, bottom - top) * max(0, right - left) / float(np.prod(shape[:2]))
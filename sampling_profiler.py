@@ -0,0 +1,136 @@
+"""On-demand sampling profiler for the running security system."""
+
+import os
+import sys
+import time
+import logging
+import threading
+from collections import Counter
+import config
+from utils import generate_filename
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    """Periodically samples the stacks of all threads and writes them as collapsed stacks.
+
+    While running, a background thread takes a snapshot of every thread's stack
+    each ``interval`` seconds and counts identical stacks. On stop the counts are
+    written in the collapsed-stack format read by flame graph tools
+    (``thread;outer;...;inner count`` per line). Nothing runs while the profiler
+    is stopped.
+    """
+
+    def __init__(self, interval=config.PROFILER_INTERVAL, directory=config.PROFILER_DIR,
+                 max_depth=config.PROFILER_MAX_DEPTH, max_duration=config.PROFILER_MAX_DURATION):
+        """Initialize the profiler.
+
+        Args:
+            interval: Seconds between samples
+            directory: Directory the collapsed stack files are written to
+            max_depth: Maximum number of frames kept per stack (innermost frames are kept)
+            max_duration: Seconds after which a profile stops on its own
+        """
+        self.interval = interval
+        self.directory = directory
+        self.max_depth = max_depth
+        self.max_duration = max_duration
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.stacks = Counter()
+        self.samples = 0
+        self.sampling_time = 0.0
+        self.started_at = None
+
+    def is_running(self):
+        """Check whether a profile is being taken."""
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        """Start sampling.
+
+        Returns:
+            bool: True if sampling started, False if it was already running
+        """
+        with self.lock:
+            if self.is_running():
+                return False
+            self.stacks = Counter()
+            self.samples = 0
+            self.sampling_time = 0.0
+            self.started_at = time.time()
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._sampler_thread, name="profiler")
+            self.thread.daemon = True
+            self.thread.start()
+        logger.info("Sampling profiler started (%.0f samples/s, stops after %s s)", 1 / self.interval, self.max_duration)
+        return True
+
+    def stop(self):
+        """Stop sampling and write the collapsed stacks.
+
+        Returns:
+            str: Path of the written profile, or None if nothing was written
+        """
+        with self.lock:
+            if self.thread is None:
+                return None
+            self.stop_event.set()
+            self.thread.join(timeout=5)
+            self.thread = None
+            return self._write()
+
+    def toggle(self):
+        """Start the profiler if it is stopped, otherwise stop it and write the profile."""
+        if self.is_running():
+            self.stop()
+        else:
+            self.start()
+
+    def _sample(self, own_ident):
+        """Take one snapshot of all thread stacks except the profiler's own."""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _sampler_thread(self):
+        """Thread function that samples until stopped or the maximum duration has passed."""
+        own_ident = threading.get_ident()
+        deadline = time.monotonic() + self.max_duration
+        while not self.stop_event.wait(self.interval):
+            began = time.perf_counter()
+            self._sample(own_ident)
+            self.sampling_time += time.perf_counter() - began
+            if time.monotonic() >= deadline:
+                logger.info("Sampling profiler reached its maximum duration")
+                threading.Thread(target=self.stop, daemon=True).start()
+                return
+
+    def _write(self):
+        """Write the collected stacks to a new collapsed stack file."""
+        if not self.samples:
+            logger.info("Sampling profiler stopped without samples")
+            return None
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = generate_filename(prefix="profile", directory=self.directory, extension="folded")
+        with open(path, "w") as profile_file:
+            for stack, count in self.stacks.most_common():
+                profile_file.write(f"{stack} {count}\n")
+
+        elapsed = time.time() - self.started_at
+        overhead = self.sampling_time / elapsed * 100 if elapsed > 0 else 0.0
+        logger.info("Sampling profiler wrote %d samples over %.1f s to %s (sampling took %.1f%% of one core)",
+                    self.samples, elapsed, path, overhead)
+        return path
@@ -2,16 +2,25 @@
 
 import os
 import time
+import logging
 import threading
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 import face_recognition
 import config
-from sensors import MotionSensor, LightSensor, IndicatorLED
-from camera_manager import CameraManager
-from smart_bulb import SmartBulb
-from face_recognition_service import FaceRecognitionService
-from utils import Timer, generate_filename, safe_delete_file, get_timestamp
+from zone import load_zones
+from recognition_pool import RecognitionPool
+from remote_recognition import RemoteFaceRecognitionService
+from utils import TimerService, generate_filename, safe_delete_file
 from blynk_service import BlynkService
+from event_journal import EventJournal
+from frame_scheduler import FrameScheduler
+from trace_recorder import TraceRecorder
+from sampling_profiler import SamplingProfiler
+from snapshot_writer import SnapshotWriter
+
+logger = logging.getLogger(__name__)
 
 
 class SecuritySystem:
@@ -22,130 +31,312 @@ class SecuritySystem:
         # Initialize counters and state
         self.motion_count = 0
         self.running = False
-        self.lock = threading.Lock()  # For thread safety
+        self.lock = threading.Lock()  # Protects the motion counter shared by all zones
+        
+        # Runs all bulb, recognition and motion-sensor timeouts on one thread
+        self.timers = TimerService()
         
         # Initialize components
-        self.motion_sensor = MotionSensor()
-        self.light_sensor = LightSensor()
-        self.led = IndicatorLED()
-        self.camera = CameraManager()
-        self.bulb = SmartBulb()
-        self.face_service = FaceRecognitionService()
+        self.zones = load_zones(timers=self.timers)
+        # Connects bulbs and starts camera streams while the light level is read. A camera
+        # start abandoned because it was bright may still be warming up when the next
+        # motion arrives, hence three workers per zone
+        self.io_executor = ThreadPoolExecutor(max_workers=3 * len(self.zones), thread_name_prefix="motion-io")
+        # Offload recognition to a central server if one is configured
+        remote_service = RemoteFaceRecognitionService() if config.RECOGNITION_SERVER_HOST else None
+        self.recognition_pool = RecognitionPool(face_service=remote_service)
+        self.face_service = self.recognition_pool.face_service
         self.blynk_service = BlynkService()
+        self.journal = EventJournal()
+        self.snapshots = SnapshotWriter()
+        
+        # Started and stopped on demand (signals or Blynk)
+        self.profiler = SamplingProfiler()
+        self.blynk_service.set_profiler_callback(self.set_profiling)
+        
+        # Optionally record sensor inputs and frames for replay.py
+        self.recorder = None
+        if config.TRACE_RECORD_DIR:
+            self.recorder = TraceRecorder(config.TRACE_RECORD_DIR, zones=[zone.name for zone in self.zones])
         
         # Preload registered faces
         self._preload_registered_faces()
     
     def _preload_registered_faces(self):
         """Preload registered faces to avoid loading them each time motion is detected."""
-        self.registered_encodings, self.registered_info = self.face_service.load_registered_faces()
-        print(f"Preloaded {len(self.registered_encodings)} registered faces")
+        count = self.recognition_pool.load_gallery()
+        logger.info("Preloaded %d registered faces shared by %d zone(s)", count, len(self.zones))
     
     def start(self):
         """Start the security system and begin monitoring for motion."""
         if self.running:
-            print("Security system is already running")
+            logger.warning("Security system is already running")
             return
         
-        # Initialize camera
-        if not self.camera.initialize():
-            print("Failed to initialize camera. Security system will not start.")
+        # Initialize cameras and set up motion sensor callbacks for each zone
+        active_zones = 0
+        for zone in self.zones:
+            if not zone.camera.initialize():
+                logger.error("Failed to initialize camera for zone %s. Zone will not be monitored.", zone.name)
+                continue
+            zone.motion_sensor.set_callback(functools.partial(self._handle_motion, zone))
+            zone.motion_sensor.set_event_callback(functools.partial(self._record_pir_event, zone))
+            if self.recorder:
+                zone.motion_sensor.trigger_listener = functools.partial(self.recorder.record_pir, zone.name)
+            active_zones += 1
+        
+        if active_zones == 0:
+            logger.error("No zone could be initialized. Security system will not start.")
             return
         
-        # Set up motion sensor callback
-        self.motion_sensor.set_callback(self._handle_motion)
+        # Start the shared recognition workers and the timer thread
+        self.recognition_pool.start()
+        self.timers.start()
         
         # Start Blynk service
         self.blynk_service.start()
         
+        # Start the event journal and snapshot writers
+        self.journal.start()
+        self.snapshots.start()
+        if self.recorder:
+            self.recorder.start()
+        
         self.running = True
-        print("🟢 Security system is active and monitoring for motion...")
+        logger.info("🟢 Security system is active and monitoring for motion...")
     
     def stop(self):
         """Stop the security system and release resources."""
         self.running = False
-        self.camera.close()
+        self.profiler.stop()
+        
+        # Pending turn-offs are discarded with the timers, so switch lit bulbs off here instead
+        pending_offs = []
+        for zone in self.zones:
+            if zone.bulb_timer and zone.bulb_timer.is_pending():
+                zone.bulb_timer.cancel()
+                pending_offs.append(zone.bulb_timer.args)
+        self.timers.stop()
+        for args in pending_offs:
+            self._turn_off_bulb(*args, reason="because the system is stopping")
+        
+        for zone in self.zones:
+            if zone.recognition_stop:
+                zone.recognition_stop.set()
+            logger.info("Motion sensor %s: %s", zone.name, zone.motion_sensor.stats())
+            zone.close()
+        self.recognition_pool.stop()
+        self.io_executor.shutdown(wait=False)
+        logger.info("Face crop cache: %s", self.face_service.crop_cache.stats())
+        if self.face_service.quality_gate:
+            logger.info("Face quality gate: %s", self.face_service.quality_gate.stats())
         self.blynk_service.stop()
-        print("Security system has been stopped.")
+        self.journal.stop()
+        self.snapshots.stop()
+        if self.recorder:
+            self.recorder.stop()
+        logger.info("Security system has been stopped.")
     
-    def _handle_motion(self):
+    def set_profiling(self, enabled):
+        """Start or stop the sampling profiler.
+        
+        Args:
+            enabled: True to start sampling, False to stop and write the profile
+        """
+        # Stopping writes the profile, so keep it off the caller's thread
+        action = self.profiler.start if enabled else self.profiler.stop
+        threading.Thread(target=action, daemon=True).start()
+    
+    def _handle_motion(self, zone):
         """Handle motion detection event.
         
-        This method is called when the motion sensor detects motion. It performs
-        the following steps:
-        1. Checks if the environment is dark
-        2. If dark, turns on the smart bulb
+        This method is called when a zone's motion sensor detects motion. It performs
+        the following steps for that zone:
+        1. Checks if the environment is dark, while connecting to the bulb (if
+           not connected) and starting the camera stream in the background
+        2. If dark, turns on the smart bulb; if bright, closes the camera
+           stream and keeps the bulb connection for the next motion
         3. Activates face recognition for 30 seconds
         4. Changes bulb color based on recognized person's preference
-        5. Turns off the bulb after 2 minutes
+        5. Schedules the bulb to turn off after BULB_ON_DURATION
+        
+        Motion while the bulb is still on pushes the turn-off time back instead of
+        starting a new response. If someone was recognized in the zone within
+        RECENT_IDENTITY_TTL, the bulb is set to their color straight away and
+        recognition only confirms or corrects it.
+        
+        Args:
+            zone: The Zone whose motion sensor fired
         """
+        t_motion = time.time()
+        
         # Check if we're in manual mode from Blynk
         if self.blynk_service.get_operation_mode() == "manual":
-            print("System in manual mode - ignoring motion detection")
+            logger.info("System in manual mode - ignoring motion detection")
+            self.journal.record("motion", zone=zone.name, t_motion=t_motion, outcome="manual")
             return
         
-        # Avoid race conditions with multiple detections
-        with self.lock:
-            self.motion_count += 1
-            count = self.motion_count  # Store current count for this detection
+        # Avoid race conditions with multiple detections in the same zone
+        with zone.lock:
+            with self.lock:
+                self.motion_count += 1
+                count = self.motion_count  # Store current count for this detection
             
-            now = get_timestamp()
-            print(f"\n[{now}] 🚨 Motion detected! Total count: {count}")
+            # Keep the light on while motion continues
+            if zone.bulb_timer and zone.bulb_timer.extend(config.BULB_ON_DURATION):
+                logger.info("Motion in %s while lit, keeping bulb on for %s seconds", zone.name, config.BULB_ON_DURATION)
+                self.journal.record("motion", id=count, zone=zone.name, t_motion=t_motion, outcome="extended")
+                return
+            
+            logger.info("🚨 Motion detected in %s! Total count: %d", zone.name, count)
+            
+            # Connect to the bulb (unless its connection is still open) and warm up the
+            # camera while the light level is read; both are only needed if it is dark
+            bulb_connected = self.io_executor.submit(lambda: zone.bulb.connected or zone.bulb.connect())
+            video_stream = self.io_executor.submit(zone.camera.get_video_stream)
             
             # Check light level
-            light_level = self.light_sensor.get_light_level()
-            print(f"Current light level: {light_level}")
+            light_level = zone.light_sensor.get_light_level()
+            logger.info("Current light level: %s", light_level)
+            if self.recorder:
+                self.recorder.record_light(zone.name, light_level)
             
             # Only proceed if environment is dark
-            if not self.light_sensor.is_dark():
-                print("Bright environment detected. No action needed.")
+            if not zone.light_sensor.is_dark(light_level):
+                logger.info("Bright environment detected. No action needed.")
+                # A bulb connection that was opened is kept for the next motion
+                bulb_connected.cancel()
+                self._discard_video_stream(zone, video_stream)
+                self.journal.record("motion", id=count, zone=zone.name, t_motion=t_motion,
+                                    light_level=light_level, dark=False, outcome="bright")
                 return
                 
-            print("Dark environment detected. Activating security response...")
+            logger.info("Dark environment detected. Activating security response...")
             
             # Turn on the bulb with default color
-            if not self.bulb.connect():
-                print("Failed to connect to smart bulb. Aborting security response.")
+            if not bulb_connected.result():
+                logger.error("Failed to connect to smart bulb. Aborting security response.")
+                self._discard_video_stream(zone, video_stream)
+                self.journal.record("motion", id=count, zone=zone.name, t_motion=t_motion,
+                                    light_level=light_level, dark=True, outcome="bulb_unavailable")
                 return
                 
-            self.bulb.turn_on()
-            self.bulb.set_default_color()
+            self._record_bulb(zone, count, "on", zone.bulb.turn_on())
+            
+            # Whoever was recognized here moments ago is most likely back: show their color now
+            recent = zone.recent_identity()
+            if recent:
+                assumed_name, light_color = recent
+                logger.info("%s was recognized here recently, setting bulb to %s until confirmed", assumed_name, light_color)
+                self._record_bulb(zone, count, "color", self._set_bulb_color(zone, light_color), color=light_color)
+            else:
+                light_color = "default"
+                self._record_bulb(zone, count, "color", zone.bulb.set_default_color(), color="default")
+            
+            # Journal entry for this motion event, completed by the recognition thread
+            event = {
+                "id": count,
+                "zone": zone.name,
+                "t_motion": t_motion,
+                "t_light_on": time.time(),
+                "light_level": light_level,
+                "dark": True,
+            }
+            if recent:
+                event.update(assumed_name=assumed_name, assumed_color=light_color)
+            logger.info("Light on %.0f ms after motion", (event["t_light_on"] - t_motion) * 1000)
             
             # Update Blynk with light state
-            self.blynk_service.update_light_state(True, "default")
+            self.blynk_service.update_light_state(True, light_color)
             
-            # Create timers for face recognition and bulb control
-            face_recog_timer = Timer(config.FACE_RECOGNITION_DURATION).start()
-            bulb_timer = Timer(config.BULB_ON_DURATION).start()
+            # Schedule the end of face recognition and the bulb turn-off
+            recognition_stop = threading.Event()
+            zone.recognition_stop = recognition_stop
+            self.timers.schedule(config.FACE_RECOGNITION_DURATION, recognition_stop.set)
+            zone.bulb_timer = self.timers.schedule(config.BULB_ON_DURATION, self._bulb_timeout, zone, count)
             
             # Start face recognition thread
             face_thread = threading.Thread(
                 target=self._run_face_recognition, 
-                args=(count, face_recog_timer, bulb_timer)
+                args=(zone, count, recognition_stop, zone.bulb_timer, video_stream, event)
             )
             face_thread.daemon = True
             face_thread.start()
+    
+    def _discard_video_stream(self, zone, video_stream):
+        """Abandon a camera stream started for a motion event that needs no recognition.
+        
+        Args:
+            zone: The Zone whose camera the stream belongs to
+            video_stream: Future of the camera's get_video_stream()
+        """
+        # A stream that is already starting is closed once it has started
+        if not video_stream.cancel():
+            video_stream.add_done_callback(lambda future: zone.camera.close_video_stream(future.result()))
+    
+    def _record_pir_event(self, zone, event, trigger_count):
+        """Record a coalesced motion sensor event in the event journal.
+        
+        Args:
+            zone: The Zone whose motion sensor produced the event
+            event: 'started', 'continuing' or 'ended'
+            trigger_count: Number of raw PIR triggers the event stands for
+        """
+        self.journal.record("pir", zone=zone.name, state=event, triggers=trigger_count)
+    
+    def _bulb_timeout(self, zone, count):
+        """Hand the turn-off of a zone's bulb to the I/O threads once its on-duration has passed.
+        
+        Called on the timer service thread, which must not wait for the bulb.
+        
+        Args:
+            zone: The Zone whose bulb timer expired
+            count: The motion detection count that turned the bulb on
+        """
+        self.io_executor.submit(self._turn_off_bulb, zone, count)
+    
+    def _turn_off_bulb(self, zone, count, reason=None):
+        """Turn off a zone's bulb unless new motion has switched it on again.
+        
+        Args:
+            zone: The Zone whose bulb timer expired
+            count: The motion detection count that turned the bulb on
+            reason: Why the bulb is turned off, for the log (defaults to the timeout)
+        """
+        with zone.lock:
+            # Motion that arrived as the timer fired started a new response with its own timer
+            if zone.bulb_timer and zone.bulb_timer.is_pending():
+                return
             
-            # Wait for the bulb timer in the main thread
-            while not bulb_timer.has_expired() and self.running:
-                time.sleep(1)
-                
-            # Turn off the bulb after the specified duration
-            print(f"[{get_timestamp()}] Turning off bulb after {config.BULB_ON_DURATION} seconds")
-            self.bulb.turn_off()
+            # Stop recognition first so it does not set a color after the bulb is off
+            if zone.recognition_stop:
+                zone.recognition_stop.set()
             
-            # Update Blynk with light state
-            self.blynk_service.update_light_state(False, "none")
+            logger.info("Turning off bulb in %s %s", zone.name,
+                        reason or f"after {config.BULB_ON_DURATION} seconds without motion")
+            self._record_bulb(zone, count, "off", zone.bulb.turn_off())
+        
+        # Update Blynk with light state
+        self.blynk_service.update_light_state(False, "none")
     
-    def _run_face_recognition(self, count, face_timer, bulb_timer):
+    def _run_face_recognition(self, zone, count, recognition_stop, bulb_timer, video_stream, event):
         """Run face recognition for the specified duration.
         
+        Frames are processed by the shared recognition pool, which schedules
+        frames from all zones fairly.
+        
         Args:
+            zone: The Zone whose camera and bulb are used
             count: The motion detection count for this event
-            face_timer: Timer for face recognition duration
-            bulb_timer: Timer for bulb on duration (to set color when face is recognized)
+            recognition_stop: Event set when recognition time is up or the bulb turned off
+            bulb_timer: ScheduledTimer of the bulb turn-off (to skip the red alert once the bulb is off)
+            video_stream: Future of the camera's get_video_stream(), started when motion was detected
+            event: Journal entry for this motion event, completed and recorded here
         """
-        print(f"[{get_timestamp()}] Starting face recognition for {config.FACE_RECOGNITION_DURATION} seconds")
+        event["t_recognition_start"] = time.time()
+        event["frames"] = 0
+
+        logger.info("Starting face recognition for %s seconds", config.FACE_RECOGNITION_DURATION)
         
         # Reload registered faces to ensure we have the latest
         if count % 10 == 0:  # Reload every 10 detections to avoid constant reloading
@@ -154,33 +345,57 @@ class SecuritySystem:
         recognized_face = False
         recognized_color = None
         
-        # Get the video stream from the camera
-        video_stream = self.camera.get_video_stream()
+        # Wait for the video stream started alongside the light level check
+        video_stream = video_stream.result()
         if not video_stream:
-            print("Failed to start video stream for face recognition")
+            logger.error("Failed to start video stream for face recognition")
+            event["outcome"] = "camera_unavailable"
+            self.journal.record("motion", **event)
             return
             
-        camera, rawCapture = video_stream
+        _, rawCapture = video_stream
         
         # Signal with LED for video stream starting
-        self.led.on()
+        zone.led.on()
+        
+        # Paces frames to the configured frame rate and CPU budget
+        scheduler = FrameScheduler(max_downsample=zone.camera.max_detection_downsample())
+        upsample = zone.camera.detection_upsample()
+        
+        # Kept as evidence if nobody is recognized
+        image = None
+        evidence_frame = None
         
         try:
             # Process video frames until timer expires or a face is recognized
-            for frame in camera.capture_continuous(rawCapture, format="bgr", use_video_port=True):
+            # Low-resolution detection frames; full-resolution frames are grabbed only to encode a face
+            full_frame = zone.camera.full_frame_source()
+            if full_frame and self.recorder:
+                # Record the grabs too, so replay encodes the same pixels as the live pipeline
+                full_frame = functools.partial(self._grab_and_record, zone, full_frame)
+            for frame in zone.camera.capture_frames(rawCapture):
                 # Check if time is up
-                if face_timer.has_expired() or not self.running or bulb_timer.has_expired():
+                if recognition_stop.is_set() or not self.running:
                     break
                     
                 # Get the array from the frame
                 image = frame.array
+                if event["frames"] == 0:
+                    event["t_first_frame"] = time.time()
+                    logger.info("First frame %.0f ms after motion", (event["t_first_frame"] - event["t_motion"]) * 1000)
+                event["frames"] += 1
+                if self.recorder:
+                    self.recorder.record_frame(zone.name, image)
                 
                 # Process the frame to recognize faces
-                results = self.face_service.process_frame(
-                    image, 
-                    self.registered_encodings, 
-                    self.registered_info
-                )
+                scheduler.frame_started()
+                results = self.recognition_pool.submit(
+                    zone.name, image, scheduler.downsample, zone.detection_roi, full_frame, upsample
+                ).result()
+                scheduler.frame_finished(face_found=bool(results))
+                if results:
+                    # Latest frame showing a face, at full resolution when one was grabbed to encode it
+                    evidence_frame = zone.camera.last_full_frame if full_frame else image
                 
                 # Filter strong matches only (name is recognized and distance is below threshold)
                 strong_matches = [r for r in results if r[1] and r[3] < config.FACE_RECOGNITION_THRESHOLD]
@@ -191,10 +406,16 @@ class SecuritySystem:
                     (top, right, bottom, left), name, color, distance, gap = best_match
                     recognized_face = True
                     recognized_color = color
-                    print(f"[{get_timestamp()}] Recognized {name}! Setting bulb to favorite color: {color}")
-
-                    # Try to parse the color and set the bulb
-                    self._set_bulb_color(color)
+                    event.update(t_recognized=time.time(), name=name, color=color,
+                                 distance=float(distance), gap=float(gap))
+                    zone.remember_identity(name, color)
+                    
+                    if color == event.get("assumed_color"):
+                        logger.info("Recognized %s! Bulb already shows favorite color: %s", name, color)
+                    else:
+                        logger.info("Recognized %s! Setting bulb to favorite color: %s", name, color)
+                        # Queue the color change so a slow bulb does not hold up this thread
+                        self._record_bulb(zone, count, "color", self._set_bulb_color(zone, color), color=color)
 
                     # Update Blynk with the recognized face and color
                     self.blynk_service.add_recognized_face(name)
@@ -207,30 +428,82 @@ class SecuritySystem:
                 rawCapture.truncate(0)
                 rawCapture.seek(0)
                 
-                # Brief delay between frames
-                time.sleep(0.1)
+                # Adaptive delay between frames
+                scheduler.wait()
                 
         except Exception as e:
-            print(f"Error during video face recognition: {e}")
+            logger.exception("Error during video face recognition: %s", e)
             
         finally:
             # Turn off the LED
-            self.led.off()
+            zone.led.off()
         
-        if not recognized_face and self.running and not bulb_timer.has_expired():
-            print(f"[{get_timestamp()}] No face recognized during the detection period")
+        if not recognized_face:
+            # Do not assume this zone's last person next time
+            zone.forget_identity()
+        
+        if not recognized_face and self.running and bulb_timer.is_pending():
+            logger.info("No face recognized during the detection period")
             # Set the bulb to red if no face was recognized
-            self.bulb.set_color(255, 0, 0)  # Red
+            self._record_bulb(zone, count, "color", zone.bulb.set_color_async(255, 0, 0), color="red")  # Red
             self.blynk_service.update_light_state(True, "red")
+        
+        if not recognized_face and self.running:
+            # Save who was there; the writer drops the frame rather than making this thread wait
+            frame = evidence_frame if evidence_frame is not None else image
+            if frame is not None:
+                snapshot = self.snapshots.submit(frame, prefix=f"unrecognized_{zone.name}")
+                if snapshot:
+                    event["snapshot"] = snapshot
+        
+        event["t_recognition_end"] = time.time()
+        event["outcome"] = "recognized" if recognized_face else "unrecognized"
+        self.journal.record("motion", **event)
             
-        print(f"[{get_timestamp()}] Face recognition completed for motion #{count}")
+        logger.info("Face recognition completed for motion #%d", count)
     
-    def _set_bulb_color(self, color_name):
-        """Set the bulb color based on a color name.
+    def _set_bulb_color(self, zone, color_name):
+        """Queue a bulb color change based on a color name.
         
         Args:
+            zone: The Zone whose bulb is set
             color_name: Name of the color to set
+            
+        Returns:
+            Future: Resolves to True once the bulb confirms the color, False otherwise
         """
         # Use the centralized color mapping from config
         color = config.SUPPORTED_COLORS.get(color_name.lower(), (100, 100, 100))
-        self.bulb.set_color(*color)
\ No newline at end of file
+        return zone.bulb.set_color_async(*color)
+    
+    def _grab_and_record(self, zone, grab):
+        """Grab a full-resolution frame and add it to the trace being recorded.
+        
+        Args:
+            zone: The Zone whose camera is grabbed
+            grab: The camera's full-resolution grab function
+            
+        Returns:
+            numpy.ndarray: The grabbed frame
+        """
+        frame = grab()
+        self.recorder.record_full_frame(zone.name, frame)
+        return frame
+    
+    def _record_bulb(self, zone, count, action, success, color=None):
+        """Record a bulb command in the event journal.
+        
+        Args:
+            zone: The Zone whose bulb received the command
+            count: The motion detection count the command belongs to
+            action: Bulb action ('on', 'off' or 'color')
+            success: Whether the command succeeded, or a Future for a queued command
+            color: Color name for 'color' actions
+        """
+        if isinstance(success, Future):
+            # Record queued commands once the bulb has confirmed them
+            success.add_done_callback(
+                lambda future: self._record_bulb(zone, count, action, not future.cancelled() and future.result(), color)
+            )
+            return
+        self.journal.record("bulb", id=count, zone=zone.name, action=action, success=bool(success), color=color)
\ No newline at end of file
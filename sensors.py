@@ -1,5 +1,7 @@
 """Sensors module for handling motion detection and light level sensing."""
 
+import time
+import threading
 from grove.grove_mini_pir_motion_sensor import GroveMiniPIRMotionSensor
 from grove.adc import ADC
 from grove.grove_led import GroveLed
@@ -27,39 +29,159 @@ class LightSensor:
         """
         return self.adc.read(self.channel)
     
-    def is_dark(self):
+    def is_dark(self, light_level=None):
         """Check if the environment is dark based on the light threshold.
         
+        Args:
+            light_level: Reading to check instead of reading the sensor again
+            
         Returns:
             bool: True if it's dark, False otherwise
         """
-        return self.get_light_level() < config.LIGHT_THRESHOLD
+        if light_level is None:
+            light_level = self.get_light_level()
+        return light_level < config.LIGHT_THRESHOLD
 
 
 class MotionSensor:
-    """Class to handle motion detection using Grove Mini PIR Motion Sensor."""
+    """Class to handle motion detection using Grove Mini PIR Motion Sensor.
+    
+    Raw PIR triggers are coalesced into motion events. The first trigger after a
+    quiet spell starts motion; further triggers are delivered as "continuing" at
+    most once per refractory period; when no trigger has arrived for the quiet
+    period the motion has ended. Each delivered event carries the number of raw
+    triggers it stands for.
+    """
     
-    def __init__(self, pin=config.PIR_SENSOR_PIN):
+    def __init__(self, pin=config.PIR_SENSOR_PIN, refractory=config.PIR_REFRACTORY_PERIOD,
+                 quiet_period=config.PIR_QUIET_PERIOD, timers=None):
         """Initialize the Motion Sensor.
         
         Args:
             pin: GPIO pin number for the PIR sensor
+            refractory: Minimum seconds between delivered events while motion continues
+            quiet_period: Seconds without a trigger after which motion has ended
+            timers: Optional utils.TimerService used to report the end of motion on time;
+                    without it, the end is reported when the next trigger arrives
         """
         self.sensor = GroveMiniPIRMotionSensor(pin)
         self.callback = None
+        self.event_callback = None
+        self.trigger_listener = None  # Called on every raw trigger (used by the trace recorder)
+        self.refractory = refractory
+        self.quiet_period = quiet_period
+        self.timers = timers
+        
+        self.lock = threading.Lock()
+        self.active = False
+        self.last_trigger = 0
+        self.last_delivered = 0
+        self.pending_triggers = 0
+        self.end_timer = None
+        
+        # Counters for tuning the debounce settings
+        self.raw_triggers = 0
+        self.delivered = {"started": 0, "continuing": 0, "ended": 0}
     
     def set_callback(self, callback):
         """Set the callback function to be called when motion is detected.
         
+        The callback is called when motion starts and at most once per refractory
+        period while it continues.
+        
         Args:
             callback: Function to call when motion is detected
         """
         self.callback = callback
         self.sensor.on_detect = self._on_motion_detected
     
+    def set_event_callback(self, callback):
+        """Set the callback function to be called for every coalesced motion event.
+        
+        Args:
+            callback: Function called as callback(event, trigger_count) where event is
+                      'started', 'continuing' or 'ended'
+        """
+        self.event_callback = callback
+        self.sensor.on_detect = self._on_motion_detected
+    
+    def stats(self):
+        """Get raw trigger and delivered event counts.
+        
+        Returns:
+            dict: Raw trigger count and delivered counts per event type
+        """
+        with self.lock:
+            return {"raw": self.raw_triggers, **self.delivered}
+    
     def _on_motion_detected(self):
-        """Internal method called when motion is detected."""
-        if self.callback:
+        """Internal method called on every raw PIR trigger."""
+        now = time.monotonic()
+        events = []
+        
+        if self.trigger_listener:
+            self.trigger_listener()
+        
+        with self.lock:
+            self.raw_triggers += 1
+            
+            # Without a timer service the end of motion is noticed on the next trigger
+            if self.active and self.timers is None and now - self.last_trigger >= self.quiet_period:
+                events.append(self._end_motion_locked())
+            
+            self.pending_triggers += 1
+            self.last_trigger = now
+            
+            if not self.active:
+                self.active = True
+                events.append(self._deliver_locked("started", now))
+            elif now - self.last_delivered >= self.refractory:
+                events.append(self._deliver_locked("continuing", now))
+            
+            if self.timers is not None:
+                if self.end_timer is None or not self.end_timer.extend(self.quiet_period):
+                    self.end_timer = self.timers.schedule(self.quiet_period, self._on_quiet)
+        
+        for event, count in events:
+            self._emit(event, count)
+    
+    def _on_quiet(self):
+        """Internal method called when no trigger arrived for the quiet period."""
+        with self.lock:
+            if not self.active:
+                return
+            event = self._end_motion_locked()
+        self._emit(*event)
+    
+    def _deliver_locked(self, event, now):
+        """Record a delivered start/continuing event. Must be called with the lock held.
+        
+        Returns:
+            tuple: (event, trigger_count)
+        """
+        count = self.pending_triggers
+        self.pending_triggers = 0
+        self.last_delivered = now
+        self.delivered[event] += 1
+        return event, count
+    
+    def _end_motion_locked(self):
+        """Record the end of motion. Must be called with the lock held.
+        
+        Returns:
+            tuple: ('ended', trigger_count)
+        """
+        count = self.pending_triggers
+        self.pending_triggers = 0
+        self.active = False
+        self.delivered["ended"] += 1
+        return "ended", count
+    
+    def _emit(self, event, count):
+        """Deliver a motion event to the registered callbacks."""
+        if self.event_callback:
+            self.event_callback(event, count)
+        if self.callback and event != "ended":
             self.callback()
 
 
@@ -1,11 +1,31 @@
 """Smart bulb controller module for Tuya bulbs."""
 
+import time
+import logging
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 import tinytuya
 import config
 
+logger = logging.getLogger(__name__)
+
 
 class SmartBulb:
-    """Class to control a Tuya smart bulb."""
+    """Class to control a Tuya smart bulb.
+    
+    turn_on, turn_off and set_color block until the bulb acknowledges the
+    command. The *_async variants put the command on an ordered per-bulb queue
+    and return a Future immediately; a background thread sends queued commands
+    without waiting for the acknowledgement, then reads the bulb state back and
+    resends the command if the bulb did not end up in the requested state.
+    
+    Only the last of several queued commands is confirmed, since it decides
+    the bulb's final state; the futures of the commands it superseded resolve
+    with its outcome. A blocking command sent while a queued one is being
+    confirmed takes precedence: the queued command is not resent and its
+    future resolves to False.
+    """
     
     def __init__(self, device_id=config.DEVICE_ID, ip_address=config.DEVICE_IP, local_key=config.LOCAL_KEY):
         """Initialize the SmartBulb controller.
@@ -20,6 +40,12 @@ class SmartBulb:
         self.local_key = local_key
         self.bulb = None
         self.connected = False
+        
+        # Serializes access to the device between callers and the command thread
+        self.io_lock = threading.RLock()
+        self.direct_commands = 0  # Blocking commands sent, so confirmation never undoes one
+        self.commands = queue.Queue()
+        self.command_thread = None
     
     def connect(self):
         """Connect to the Tuya bulb device.
@@ -28,16 +54,19 @@ class SmartBulb:
             bool: True if connection is successful, False otherwise
         """
         try:
-            self.bulb = tinytuya.BulbDevice(self.device_id, self.ip_address, self.local_key)
-            self.bulb.set_version(3.5)
-            status = self.bulb.status()
-            print("Connection successful. Bulb status:", status)
+            with self.io_lock:
+                self.bulb = tinytuya.BulbDevice(self.device_id, self.ip_address, self.local_key)
+                self.bulb.set_version(3.5)
+                # Keep the socket open so commands sent without waiting are not cut off
+                self.bulb.set_socketPersistent(True)
+                status = self.bulb.status()
+            logger.info("Connection successful. Bulb status: %s", status)
             self.connected = True
             return True
         except tinytuya.TuyaError as e:
-            print(f"Tuya Error during bulb initialization: {e}")
+            logger.error("Tuya Error during bulb initialization: %s", e)
         except Exception as e:
-            print(f"Unexpected error during bulb initialization: {e}")
+            logger.error("Unexpected error during bulb initialization: %s", e)
         
         self.connected = False
         return False
@@ -52,14 +81,18 @@ class SmartBulb:
             return False
         
         try:
-            self.bulb.turn_on()
-            print("Bulb turned on.")
+            with self.io_lock:
+                self.direct_commands += 1
+                self.bulb.turn_on()
+            logger.info("Bulb turned on.")
             return True
         except tinytuya.TuyaError as e:
-            print(f"Tuya Error while turning on: {e}")
+            logger.error("Tuya Error while turning on: %s", e)
         except Exception as e:
-            print(f"Unexpected error while turning on: {e}")
+            logger.error("Unexpected error while turning on: %s", e)
         
+        # Reconnect on the next motion in case the bulb dropped the connection
+        self.connected = False
         return False
     
     def turn_off(self):
@@ -72,14 +105,18 @@ class SmartBulb:
             return False
         
         try:
-            self.bulb.turn_off()
-            print("Bulb turned off.")
+            with self.io_lock:
+                self.direct_commands += 1
+                self.bulb.turn_off()
+            logger.info("Bulb turned off.")
             return True
         except tinytuya.TuyaError as e:
-            print(f"Tuya Error while turning off: {e}")
+            logger.error("Tuya Error while turning off: %s", e)
         except Exception as e:
-            print(f"Unexpected error while turning off: {e}")
+            logger.error("Unexpected error while turning off: %s", e)
         
+        # Reconnect on the next motion in case the bulb dropped the connection
+        self.connected = False
         return False
     
     def set_color(self, r, g, b):
@@ -97,14 +134,18 @@ class SmartBulb:
             return False
         
         try:
-            self.bulb.set_colour(r, g, b)
-            print(f"Bulb color set to RGB({r}, {g}, {b}).")
+            with self.io_lock:
+                self.direct_commands += 1
+                self.bulb.set_colour(r, g, b)
+            logger.info("Bulb color set to RGB(%d, %d, %d).", r, g, b)
             return True
         except tinytuya.TuyaError as e:
-            print(f"Tuya Error while setting color: {e}")
+            logger.error("Tuya Error while setting color: %s", e)
         except Exception as e:
-            print(f"Unexpected error while setting color: {e}")
+            logger.error("Unexpected error while setting color: %s", e)
         
+        # Reconnect on the next motion in case the bulb dropped the connection
+        self.connected = False
         return False
         
     def set_default_color(self):
@@ -113,4 +154,361 @@ class SmartBulb:
         Returns:
             bool: True if successful, False otherwise
         """
-        return self.set_color(255, 255, 255) 
\ No newline at end of file
+        return self.set_color(255, 255, 255)
+    
+    def turn_on_async(self):
+        """Queue a turn-on command without waiting for the bulb.
+        
+        Returns:
+            Future: Resolves to True once the bulb is confirmed on, False otherwise
+        """
+        return self._submit("on")
+    
+    def turn_off_async(self):
+        """Queue a turn-off command without waiting for the bulb.
+        
+        Returns:
+            Future: Resolves to True once the bulb is confirmed off, False otherwise
+        """
+        return self._submit("off")
+    
+    def set_color_async(self, r, g, b):
+        """Queue a color change without waiting for the bulb.
+        
+        Args:
+            r: Red component (0-255)
+            g: Green component (0-255)
+            b: Blue component (0-255)
+            
+        Returns:
+            Future: Resolves to True once the color is confirmed, False otherwise
+        """
+        return self._submit("color", (r, g, b))
+    
+    def close(self):
+        """Stop the command thread after the queued commands have been sent."""
+        if self.command_thread and self.command_thread.is_alive():
+            self.commands.put((None, None, None))
+            self.command_thread.join(timeout=5)
+        self.command_thread = None
+    
+    def _submit(self, action, args=()):
+        """Put a command on the bulb's command queue.
+        
+        Args:
+            action: 'on', 'off' or 'color'
+            args: Arguments of the command
+            
+        Returns:
+            Future: Resolves to the command's success
+        """
+        future = Future()
+        self.commands.put((action, args, future))
+        
+        if self.command_thread is None or not self.command_thread.is_alive():
+            self.command_thread = threading.Thread(target=self._command_loop)
+            self.command_thread.daemon = True
+            self.command_thread.start()
+        return future
+    
+    def _send(self, action, args, nowait):
+        """Send a single command to the device.
+        
+        Args:
+            action: 'on', 'off' or 'color'
+            args: Arguments of the command
+            nowait: True to return without waiting for the device reply
+        """
+        with self.io_lock:
+            if action == "on":
+                self.bulb.turn_on(nowait=nowait)
+            elif action == "off":
+                self.bulb.turn_off(nowait=nowait)
+            else:
+                self.bulb.set_colour(*args, nowait=nowait)
+    
+    def _state_matches(self, action, args):
+        """Check whether the bulb is in the state a command requested.
+        
+        Args:
+            action: 'on', 'off' or 'color'
+            args: Arguments of the command
+            
+        Returns:
+            bool: True if the bulb reports the requested state
+        """
+        with self.io_lock:
+            state = self.bulb.state()
+            if "is_on" not in state:
+                return False
+            if action == "off":
+                return not state["is_on"]
+            if action == "on":
+                return state["is_on"]
+            rgb = self.bulb.colour_rgb()
+        
+        # Colours round-trip through HSV on the device, so allow small differences
+        return state["is_on"] and all(abs(actual - wanted) <= config.BULB_COLOR_TOLERANCE
+                                      for actual, wanted in zip(rgb, args))
+    
+    def _confirm(self, action, args):
+        """Confirm a command took effect, resending it with acknowledgement if not.
+        
+        Args:
+            action: 'on', 'off' or 'color'
+            args: Arguments of the command
+            
+        Returns:
+            bool: True if the bulb reached the requested state
+        """
+        direct_commands = self.direct_commands
+        for attempt in range(config.BULB_MAX_RETRIES + 1):
+            time.sleep(config.BULB_CONFIRM_DELAY)
+            with self.io_lock:
+                # A blocking command sent since (e.g. the turn-off) decides the state now; do not undo it
+                if self.direct_commands != direct_commands:
+                    logger.info("'%s' command superseded by a direct command before it was confirmed", action)
+                    return False
+                if self._state_matches(action, args):
+                    return True
+                if attempt < config.BULB_MAX_RETRIES:
+                    logger.warning("Bulb state does not match '%s' command, retrying (%d/%d)",
+                                   action, attempt + 1, config.BULB_MAX_RETRIES)
+                    self._send(action, args, nowait=False)
+        
+        logger.error("Bulb did not confirm '%s' command after %d retries", action, config.BULB_MAX_RETRIES)
+        return False
+    
+    def _settle(self, futures, action, args):
+        """Confirm the last command sent and resolve the futures waiting on it.
+        
+        Args:
+            futures: Futures of the command and of the commands it superseded
+            action: 'on', 'off' or 'color' of the last command sent
+            args: Arguments of the last command sent
+        """
+        try:
+            result = self._confirm(action, args)
+        except Exception as e:
+            logger.error("Error confirming '%s' command: %s", action, e)
+            self.connected = False
+            result = False
+        for future in futures:
+            future.set_result(result)
+    
+    def _command_loop(self):
+        """Thread function that sends queued commands in order and confirms them."""
+        pending = []  # Futures of sent commands waiting for the last one sent to be confirmed
+        sent = None  # (action, args) of the last command sent
+        while True:
+            action, args, future = self.commands.get()
+            if action is None:
+                # close() was queued right behind a command that is not confirmed yet
+                if pending:
+                    self._settle(pending, *sent)
+                return
+            if not future.set_running_or_notify_cancel():
+                if pending and self.commands.empty():
+                    self._settle(pending, *sent)
+                    pending = []
+                continue
+            
+            pending.append(future)
+            try:
+                connected = self.connected or self.connect()
+                if connected:
+                    self._send(action, args, nowait=True)
+                    sent = (action, args)
+            except Exception as e:
+                logger.error("Error sending '%s' command to bulb: %s", action, e)
+                self.connected = connected = False
+            
+            if not connected:
+                for waiting in pending:
+                    waiting.set_result(False)
+                pending = []
+            elif self.commands.empty():
+                # Nothing newer is queued, so this command decides the bulb's final state
+                self._settle(pending, *sent)
+                pending = []
+
+
+class BulbGroup:
+    """Several Tuya bulbs that are switched together, with the SmartBulb interface.
+    
+    Every command is sent to all members at once: blocking commands run on one
+    thread per member and the *_async variants use each member's own command
+    queue, so the group takes about as long as its slowest bulb rather than the
+    sum of all of them. Each member keeps its persistent connection.
+    
+    Commands succeed only if every member succeeded, except connect(), which
+    succeeds if any member connected so that one dead bulb does not leave the
+    area dark. The per-member outcome of the last command is kept in
+    ``last_results``.
+    """
+    
+    def __init__(self, devices):
+        """Initialize the group.
+        
+        Args:
+            devices: List of {"device_id", "device_ip", "local_key"} dictionaries, one per bulb
+        """
+        if not devices:
+            raise ValueError("A bulb group needs at least one device")
+        self.members = [SmartBulb(device["device_id"], device["device_ip"], device["local_key"])
+                        for device in devices]
+        self.executor = ThreadPoolExecutor(max_workers=len(self.members), thread_name_prefix="bulb-group")
+        self.connected = False
+        self.last_results = []  # (device_id, success, latency in seconds) per member
+    
+    def connect(self):
+        """Connect to the member bulbs that are not connected yet.
+        
+        Members keep their connection between commands; one whose last command
+        failed is reconnected.
+        
+        Returns:
+            bool: True if at least one bulb is connected
+        """
+        results = self._fan_out("connect", lambda member: member.connected or member.connect())
+        self.connected = any(success for _, success, _ in results)
+        return self.connected
+    
+    def turn_on(self):
+        """Turn all bulbs on.
+        
+        Returns:
+            bool: True if every bulb turned on
+        """
+        return all(success for _, success, _ in self._fan_out("on", lambda member: member.turn_on()))
+    
+    def turn_off(self):
+        """Turn all bulbs off.
+        
+        Returns:
+            bool: True if every bulb turned off
+        """
+        return all(success for _, success, _ in self._fan_out("off", lambda member: member.turn_off()))
+    
+    def set_color(self, r, g, b):
+        """Set the color of all bulbs using RGB values.
+        
+        Args:
+            r: Red component (0-255)
+            g: Green component (0-255)
+            b: Blue component (0-255)
+            
+        Returns:
+            bool: True if every bulb changed color
+        """
+        return all(success for _, success, _ in self._fan_out("color", lambda member: member.set_color(r, g, b)))
+    
+    def set_default_color(self):
+        """Set all bulbs to the default color.
+        
+        Returns:
+            bool: True if every bulb changed color
+        """
+        return self.set_color(255, 255, 255)
+    
+    def turn_on_async(self):
+        """Queue a turn-on command on every bulb without waiting.
+        
+        Returns:
+            Future: Resolves to True once every bulb is confirmed on, False otherwise
+        """
+        return self._combine("on", [member.turn_on_async() for member in self.members])
+    
+    def turn_off_async(self):
+        """Queue a turn-off command on every bulb without waiting.
+        
+        Returns:
+            Future: Resolves to True once every bulb is confirmed off, False otherwise
+        """
+        return self._combine("off", [member.turn_off_async() for member in self.members])
+    
+    def set_color_async(self, r, g, b):
+        """Queue a color change on every bulb without waiting.
+        
+        Args:
+            r: Red component (0-255)
+            g: Green component (0-255)
+            b: Blue component (0-255)
+            
+        Returns:
+            Future: Resolves to True once every bulb confirmed the color, False otherwise
+        """
+        return self._combine("color", [member.set_color_async(r, g, b) for member in self.members])
+    
+    def close(self):
+        """Stop the members' command threads and the fan-out threads."""
+        for member in self.members:
+            member.close()
+        self.executor.shutdown(wait=False)
+    
+    def _fan_out(self, action, command):
+        """Run a blocking command on all members concurrently and wait for all of them.
+        
+        Args:
+            action: Name of the command, for the log
+            command: Function taking a member SmartBulb and returning its success
+            
+        Returns:
+            list: (device_id, success, latency in seconds) per member
+        """
+        def timed(member):
+            started = time.perf_counter()
+            try:
+                success = bool(command(member))
+            except Exception as e:
+                logger.error("Error sending '%s' command to bulb %s: %s", action, member.device_id, e)
+                success = False
+            return member.device_id, success, time.perf_counter() - started
+        
+        results = list(self.executor.map(timed, self.members))
+        self._report(action, results)
+        return results
+    
+    def _combine(self, action, futures):
+        """Combine the members' command futures into one.
+        
+        Args:
+            action: Name of the command, for the log
+            futures: One Future per member, in member order
+            
+        Returns:
+            Future: Resolves to True once every member succeeded, False otherwise
+        """
+        combined = Future()
+        started = time.perf_counter()
+        results = [None] * len(futures)
+        remaining = [len(futures)]
+        lock = threading.Lock()
+        
+        def member_done(index, future):
+            success = not future.cancelled() and future.exception() is None and bool(future.result())
+            with lock:
+                results[index] = (self.members[index].device_id, success, time.perf_counter() - started)
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            self._report(action, results)
+            combined.set_result(all(success for _, success, _ in results))
+        
+        for index, future in enumerate(futures):
+            future.add_done_callback(lambda future, index=index: member_done(index, future))
+        return combined
+    
+    def _report(self, action, results):
+        """Keep and log the per-member outcome of a command.
+        
+        Args:
+            action: Name of the command
+            results: (device_id, success, latency in seconds) per member
+        """
+        self.last_results = results
+        succeeded = sum(1 for _, success, _ in results if success)
+        logger.info("Bulb group '%s': %d/%d bulbs succeeded in %.0f ms (%s)", action, succeeded, len(results),
+                    max(latency for _, _, latency in results) * 1000,
+                    ", ".join(f"{device_id} {'ok' if success else 'failed'} {latency * 1000:.0f} ms"
+                              for device_id, success, latency in results))
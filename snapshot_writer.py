@@ -0,0 +1,126 @@
+"""Background writer of evidence snapshots for unrecognized visitors."""
+
+import os
+import logging
+import queue
+import threading
+from PIL import Image
+import config
+from utils import generate_filename, safe_delete_file
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotWriter:
+    """Writes frames to JPEG files on a background thread within a disk quota.
+
+    Frames already in memory are put on a bounded queue and encoded by the
+    writer thread, so saving a snapshot never blocks the caller. When the
+    queue is full the new frame is dropped. After each write the oldest
+    snapshots are deleted until the directory is back within its quota.
+    """
+
+    def __init__(self, directory=config.SNAPSHOT_DIR, quota_bytes=config.SNAPSHOT_QUOTA_MB * 1024 * 1024,
+                 max_pending=config.SNAPSHOT_MAX_PENDING, quality=config.SNAPSHOT_JPEG_QUALITY):
+        """Initialize the snapshot writer.
+
+        Args:
+            directory: Directory where snapshots are stored
+            quota_bytes: Maximum total size of the stored snapshots
+            max_pending: Maximum number of frames waiting to be written (newer frames are dropped beyond this)
+            quality: JPEG quality (1-95)
+        """
+        self.directory = directory
+        self.quota_bytes = quota_bytes
+        self.quality = quality
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.thread = None
+        self.running = False
+
+        self.files = []  # (mtime, path, size) of stored snapshots, oldest first
+        self.total_bytes = 0
+        self.written = 0
+        self.dropped = 0
+        self.evicted = 0
+
+    def start(self):
+        """Scan the existing snapshots and start the writer thread."""
+        if self.running:
+            return
+
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+            logger.info("Created directory for snapshots: %s", self.directory)
+
+        for filename in os.listdir(self.directory):
+            if filename.lower().endswith(".jpg"):
+                path = os.path.join(self.directory, filename)
+                stat = os.stat(path)
+                self.files.append((stat.st_mtime, path, stat.st_size))
+        self.files.sort()
+        self.total_bytes = sum(size for _, _, size in self.files)
+
+        self.running = True
+        self.thread = threading.Thread(target=self._writer_thread)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """Stop the writer thread after writing the queued snapshots."""
+        if not self.running:
+            return
+        self.running = False
+        self.queue.put(None)
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=10)
+        logger.info("Snapshot writer stopped (%d written, %d dropped, %d evicted)", self.written, self.dropped, self.evicted)
+
+    def submit(self, frame, prefix="unrecognized"):
+        """Queue a frame to be saved without blocking.
+
+        The frame is kept by reference, so the caller must not modify it
+        afterwards (PiCamera buffers allocate a new array for every frame).
+
+        Args:
+            frame: BGR frame as a numpy array
+            prefix: Filename prefix passed to utils.generate_filename
+
+        Returns:
+            str: Path the snapshot will be written to, or None if it was dropped
+        """
+        if not self.running:
+            return None
+
+        path = generate_filename(prefix=prefix, directory=self.directory)
+        try:
+            self.queue.put_nowait((frame, path))
+            return path
+        except queue.Full:
+            self.dropped += 1
+            return None
+
+    def _writer_thread(self):
+        """Thread function that encodes queued frames and enforces the quota."""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            frame, path = item
+            try:
+                Image.fromarray(frame[:, :, ::-1]).save(path, quality=self.quality)
+                size = os.path.getsize(path)
+                self.files.append((os.path.getmtime(path), path, size))
+                self.total_bytes += size
+                self.written += 1
+                self._enforce_quota()
+            except Exception as e:
+                logger.error("Error writing snapshot %s: %s", path, e)
+
+    def _enforce_quota(self):
+        """Delete the oldest snapshots until the stored total is within the quota."""
+        # Never delete the snapshot that was just written
+        while self.total_bytes > self.quota_bytes and len(self.files) > 1:
+            _, path, size = self.files.pop(0)
+            if safe_delete_file(path):
+                self.total_bytes -= size
+                self.evicted += 1
@@ -0,0 +1,11 @@
+"""Shared test setup: the system runs on the replay harness's fake hardware."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import replay  # noqa: E402
+
+# Must happen before anything imports the hardware libraries
+replay.install_fake_hardware()
@@ -0,0 +1,97 @@
+"""Tests for the asyncio runtime."""
+
+import asyncio
+import os
+import time
+import pytest
+import config
+from async_runtime import AsyncSecuritySystem
+from snapshot_writer import SnapshotWriter
+
+
+@pytest.fixture
+def system(tmp_path, monkeypatch):
+    # Keep the gallery and journal out of the working tree
+    monkeypatch.chdir(tmp_path)
+    system = AsyncSecuritySystem()
+    yield system
+    system.io_executor.shutdown(wait=True)
+    system.cpu_executor.shutdown(wait=True)
+
+
+def test_motion_while_turn_off_waits_for_lock_keeps_bulb_on(system):
+    """Motion that re-arms the off timer before the turn-off gets the zone lock wins."""
+    zone = system.zones[0]
+    turned_off = []
+    zone.bulb.turn_off = lambda: turned_off.append(zone.name) or True
+
+    async def scenario():
+        system.loop = asyncio.get_running_loop()
+        lock = system.zone_locks[zone.name] = asyncio.Lock()
+        system._schedule_off(zone, 1)
+
+        async with lock:
+            # The timer fires while a motion event holds the zone lock...
+            system.off_handles[zone.name].cancel()
+            system._bulb_timeout(zone, 1)
+            await asyncio.sleep(0)
+            # ...and that motion switches the light on again with a new timer
+            system._schedule_off(zone, 2)
+
+        await asyncio.gather(*system.tasks)
+        assert zone.name in system.off_handles
+        system.off_handles.pop(zone.name).cancel()
+
+    asyncio.run(scenario())
+    assert turned_off == []
+
+
+def test_turn_off_without_new_motion(system):
+    zone = system.zones[0]
+    turned_off = []
+    zone.bulb.turn_off = lambda: turned_off.append(zone.name) or True
+
+    async def scenario():
+        system.loop = asyncio.get_running_loop()
+        system.zone_locks[zone.name] = asyncio.Lock()
+        system._schedule_off(zone, 1)
+        system.off_handles[zone.name].cancel()
+        system._bulb_timeout(zone, 1)
+        await asyncio.gather(*system.tasks)
+
+    asyncio.run(scenario())
+    assert turned_off == [zone.name]
+
+
+def test_unrecognized_visitor_is_saved_as_snapshot(system, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "FACE_RECOGNITION_DURATION", 0.2)
+    monkeypatch.setattr(config, "CAMERA_WARMUP_TIME", 0)
+    system.snapshots = SnapshotWriter(directory=str(tmp_path / "snapshots"))
+    system.snapshots.start()
+    zone = system.zones[0]
+    event = {"t_motion": time.time()}
+
+    async def scenario():
+        system.loop = asyncio.get_running_loop()
+        video_stream = system.loop.run_in_executor(system.io_executor, zone.camera.get_video_stream)
+        await system._run_face_recognition(zone, 1, video_stream, event)
+
+    asyncio.run(scenario())
+    system.snapshots.stop()
+    zone.close()
+    assert event["outcome"] == "unrecognized"
+    assert os.path.isfile(event["snapshot"])
+
+
+def test_stop_turns_off_lit_bulbs(system):
+    zone = system.zones[0]
+    turned_off = []
+    zone.bulb.turn_off = lambda: turned_off.append(zone.name) or True
+
+    async def scenario():
+        system.loop = asyncio.get_running_loop()
+        system._schedule_off(zone, 1)
+        await system.stop()
+
+    asyncio.run(scenario())
+    assert turned_off == [zone.name]
@@ -0,0 +1,12 @@
+"""Tests for the camera manager's detection stream settings."""
+
+from camera_manager import CameraManager
+
+
+def test_detection_upsample_adds_a_pass_per_halving():
+    assert CameraManager(resolution=(640, 480), detection_resolution=(320, 240)).detection_upsample(1) == 2
+    assert CameraManager(resolution=(1280, 960), detection_resolution=(320, 240)).detection_upsample(1) == 3
+
+
+def test_full_resolution_detection_keeps_upsample():
+    assert CameraManager(resolution=(640, 480), detection_resolution=None).detection_upsample(1) == 1
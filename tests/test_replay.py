@@ -0,0 +1,36 @@
+"""Tests for the trace replay harness."""
+
+import json
+import os
+import numpy as np
+from PIL import Image
+import config
+import replay
+
+
+def write_trace(trace_dir):
+    """Write a trace of one motion event in the dark with a single (faceless) frame."""
+    os.makedirs(os.path.join(trace_dir, "frames"))
+    Image.fromarray(np.zeros((480, 640, 3), dtype=np.uint8)).save(os.path.join(trace_dir, "frames", "000001.jpg"))
+    events = [
+        {"type": "header", "version": 1, "start": 1700000000.0, "zones": ["front_door"]},
+        {"t": 0.0, "type": "light", "zone": "front_door", "value": 100},
+        {"t": 0.0, "type": "pir", "zone": "front_door"},
+        {"t": 0.001, "type": "frame", "zone": "front_door", "file": "frames/000001.jpg"},
+    ]
+    with open(os.path.join(trace_dir, "trace.jsonl"), "w") as trace_file:
+        trace_file.writelines(json.dumps(event) + "\n" for event in events)
+
+
+def test_replay_leaves_snapshot_dir_alone(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(config.SNAPSHOT_DIR)
+    evidence = os.path.join(config.SNAPSHOT_DIR, "unrecognized_front_door_real.jpg")
+    with open(evidence, "wb") as evidence_file:
+        evidence_file.write(b"real evidence")
+    write_trace(str(tmp_path / "trace"))
+
+    report = replay.replay(str(tmp_path / "trace"), speed=1000.0, recognition_speed=100.0)
+
+    assert report["outcomes"] == {"unrecognized": 1}
+    assert os.listdir(config.SNAPSHOT_DIR) == ["unrecognized_front_door_real.jpg"]
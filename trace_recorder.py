@@ -0,0 +1,180 @@
+"""Recorder of PIR triggers, light levels and camera frames for replaying scenarios.
+
+A trace is a directory containing ``trace.jsonl`` and a ``frames/`` directory of
+JPEG frame dumps. The first line of ``trace.jsonl`` is a header::
+
+    {"type": "header", "version": 1, "start": <epoch seconds>, "zones": [...]}
+
+followed by one event per line, with ``t`` in seconds since ``start``::
+
+    {"t": 12.5, "type": "pir", "zone": "front_door"}
+    {"t": 12.5, "type": "light", "zone": "front_door", "value": 312}
+    {"t": 15.1, "type": "frame", "zone": "front_door", "file": "frames/000001.jpg"}
+    {"t": 15.2, "type": "frame", "zone": "front_door", "stream": "full", "file": "frames/000002.jpg"}
+
+Frames marked ``"stream": "full"`` are the full-resolution grabs taken to
+encode a face found in the preceding frame of the same zone, which comes
+from the (possibly GPU-resized) detection stream.
+
+replay.py plays a trace back through SecuritySystem.
+"""
+
+import os
+import json
+import logging
+import time
+import queue
+import threading
+import numpy as np
+from PIL import Image
+import config
+
+logger = logging.getLogger(__name__)
+
+TRACE_FILENAME = "trace.jsonl"
+TRACE_VERSION = 1
+
+
+class TraceRecorder:
+    """Record sensor inputs and frames to a trace directory without blocking the caller.
+
+    Events are queued and written by a background thread; frames are JPEG
+    encoded on that thread too. When the queue is full new events are dropped.
+    """
+
+    def __init__(self, directory=config.TRACE_RECORD_DIR, zones=(), max_frame_rate=config.TRACE_MAX_FRAME_RATE,
+                 max_pending=config.TRACE_MAX_PENDING):
+        """Initialize the recorder.
+
+        Args:
+            directory: Trace directory to write
+            zones: Names of the zones being recorded
+            max_frame_rate: Maximum frames per second stored per zone
+            max_pending: Maximum number of queued events before new ones are dropped
+        """
+        self.directory = directory
+        self.zones = list(zones)
+        self.min_frame_interval = 1.0 / max_frame_rate
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.thread = None
+        self.running = False
+        self.start_time = None
+        self.last_frame = {}    # zone name -> time of the last stored frame
+        self.frame_stored = {}  # zone name -> whether the latest detection frame was stored
+        self.last_trigger = {}  # zone name -> trace offset of the last PIR trigger
+        self.frame_count = 0
+        self.dropped = 0
+
+    def start(self):
+        """Create the trace directory and start the writer thread."""
+        if self.running:
+            return
+
+        os.makedirs(os.path.join(self.directory, "frames"), exist_ok=True)
+        self.start_time = time.time()
+        with open(os.path.join(self.directory, TRACE_FILENAME), "w") as trace_file:
+            header = {"type": "header", "version": TRACE_VERSION, "start": self.start_time, "zones": self.zones}
+            trace_file.write(json.dumps(header) + "\n")
+
+        self.running = True
+        self.thread = threading.Thread(target=self._writer_thread)
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info("Recording trace to %s", self.directory)
+
+    def stop(self):
+        """Stop the writer thread after writing all queued events."""
+        if not self.running:
+            return
+        self.running = False
+        self.queue.put(None)
+        self.thread.join(timeout=10)
+        logger.info("Trace recording stopped (%d frames, %d events dropped)", self.frame_count, self.dropped)
+
+    def record_pir(self, zone):
+        """Record a raw PIR trigger.
+
+        Args:
+            zone: Name of the zone whose sensor triggered
+        """
+        offset = self._offset()
+        self.last_trigger[zone] = offset
+        self._put({"t": offset, "type": "pir", "zone": zone})
+
+    def record_light(self, zone, value):
+        """Record a light level reading taken in response to motion.
+
+        The reading is stamped with the zone's last PIR trigger so replay sets
+        the level before delivering that trigger.
+
+        Args:
+            zone: Name of the zone whose sensor was read
+            value: Light level reading
+        """
+        offset = self.last_trigger.get(zone, self._offset())
+        self._put({"t": offset, "type": "light", "zone": zone, "value": int(value)})
+
+    def record_frame(self, zone, image):
+        """Record a camera frame, limited to the configured frame rate.
+
+        Args:
+            zone: Name of the zone whose camera captured the frame
+            image: BGR frame as a numpy array
+        """
+        now = time.time()
+        if now - self.last_frame.get(zone, 0) < self.min_frame_interval:
+            self.frame_stored[zone] = False
+            return
+        self.last_frame[zone] = now
+        # The capture buffer is reused for the next frame, so keep a copy
+        self.frame_stored[zone] = self._put({"t": self._offset(now), "type": "frame", "zone": zone}, np.array(image))
+
+    def record_full_frame(self, zone, image):
+        """Record the full-resolution grab taken to encode faces in the latest detection frame.
+
+        Only recorded when that detection frame was, so replay can pair the two.
+
+        Args:
+            zone: Name of the zone whose camera captured the frame
+            image: BGR frame as a numpy array
+        """
+        if self.frame_stored.get(zone):
+            self._put({"t": self._offset(), "type": "frame", "zone": zone, "stream": "full"}, np.array(image))
+
+    def _offset(self, timestamp=None):
+        """Convert a timestamp (defaults to now) to seconds since the start of the trace."""
+        return round((timestamp or time.time()) - self.start_time, 3)
+
+    def _put(self, event, image=None):
+        """Queue an event for the writer thread without blocking.
+
+        Returns:
+            bool: True if the event was queued
+        """
+        if not self.running:
+            return False
+        try:
+            self.queue.put_nowait((event, image))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _writer_thread(self):
+        """Thread function that writes queued events and frames."""
+        with open(os.path.join(self.directory, TRACE_FILENAME), "a") as trace_file:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+                event, image = item
+                try:
+                    if image is not None:
+                        self.frame_count += 1
+                        event["file"] = os.path.join("frames", f"{self.frame_count:06d}.jpg")
+                        Image.fromarray(image[:, :, ::-1]).save(os.path.join(self.directory, event["file"]), quality=85)
+                    trace_file.write(json.dumps(event) + "\n")
+                    if self.queue.empty():
+                        trace_file.flush()
+                except Exception as e:
+                    logger.error("Error writing trace event: %s", e)
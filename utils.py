@@ -3,6 +3,12 @@
 import os
 from datetime import datetime
 import time
+import heapq
+import itertools
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
 
 
 def get_timestamp():
@@ -49,11 +55,11 @@ def safe_delete_file(file_path):
     try:
         if os.path.exists(file_path):
             os.remove(file_path)
-            print(f"Deleted file: {file_path}")
+            logger.debug("Deleted file: %s", file_path)
             return True
         return True 
     except Exception as e:
-        print(f"Error deleting file {file_path}: {e}")
+        logger.error("Error deleting file %s: %s", file_path, e)
         return False
 
 
@@ -109,4 +115,177 @@ class Timer:
         """Wait for the remaining time on the timer."""
         remaining_time = self.remaining()
         if remaining_time > 0:
-            time.sleep(remaining_time) 
\ No newline at end of file
+            time.sleep(remaining_time)
+
+
+class ScheduledTimer:
+    """Handle for a callback scheduled on a TimerService."""
+    
+    def __init__(self, service, deadline, callback, args):
+        """Initialize the handle.
+        
+        Args:
+            service: TimerService the callback is scheduled on
+            deadline: Time (time.monotonic) at which the callback runs
+            callback: Function to call when the timer expires
+            args: Arguments for the callback
+        """
+        self.service = service
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self.fired = False
+    
+    def is_pending(self):
+        """Check if the timer is still waiting to fire.
+        
+        Returns:
+            bool: True if the timer has neither fired nor been cancelled
+        """
+        return not self.cancelled and not self.fired
+    
+    def remaining(self):
+        """Get the remaining time before the timer fires.
+        
+        Returns:
+            float: Remaining time in seconds (0 if the timer is no longer pending)
+        """
+        if not self.is_pending():
+            return 0
+        return max(0, self.deadline - time.monotonic())
+    
+    def cancel(self):
+        """Cancel the timer."""
+        self.service.cancel(self)
+    
+    def extend(self, duration):
+        """Move the deadline to duration seconds from now.
+        
+        Args:
+            duration: New remaining time in seconds
+            
+        Returns:
+            bool: True if the timer was still pending and has been extended
+        """
+        return self.service.extend(self, duration)
+
+
+class TimerService:
+    """Single-thread scheduler running callbacks at their deadlines.
+    
+    Deadlines are kept in a heap and the thread sleeps until the earliest one,
+    so any number of pending timeouts share one thread, and an idle service
+    does not wake up at all. Callbacks run on the service thread and should be
+    short; hand long work to another thread.
+    """
+    
+    def __init__(self, speed=None):
+        """Initialize the timer service.
+        
+        Args:
+            speed: Optional function returning how many clock seconds pass per real
+                   second, for when time.monotonic is a virtual clock (replay harness)
+        """
+        self.speed = speed
+        self.heap = []  # (deadline, sequence, ScheduledTimer)
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+    
+    def start(self):
+        """Start the scheduler thread."""
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._run, name="timer-service")
+        self.thread.daemon = True
+        self.thread.start()
+    
+    def stop(self):
+        """Stop the scheduler thread; pending timers are discarded."""
+        with self.condition:
+            self.running = False
+            self.heap.clear()
+            self.condition.notify()
+        if self.thread and self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+    
+    def schedule(self, duration, callback, *args):
+        """Schedule a callback to run after a delay.
+        
+        Args:
+            duration: Delay in seconds
+            callback: Function to call when the timer expires
+            *args: Arguments for the callback
+            
+        Returns:
+            ScheduledTimer: Handle to cancel or extend the timer
+        """
+        timer = ScheduledTimer(self, time.monotonic() + duration, callback, args)
+        with self.condition:
+            self._push(timer)
+        return timer
+    
+    def cancel(self, timer):
+        """Cancel a scheduled timer.
+        
+        Args:
+            timer: ScheduledTimer returned by schedule()
+        """
+        with self.condition:
+            timer.cancelled = True
+            # The heap entry is skipped when it comes up; no need to wake the thread
+    
+    def extend(self, timer, duration):
+        """Move a pending timer's deadline to duration seconds from now.
+        
+        Args:
+            timer: ScheduledTimer returned by schedule()
+            duration: New remaining time in seconds
+            
+        Returns:
+            bool: True if the timer was still pending and has been extended
+        """
+        with self.condition:
+            if not timer.is_pending():
+                return False
+            timer.deadline = time.monotonic() + duration
+            self._push(timer)
+            return True
+    
+    def _push(self, timer):
+        """Add a heap entry for a timer and wake the thread if it is now the earliest.
+        
+        Must be called with the condition held.
+        """
+        heapq.heappush(self.heap, (timer.deadline, next(self.sequence), timer))
+        if self.heap[0][2] is timer:
+            self.condition.notify()
+    
+    def _run(self):
+        """Thread function that waits for the earliest deadline and runs due callbacks."""
+        while True:
+            with self.condition:
+                while self.running:
+                    # Drop entries for cancelled timers and stale entries left by extend()
+                    while self.heap and (not self.heap[0][2].is_pending() or self.heap[0][0] != self.heap[0][2].deadline):
+                        heapq.heappop(self.heap)
+                    if not self.heap:
+                        self.condition.wait()
+                        continue
+                    timeout = self.heap[0][0] - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    self.condition.wait(timeout / self.speed() if self.speed else timeout)
+                if not self.running:
+                    return
+                timer = heapq.heappop(self.heap)[2]
+                timer.fired = True
+            
+            try:
+                timer.callback(*timer.args)
+            except Exception as e:
+                logger.exception("Error in timer callback: %s", e)
@@ -0,0 +1,119 @@
+"""Zone module grouping the sensors, camera and bulb that watch one entrance."""
+
+import time
+import logging
+import threading
+import config
+from sensors import MotionSensor, LightSensor, IndicatorLED
+from camera_manager import CameraManager
+from smart_bulb import SmartBulb, BulbGroup
+from roi import RegionOfInterest
+
+logger = logging.getLogger(__name__)
+
+
+class Zone:
+    """A monitored area with its own motion sensor, light sensor, LED, camera and bulb."""
+
+    def __init__(self, name, pir_pin=config.PIR_SENSOR_PIN, led_pin=config.LED_PIN,
+                 light_adc_address=0x08, light_channel=0, camera_num=0,
+                 device_id=config.DEVICE_ID, device_ip=config.DEVICE_IP, local_key=config.LOCAL_KEY,
+                 bulbs=None, roi=None, timers=None):
+        """Initialize the zone hardware.
+
+        Args:
+            name: Name of the zone (e.g. 'front_door')
+            pir_pin: GPIO pin number for the zone's PIR sensor
+            led_pin: GPIO pin number for the zone's indicator LED
+            light_adc_address: I2C address of the ADC for the zone's light sensor
+            light_channel: ADC channel of the zone's light sensor
+            camera_num: Camera port index of the zone's camera
+            device_id: Tuya device ID of the zone's bulb
+            device_ip: IP address of the zone's bulb
+            local_key: Local key of the zone's bulb
+            bulbs: Optional list of {"device_id", "device_ip", "local_key"}
+                   dictionaries for several bulbs switched together; replaces
+                   device_id, device_ip and local_key
+            roi: Optional region of the camera frame searched for faces, as
+                 [x, y, width, height] or a list of [x, y] polygon points in
+                 full-resolution pixel coordinates
+            timers: Optional utils.TimerService shared with the motion sensor
+        """
+        self.name = name
+        self.motion_sensor = MotionSensor(pir_pin, timers=timers)
+        self.light_sensor = LightSensor(light_adc_address, light_channel)
+        self.led = IndicatorLED(led_pin)
+        self.camera = CameraManager(camera_num=camera_num)
+        self.bulb = BulbGroup(bulbs) if bulbs else SmartBulb(device_id, device_ip, local_key)
+        self.roi = RegionOfInterest.from_config(roi)
+        
+        # Faces are searched in the camera's detection stream, so scale the region to it
+        self.detection_roi = self.roi
+        if self.roi and self.camera.detection_resolution:
+            (width, height), (detection_width, detection_height) = self.camera.resolution, self.camera.detection_resolution
+            self.detection_roi = self.roi.scaled(detection_width / width, detection_height / height)
+
+        # Serializes motion handling within this zone only
+        self.lock = threading.Lock()
+
+        # Pending bulb-off timer and the stop signal of the running recognition
+        self.bulb_timer = None
+        self.recognition_stop = None
+
+        # Last person recognized in this zone as (name, color, monotonic time)
+        self.last_identity = None
+
+    def remember_identity(self, name, color):
+        """Record the person just recognized in this zone.
+
+        Args:
+            name: Name of the recognized person
+            color: Favorite color of the recognized person
+        """
+        self.last_identity = (name, color, time.monotonic())
+
+    def forget_identity(self):
+        """Forget the last recognized person, e.g. after recognition failed."""
+        self.last_identity = None
+
+    def recent_identity(self, ttl=config.RECENT_IDENTITY_TTL):
+        """Get the person recognized in this zone within the last ttl seconds.
+
+        Args:
+            ttl: Maximum age of the recognition in seconds (0 disables)
+
+        Returns:
+            tuple: (name, color) of the person, or None if nobody was recognized recently
+        """
+        last_identity = self.last_identity
+        if not ttl or last_identity is None:
+            return None
+        name, color, recognized_at = last_identity
+        if time.monotonic() - recognized_at > ttl:
+            return None
+        return name, color
+
+    def close(self):
+        """Release the zone's hardware resources."""
+        self.camera.close()
+        self.bulb.close()
+
+
+def load_zones(zone_configs=None, timers=None):
+    """Create zones from a list of zone configuration dictionaries.
+
+    Args:
+        zone_configs: List of dictionaries of Zone keyword arguments (defaults to config.ZONES)
+        timers: Optional utils.TimerService passed to every zone
+
+    Returns:
+        list: Zone instances
+    """
+    if zone_configs is None:
+        zone_configs = config.ZONES
+
+    zones = []
+    for zone_config in zone_configs:
+        zones.append(Zone(timers=timers, **zone_config))
+        logger.info("Configured zone: %s", zone_config["name"])
+    return zones